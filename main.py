@@ -1,9 +1,17 @@
-﻿from src.scenes.credits import Credits
+﻿import argparse
+
+from src.scenes.credits import Credits
 from src.utils import *
 from src.scene import SceneType
 from src.scenes import *
 from src.events import scene_events, options_events
 from src.utils.volume import update_volume
+from src.physics_backends import PHYSICS_BACKENDS
+
+# python main.py --physics reference|vectorized|ccd|sdf overrides the solver of the settings
+parser = argparse.ArgumentParser(description="Swing King")
+parser.add_argument("--physics", choices=sorted(PHYSICS_BACKENDS), help="physics backend of the game")
+arguments = parser.parse_args()
 
 pygame.init()
 pygame.mixer.init()
@@ -11,7 +19,7 @@ pygame.mixer.music.load("assets/audio/music/SwingKing.mp3")
 
 
 screen = pygame.display.set_mode(flags=pygame.SRCALPHA)
-game = Game(screen, "data/levels", None)
+game = Game(screen, "data/levels", None, arguments.physics)
 main_menu = Menu(screen)
 option_menu = OptionMenu(screen, None)
 level_creator = LevelCreator(screen, None)
@@ -0,0 +1,342 @@
+import math
+
+import numpy as np
+import pygame
+
+from src import physics
+from src.collision_world import CollisionWorld
+from src.materials import get_material_table
+
+# --- Shot outcomes ---
+OUTCOME_MOVING = 0  # Still simulated
+OUTCOME_REST = 1  # Stopped somewhere on the course
+OUTCOME_HAZARD = 2  # Fell in water, out of bounds or below the whole level, the ball goes back to its start
+OUTCOME_FLAG = 3  # Stopped in the hole
+OUTCOME_STUCK = 4  # Settled by the sleep rule while still bouncing or creeping (see physics.update_sleep)
+OUTCOME_TIMEOUT = 5  # Still moving after the maximum number of steps
+
+OUTCOME_NAMES = {
+    OUTCOME_MOVING: "moving",
+    OUTCOME_REST: "rest",
+    OUTCOME_HAZARD: "hazard",
+    OUTCOME_FLAG: "flag",
+    OUTCOME_STUCK: "stuck",
+    OUTCOME_TIMEOUT: "timeout",
+}
+
+
+def shot_velocities(forces, angles):
+    """
+    Converts shot forces and angles (as computed by drag_and_release) into initial velocities.
+
+    :param forces: Array of shot forces.
+    :param angles: Array of shot angles, in degrees.
+    :return: (N, 2) array of initial velocities.
+    """
+    angles_radians = np.radians(np.asarray(angles, dtype=np.float64))
+    forces = np.asarray(forces, dtype=np.float64)
+    return np.stack((-forces * np.cos(angles_radians), forces * np.sin(angles_radians)), axis=1)
+
+
+class BatchResult:
+    """Outcome of a batch of shots, one entry per ball"""
+
+    def __init__(self, rest_positions, outcomes, steps):
+        self.rest_positions = rest_positions  # (N, 2) position where each ball ended its stroke
+        self.outcomes = outcomes  # (N,) OUTCOME_* code of each ball
+        self.steps = steps  # (N,) number of sub-steps each ball was simulated for
+
+    def outcome_names(self) -> list:
+        """Returns the outcomes as readable strings"""
+        return [OUTCOME_NAMES[int(outcome)] for outcome in self.outcomes]
+
+
+class ContactBall:
+    """Stand-in for a Ball while physics.resolve_contacts solves the contacts of one ball of a batch"""
+
+    def __init__(self, position, velocity, radius: float, time_since_contact: float):
+        self.position = pygame.Vector2(float(position[0]), float(position[1]))
+        self.velocity = pygame.Vector2(float(velocity[0]), float(velocity[1]))
+        self.radius = radius
+        self.scale_value = 1.0
+        size = math.ceil(2 * radius)
+        self.rect = pygame.Rect(0, 0, size, size)
+        self.rect.center = self.position
+        self.time_since_contact = time_since_contact
+        self.rolling_contact = None
+
+
+class BatchSimulation:
+    """
+        Simulates many balls at once on the static geometry of one level.
+        The balls are stored as arrays (struct-of-arrays) and every sub-step updates all of them together,
+        following the same rules as physics.update_ball_physics: the free flight, the rolling along an edge, the
+        stop condition and the sleep rule are vectorized, and the few balls penetrating a surface during a
+        sub-step have their contact manifold solved by physics.resolve_contacts.
+    """
+
+    def __init__(self, terrain_polys: list, obstacles: list, ball_radius: float, flag=None, signed_distance_field=None,
+                 kill_plane_y=None):
+        """
+        Prepares the static geometry of the level.
+
+        :param terrain_polys: List of Terrain objects.
+        :param obstacles: List of collidable Obstacle objects.
+        :param ball_radius: Collision radius of the balls, in pixels (ball.radius * ball.scale_value).
+        :param flag: Optional Flag of the level, used to detect the balls stopping in the hole.
+        :param signed_distance_field: Optional SignedDistanceField of the level. Contacts are then looked up in the
+                                      field, the polygons are only tested outside of its grid. The entities and
+                                      materials are taken from the world the field was baked from.
+        :param kill_plane_y: Optional y coordinate of the out of bounds plane of the level, balls going below it end
+                             as hazards. Without it, balls falling below every entity do.
+        """
+        self.ball_radius = ball_radius
+        self.signed_distance_field = signed_distance_field
+        entities = terrain_polys + obstacles
+        if signed_distance_field is not None:
+            entities = signed_distance_field.world.entities
+
+        # Contact manifolds and rolling edges, the same queries as the single ball physics
+        self.world = signed_distance_field if signed_distance_field is not None else CollisionWorld(entities)
+        self.edges = [entity.get_collision_edges() for entity in entities]
+        self.bounds = np.array([(entity.rect.left, entity.rect.top, entity.rect.right, entity.rect.bottom)
+                                for entity in entities], dtype=np.float64).reshape(-1, 4)
+        materials = get_material_table()
+        material_ids = np.array([entity.material_id for entity in entities], dtype=np.int64)
+        self.friction = materials.friction[material_ids]
+        self.bounce = materials.bounce[material_ids]
+        # Nothing can be hit anymore by a ball falling below this height
+        self.lowest_y = self.bounds[:, 3].max() if len(self.bounds) else 0.0
+        self.kill_plane_y = kill_plane_y
+
+        # Base of the flag (1/4 bottom of the sprite), as in Game.check_flag_collision
+        self.hole_bounds = None
+        if flag is not None:
+            width, height = flag.animation.image.get_size()
+            base_height = height // 4
+            self.hole_bounds = (flag.position.x, flag.position.y + height - base_height,
+                                flag.position.x + width, flag.position.y + height)
+
+    def find_contacts(self, positions: np.ndarray, active: np.ndarray):
+        """
+        Finds the deepest contact of every active ball. Only the balls penetrating a surface need their contact
+        manifold (see run).
+
+        :param positions: (N, 2) array of ball positions.
+        :param active: (N,) boolean array of the balls to test.
+        :return: (depths, normals, entities): depth is -1 and entity is -1 for the balls without contact.
+        """
+        count = len(positions)
+        radius = self.ball_radius
+        depths = np.full(count, -1.0)
+        normals = np.zeros((count, 2))
+        entities = np.full(count, -1, dtype=np.int64)
+
+        active_indices = np.nonzero(active)[0]
+        if self.signed_distance_field is not None and len(active_indices):
+            field_depths, field_normals, field_entities, inside = self.signed_distance_field.contacts(
+                positions[active_indices], radius)
+            depths[active_indices] = field_depths
+            normals[active_indices] = field_normals
+            entities[active_indices] = field_entities
+            active_indices = active_indices[~inside]
+
+        if len(active_indices) == 0 or len(self.bounds) == 0:
+            return depths, normals, entities
+
+        # Bounding box test of every active ball against every entity
+        active_positions = positions[active_indices]
+        overlaps = ((active_positions[:, None, 0] + radius > self.bounds[None, :, 0]) &
+                    (active_positions[:, None, 0] - radius < self.bounds[None, :, 2]) &
+                    (active_positions[:, None, 1] + radius > self.bounds[None, :, 1]) &
+                    (active_positions[:, None, 1] - radius < self.bounds[None, :, 3]))
+
+        for entity_index in np.nonzero(overlaps.any(axis=0))[0]:
+            edges = self.edges[entity_index]
+            if len(edges) < 2:
+                continue
+            balls = active_indices[overlaps[:, entity_index]]
+
+            # (balls, edges) closest points
+            to_center = positions[balls][:, None, :] - edges.starts[None, :, :]
+            t = np.clip(np.einsum("bej,ej->be", to_center, edges.vectors) * edges.inv_length_sq, 0.0, 1.0)
+            offsets = to_center - t[:, :, None] * edges.vectors[None, :, :]
+            dist_sq = np.einsum("bej,bej->be", offsets, offsets)
+            closest = np.argmin(dist_sq, axis=1)
+            min_dist_sq = dist_sq[np.arange(len(balls)), closest]
+
+            dist = np.sqrt(min_dist_sq)
+            depth = radius - dist
+            hit = (min_dist_sq < radius * radius + 1e-5) & (depth > 1e-4) & (depth > depths[balls])
+            if not hit.any():
+                continue
+
+            hit_balls = balls[hit]
+            hit_offsets = offsets[np.arange(len(balls)), closest][hit]
+            hit_dist = dist[hit]
+            hit_normals = np.tile((0.0, -1.0), (len(hit_balls), 1))  # Default normal
+            valid = hit_dist > 1e-6
+            hit_normals[valid] = hit_offsets[valid] / hit_dist[valid, None]
+
+            depths[hit_balls] = depth[hit]
+            normals[hit_balls] = hit_normals
+            entities[hit_balls] = entity_index
+
+        return depths, normals, entities
+
+    def run(self, start_positions, velocities, dt: float, max_steps: int = 20000) -> BatchResult:
+        """
+        Simulates one stroke for every ball until all of them stop.
+
+        :param start_positions: (N, 2) array of positions the shots are played from.
+        :param velocities: (N, 2) array of initial velocities (see shot_velocities).
+        :param dt: Fixed time delta of a sub-step, in seconds.
+        :param max_steps: Maximum number of sub-steps before a ball is given up on.
+        :return: The BatchResult of the strokes.
+        """
+        start_positions = np.array(start_positions, dtype=np.float64).reshape(-1, 2)
+        positions = start_positions.copy()
+        velocities = np.array(velocities, dtype=np.float64).reshape(-1, 2)
+        count = len(positions)
+
+        outcomes = np.full(count, OUTCOME_MOVING, dtype=np.int64)
+        steps = np.zeros(count, dtype=np.int64)
+        sleep_anchors = np.full((count, 2), np.nan)  # Sleep state of each ball (see physics.update_sleep)
+        sleep_time = np.zeros(count)
+        time_since_contact = np.full(count, np.inf)  # Contact friction state (see physics.contact_friction_factor)
+        # Rolling state of each ball (see physics.RollingContact)
+        rolling = np.zeros(count, dtype=bool)
+        roll_starts = np.zeros((count, 2))
+        roll_tangents = np.zeros((count, 2))
+        roll_normals = np.zeros((count, 2))
+        roll_lengths = np.zeros(count)
+        roll_friction = np.zeros(count)
+
+        radius = self.ball_radius
+        effective_damping = physics.DEFAULT_DAMPING_FACTOR ** dt
+        stop_speed_sq = physics.BALL_STOP_SPEED_THRESHOLD ** 2
+        manifold_reach = 2 * radius + physics.MANIFOLD_CONTACT_MARGIN
+
+        for _ in range(max_steps):
+            moving = outcomes == OUTCOME_MOVING
+            if not moving.any():
+                break
+            steps[moving] += 1
+
+            # Rolling balls move along their edge (see physics.roll_ball), the others fly this sub-step
+            rolled = np.zeros(count, dtype=bool)
+            rollers = np.nonzero(moving & rolling)[0]
+            if len(rollers):
+                tangents, normals = roll_tangents[rollers], roll_normals[rollers]
+                relative_positions = positions[rollers] - roll_starts[rollers]
+                on_edge = ((np.abs(np.einsum("ij,ij->i", velocities[rollers], normals)) <=
+                            physics.ROLLING_MAX_NORMAL_SPEED) &
+                           (np.abs(np.einsum("ij,ij->i", relative_positions, normals) - radius) <=
+                            physics.ROLLING_POSITION_TOLERANCE))
+                speeds = np.einsum("ij,ij->i", velocities[rollers], tangents)
+                speeds += physics.GRAVITY_ACCELERATION * tangents[:, 1] * dt
+                speeds *= effective_damping * physics.contact_friction_factor(roll_friction[rollers], dt)
+                offsets = np.einsum("ij,ij->i", relative_positions, tangents) + speeds * dt
+                on_edge &= (offsets >= 0.0) & (offsets <= roll_lengths[rollers])
+
+                # Any other surface reached along the edge is solved by the free flight
+                rolled_positions = roll_starts[rollers] + tangents * offsets[:, None] + normals * radius
+                trial_positions = positions.copy()
+                trial_positions[rollers] = rolled_positions
+                trial = np.zeros(count, dtype=bool)
+                trial[rollers[on_edge]] = True
+                blocked = self.find_contacts(trial_positions, trial)[2][rollers] >= 0
+                on_edge &= ~blocked
+
+                kept = rollers[on_edge]
+                positions[kept] = rolled_positions[on_edge]
+                velocities[kept] = tangents[on_edge] * speeds[on_edge, None]
+                time_since_contact[kept] = 0.0
+                rolled[kept] = True
+                rolling[rollers[~on_edge]] = False
+
+                stopped = kept[(np.abs(speeds[on_edge]) < physics.BALL_STOP_SPEED_THRESHOLD) &
+                               (np.abs(normals[on_edge, 1]) > 0.9)]
+                velocities[stopped] = 0.0
+                outcomes[stopped] = OUTCOME_REST
+
+            # Gravity, damping and integration with the mean velocity of the sub-step
+            flying = moving & ~rolled
+            time_since_contact[flying] += dt
+            start_velocities = velocities[flying]
+            velocities[flying, 1] += physics.GRAVITY_ACCELERATION * dt
+            velocities[flying] *= effective_damping
+            positions[flying] += (start_velocities + velocities[flying]) * (0.5 * dt)
+
+            # Balls falling below the level would fall forever
+            still_moving = outcomes == OUTCOME_MOVING
+            if self.kill_plane_y is not None:
+                fallen = still_moving & (positions[:, 1] + radius > self.kill_plane_y)
+            else:
+                fallen = still_moving & (positions[:, 1] - radius > self.lowest_y) & (velocities[:, 1] >= 0)
+            velocities[fallen] = 0.0
+            positions[fallen] = start_positions[fallen]
+            outcomes[fallen] = OUTCOME_HAZARD
+            flying &= ~fallen
+
+            # The balls penetrating a surface have their whole manifold solved, as a single ball would
+            contacted = np.zeros(count, dtype=bool)
+            supported = np.zeros(count, dtype=bool)
+            for index in np.nonzero(self.find_contacts(positions, flying)[2] >= 0)[0]:
+                ball = ContactBall(positions[index], velocities[index], radius, time_since_contact[index])
+                events = []
+                manifold = physics.resolve_contacts(ball, self.world,
+                                                    self.world.query_around(ball.position, manifold_reach), dt, events)
+                positions[index] = ball.position
+                velocities[index] = ball.velocity
+                time_since_contact[index] = ball.time_since_contact
+                if manifold is None:
+                    continue
+                contacted[index] = True
+                supported[index] = physics.manifold_supports_ball(manifold)
+
+                if any(event.kind == physics.EVENT_HAZARD for event in events):
+                    # Hazards end the stroke, the ball goes back to where it was shot from
+                    velocities[index] = 0.0
+                    positions[index] = start_positions[index]
+                    outcomes[index] = OUTCOME_HAZARD
+                elif ball.rolling_contact is not None:
+                    contact = ball.rolling_contact
+                    rolling[index] = True
+                    roll_starts[index] = contact.start
+                    roll_tangents[index] = contact.tangent
+                    roll_normals[index] = contact.normal
+                    roll_lengths[index] = contact.length
+                    roll_friction[index] = contact.material[1]
+
+            # Stopping condition
+            still_moving = outcomes == OUTCOME_MOVING
+            slow = still_moving & flying & (np.einsum("ij,ij->i", velocities, velocities) < stop_speed_sq)
+            stopped = slow & (~contacted | supported)
+            velocities[stopped] = 0.0
+            outcomes[stopped] = OUTCOME_REST
+
+            # Sleep: the balls which stayed in place, and slow unless in contact, for a whole window are settled
+            awake = outcomes == OUTCOME_MOVING
+            kinetic_energy = 0.5 * np.einsum("ij,ij->i", velocities, velocities)
+            drift = positions - sleep_anchors
+            energetic = (kinetic_energy > physics.SLEEP_MAX_KINETIC_ENERGY) & (time_since_contact > physics.SLEEP_WINDOW)
+            restart = awake & (np.isnan(sleep_anchors[:, 0]) | energetic |
+                               (np.einsum("ij,ij->i", drift, drift) > physics.SLEEP_MAX_DISPLACEMENT ** 2))
+            sleep_anchors[restart] = positions[restart]
+            sleep_time[restart] = 0.0
+            sleep_time[awake & ~restart] += dt
+            asleep = awake & (sleep_time >= physics.SLEEP_WINDOW)
+            velocities[asleep] = 0.0
+            outcomes[asleep] = OUTCOME_STUCK
+
+        outcomes[outcomes == OUTCOME_MOVING] = OUTCOME_TIMEOUT
+
+        if self.hole_bounds is not None:
+            left, top, right, bottom = self.hole_bounds
+            radius = self.ball_radius
+            in_hole = ((positions[:, 0] + radius > left) & (positions[:, 0] - radius < right) &
+                       (positions[:, 1] + radius > top) & (positions[:, 1] - radius < bottom))
+            outcomes[((outcomes == OUTCOME_REST) | (outcomes == OUTCOME_STUCK)) & in_hole] = OUTCOME_FLAG
+
+        return BatchResult(positions, outcomes, steps)
@@ -0,0 +1,103 @@
+import numpy as np
+import pygame
+
+
+def impact_times(start, motion, radius, starts, vectors, inv_length_sq):
+    """
+    Computes the first time a moving circle touches each of the given edges (swept circle vs segments).
+    Every edge is tested at once: the circle can hit the inside of a segment or one of its end points.
+    The circle may also differ per edge, to test many (circle, edge) pairs at once (see queries.LevelQueries).
+
+    Args:
+        start: Position of the circle center at the beginning of the motion, as a pair of floats or a (N, 2) array.
+        motion: Displacement of the circle center during the motion, as a pair of floats or a (N, 2) array.
+        radius: Float radius of the circle, or (N,) array.
+        starts: (N, 2) array of the edges start points.
+        vectors: (N, 2) array of the edges vectors (end - start).
+        inv_length_sq: (N,) array of the inverse squared length of each edge (0 for degenerated edges).
+
+    Returns:
+        (N,) array of the fraction of the motion before each edge is touched, in [0, 1], inf for the missed edges.
+    """
+    start_array = np.asarray(start, dtype=np.float64)
+    motion_array = np.broadcast_to(np.asarray(motion, dtype=np.float64), starts.shape)
+    motion_length_sq = np.einsum("ij,ij->i", motion_array, motion_array)
+
+    to_start = start_array - starts
+    toi = np.full(len(starts), np.inf)
+
+    # --- Segment interiors: the distance to the supporting line reaches the radius ---
+    lengths = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+    valid = lengths > 1e-9
+    safe_lengths = np.where(valid, lengths, 1.0)
+    normals = np.stack((-vectors[:, 1], vectors[:, 0]), axis=1) / safe_lengths[:, None]
+    distances = np.einsum("ij,ij->i", to_start, normals)
+    # Use the side of each line the circle starts on
+    side = np.where(distances < 0, -1.0, 1.0)
+    distances *= side
+    approach_speed = -np.einsum("ij,ij->i", normals, motion_array) * side  # > 0 when moving towards the line
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_line = np.where(distances >= radius, (distances - radius) / approach_speed, 0.0)
+    hits_line = valid & (approach_speed > 1e-12) & (t_line >= 0.0) & (t_line <= 1.0)
+    # The touching point must lie inside the segment
+    centers_at_t = to_start + t_line[:, None] * motion_array
+    projections = np.einsum("ij,ij->i", centers_at_t, vectors) * inv_length_sq
+    hits_line &= (projections >= 0.0) & (projections <= 1.0)
+    toi = np.where(hits_line, t_line, toi)
+
+    # --- End points: |start + t * motion - point| = radius ---
+    for offsets in (to_start, to_start - vectors):
+        b = np.einsum("ij,ij->i", offsets, motion_array)
+        c = np.einsum("ij,ij->i", offsets, offsets) - radius * radius
+        discriminant = b * b - motion_length_sq * c
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_point = np.where(c <= 0.0, 0.0, (-b - np.sqrt(discriminant)) / motion_length_sq)
+        hits_point = (b < 0.0) & (discriminant >= 0.0) & (t_point >= 0.0) & (t_point <= 1.0)
+        toi = np.where(hits_point & (t_point < toi), t_point, toi)
+
+    return toi
+
+
+def time_of_impact(start, motion, radius, starts, vectors, inv_length_sq):
+    """
+    Computes the first time a moving circle touches any of the given edges (see impact_times).
+
+    Args:
+        start: pygame.Vector2 position of the circle center at the beginning of the motion.
+        motion: pygame.Vector2 displacement of the circle center during the motion.
+        radius: Float radius of the circle.
+        starts: (N, 2) array of the edges start points.
+        vectors: (N, 2) array of the edges vectors (end - start).
+        inv_length_sq: (N,) array of the inverse squared length of each edge (0 for degenerated edges).
+
+    Returns:
+        (toi, edge_index, normal): toi in [0, 1] is the fraction of the motion before the impact, normal the
+        unit pygame.Vector2 pointing from the edge towards the circle. None if no edge is touched.
+    """
+    if len(starts) == 0:
+        return None
+
+    start_array = np.array((start[0], start[1]), dtype=np.float64)
+    motion_array = np.array((motion[0], motion[1]), dtype=np.float64)
+    if motion_array.dot(motion_array) < 1e-12:
+        return None
+
+    toi = impact_times(start_array, motion_array, radius, starts, vectors, inv_length_sq)
+
+    edge_index = int(np.argmin(toi))
+    first_toi = float(toi[edge_index])
+    if not np.isfinite(first_toi):
+        return None
+
+    # Normal from the touched point of the edge to the circle center at the time of impact
+    center = start_array + first_toi * motion_array
+    t = np.clip((center - starts[edge_index]).dot(vectors[edge_index]) * inv_length_sq[edge_index], 0.0, 1.0)
+    offset = center - (starts[edge_index] + t * vectors[edge_index])
+    offset_length = float(np.hypot(offset[0], offset[1]))
+    if offset_length > 1e-9:
+        normal = pygame.Vector2(float(offset[0]), float(offset[1])) / offset_length
+    else:
+        normal = -pygame.Vector2(float(motion_array[0]), float(motion_array[1])).normalize()
+
+    return first_toi, edge_index, normal
@@ -0,0 +1,284 @@
+import math
+
+import numpy as np
+import pygame
+
+from src import narrow_phase, ccd
+from src.edge_bvh import EdgeBVH
+from src.materials import get_material_table
+from src.utils.spatial_hash import SpatialHash
+
+BVH_MIN_EDGES = 32  # Entities with fewer edges are tested whole, a tree would not pay off
+
+
+class CollisionWorld:
+    """
+        Collision geometry of a whole level, built once when the level is loaded.
+        The edges of every collidable entity are stored in flat arrays (start points, edge vectors and inverse
+        squared lengths) along with the material of each entity, so that the physics never rebuilds geometry
+        nor inspects entity types during a step. Each entity owns a slot in the arrays: when it moves or rotates,
+        only its slot is rewritten (see update_entity).
+    """
+
+    def __init__(self, entities: list, cell_size: int = 256):
+        """
+        Builds the collision world.
+
+        :param entities: Collidable entities (Terrain and Obstacle objects), in the order contacts are resolved.
+        :param cell_size: Cell size of the spatial hash broad-phase, in pixels.
+        """
+        self.entities = list(entities)
+        self.indices = {id(entity): index for index, entity in enumerate(self.entities)}
+
+        # Materials, gathered once from the material table by the material ID of each entity
+        materials = get_material_table()
+        self.material_ids = np.array([entity.material_id for entity in self.entities], dtype=np.int64)
+        self.friction = materials.friction[self.material_ids]
+        self.bounce = materials.bounce[self.material_ids]
+
+        # Flat edge arrays, entity i owns the slot [slot_starts[i], slot_starts[i] + slot_capacities[i])
+        edge_sets = [entity.get_collision_edges() for entity in self.entities]
+        counts = [len(edges) for edges in edge_sets]
+        self.slot_starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64) if counts else np.zeros(0, np.int64)
+        self.slot_capacities = np.array(counts, dtype=np.int64)
+        self.edge_counts = np.array(counts, dtype=np.int64)
+        self.starts = np.concatenate([edges.starts for edges in edge_sets]) if counts else np.empty((0, 2))
+        self.vectors = np.concatenate([edges.vectors for edges in edge_sets]) if counts else np.empty((0, 2))
+        self.inv_length_sq = np.concatenate([edges.inv_length_sq for edges in edge_sets]) if counts else np.empty(0)
+        self.edge_owners = np.repeat(np.arange(len(self.entities)), counts)
+        self.edge_ranges = [np.arange(start, start + count) for start, count in zip(self.slot_starts, counts)]
+        # Edge tree of the entities with long outlines, None for the others
+        self.bvhs = [self.build_bvh(index) for index in range(len(self.entities))]
+
+        self.bounds = [self.edge_bounds(index) for index in range(len(self.entities))]
+        self.broad_phase = SpatialHash(cell_size)
+        for index, rect in enumerate(self.bounds):
+            self.broad_phase.insert(index, rect)
+
+    def edge_bounds(self, index: int) -> pygame.Rect:
+        """
+        Bounding box of the edges of an entity.
+
+        :param index: Index of the entity in the world.
+        """
+        edge_range = self.edge_ranges[index]
+        if len(edge_range) == 0:
+            return pygame.Rect(0, 0, 0, 0)
+        starts = self.starts[edge_range]
+        points = np.concatenate((starts, starts + self.vectors[edge_range]))
+        min_x, min_y = np.floor(points.min(axis=0))
+        max_x, max_y = np.ceil(points.max(axis=0))
+        return pygame.Rect(int(min_x), int(min_y), int(max_x - min_x) + 1, int(max_y - min_y) + 1)
+
+    def build_bvh(self, index: int):
+        """
+        Builds the edge BVH of an entity if it has enough edges.
+
+        :param index: Index of the entity in the world.
+        """
+        edge_range = self.edge_ranges[index]
+        if len(edge_range) < BVH_MIN_EDGES:
+            return None
+        return EdgeBVH(self.starts[edge_range], self.vectors[edge_range])
+
+    def update_entity(self, entity, rigid: bool = False):
+        """
+        Rewrites the slot of an entity after it moved, rotated or was resized. The other entities are untouched.
+
+        :param entity: The entity, which must have been given to the world at creation.
+        :param rigid: True if the entity only moved or rotated (a kinematic obstacle): its edge tree is refitted
+                      instead of being rebuilt.
+        """
+        index = self.indices[id(entity)]
+        edges = entity.get_collision_edges()
+        count = len(edges)
+
+        if count > self.slot_capacities[index]:
+            # The slot is too small, move the entity to a new slot at the end of the arrays
+            self.slot_starts[index] = len(self.starts)
+            self.slot_capacities[index] = count
+            self.starts = np.concatenate((self.starts, edges.starts))
+            self.vectors = np.concatenate((self.vectors, edges.vectors))
+            self.inv_length_sq = np.concatenate((self.inv_length_sq, edges.inv_length_sq))
+            self.edge_owners = np.concatenate((self.edge_owners, np.full(count, index)))
+        else:
+            start = self.slot_starts[index]
+            self.starts[start:start + count] = edges.starts
+            self.vectors[start:start + count] = edges.vectors
+            self.inv_length_sq[start:start + count] = edges.inv_length_sq
+
+        bvh = self.bvhs[index]
+        if rigid and bvh is not None and count == self.edge_counts[index]:
+            bvh.refit(edges.starts, edges.vectors)
+            # The root of the tree already bounds every edge
+            min_x, min_y = math.floor(bvh.nodes[0][0]), math.floor(bvh.nodes[0][1])
+            max_x, max_y = math.ceil(bvh.nodes[0][2]), math.ceil(bvh.nodes[0][3])
+            self.bounds[index] = pygame.Rect(min_x, min_y, max_x - min_x + 1, max_y - min_y + 1)
+        else:
+            self.edge_counts[index] = count
+            self.edge_ranges[index] = np.arange(self.slot_starts[index], self.slot_starts[index] + count)
+            self.bvhs[index] = self.build_bvh(index)
+            self.bounds[index] = self.edge_bounds(index)
+        self.broad_phase.update(index, self.bounds[index])
+
+    def material(self, index: int) -> tuple:
+        """
+        Returns the material of an entity.
+
+        :param index: Index of the entity in the world.
+        :return: (bounce, friction, material_id)
+        """
+        return float(self.bounce[index]), float(self.friction[index]), int(self.material_ids[index])
+
+    def query(self, rect: pygame.Rect) -> list:
+        """
+        Returns the indices of the entities whose bounding box overlaps a rect, in resolution order.
+
+        :param rect: Area to query, in world coordinates.
+        """
+        return [index for index in self.broad_phase.query(rect) if self.bounds[index].colliderect(rect)]
+
+    def query_around(self, position, distance: float) -> list:
+        """
+        Returns the indices of the entities whose bounding box is within a distance of a point.
+
+        :param position: The point, in world coordinates.
+        :param distance: Search distance, in pixels.
+        """
+        reach = math.ceil(distance)
+        return self.query(pygame.Rect(int(position[0]) - reach, int(position[1]) - reach, 2 * reach + 1, 2 * reach + 1))
+
+    def edges_near(self, entity_indices: list, min_x: float, min_y: float, max_x: float, max_y: float) -> list:
+        """
+        Returns the edges of the given entities that may touch a box, as (first_edge, last_edge) ranges of the flat
+        arrays, merged when contiguous. Entities with an edge BVH only give the edges whose boxes overlap the box.
+        """
+        edge_ranges = []
+        for index in entity_indices:
+            slot_start = int(self.slot_starts[index])
+            bvh = self.bvhs[index]
+            if bvh is None:
+                entity_ranges = ((0, int(self.edge_counts[index])),)
+            else:
+                entity_ranges = bvh.query(min_x, min_y, max_x, max_y)
+            for first_edge, last_edge in entity_ranges:
+                first_edge += slot_start
+                last_edge += slot_start
+                if edge_ranges and edge_ranges[-1][1] == first_edge:
+                    edge_ranges[-1] = (edge_ranges[-1][0], last_edge)
+                elif last_edge > first_edge:
+                    edge_ranges.append((first_edge, last_edge))
+        return edge_ranges
+
+    def gather(self, edge_ranges: list) -> tuple:
+        """
+        Gathers the edge arrays of a list of ranges. A single range (the usual case) is returned as views.
+
+        :return: (starts, vectors, inv_length_sq, owners)
+        """
+        if len(edge_ranges) == 1:
+            first_edge, last_edge = edge_ranges[0]
+            return (self.starts[first_edge:last_edge], self.vectors[first_edge:last_edge],
+                    self.inv_length_sq[first_edge:last_edge], self.edge_owners[first_edge:last_edge])
+        return tuple(np.concatenate([array[first_edge:last_edge] for first_edge, last_edge in edge_ranges])
+                     for array in (self.starts, self.vectors, self.inv_length_sq, self.edge_owners))
+
+    def deepest_contact(self, ball_center, ball_radius, entity_indices: list):
+        """
+        Finds the deepest contact between the ball and the given entities.
+
+        Returns:
+            (entity_index, normal_vector, depth_value) or None if no collision.
+        """
+        edge_ranges = self.edges_near(entity_indices, ball_center[0] - ball_radius, ball_center[1] - ball_radius,
+                                      ball_center[0] + ball_radius, ball_center[1] + ball_radius)
+        if not edge_ranges:
+            return None
+
+        starts, vectors, inv_length_sq, owners = self.gather(edge_ranges)
+        edge_index, offset, dist_sq = narrow_phase.closest_edge(starts, vectors, inv_length_sq, ball_center)
+        normal, depth = narrow_phase.contact_from_offset(offset, dist_sq, ball_radius)
+        if normal is None:
+            return None
+        return int(owners[edge_index]), normal, depth
+
+    def contact_manifold(self, ball_center, ball_radius, entity_indices: list, margin: float = 0.0) -> list:
+        """
+        Finds every contact between the ball and the given entities, one per direction the ball is pushed
+        towards (see narrow_phase.merge_contacts). Surfaces closer to the ball than the margin are included with
+        a negative depth.
+
+        Returns:
+            List of (entity_index, normal_vector, depth_value, edge_index), the deepest first. edge_index is the
+            index of the touched edge in the flat arrays (see edge).
+        """
+        reach = ball_radius + margin
+        edge_ranges = self.edges_near(entity_indices, ball_center[0] - reach, ball_center[1] - reach,
+                                      ball_center[0] + reach, ball_center[1] + reach)
+        if not edge_ranges:
+            return []
+
+        starts, vectors, inv_length_sq, owners = self.gather(edge_ranges)
+        contacts = narrow_phase.touching_edges(starts, vectors, inv_length_sq, ball_center, ball_radius, margin)
+        return [(int(owners[edge_index]), normal, depth, self.flat_edge_index(edge_ranges, edge_index))
+                for edge_index, normal, depth in narrow_phase.merge_contacts(contacts)]
+
+    @staticmethod
+    def flat_edge_index(edge_ranges: list, gathered_index: int) -> int:
+        """Converts the index of an edge in the arrays returned by gather to its index in the flat arrays"""
+        for first_edge, last_edge in edge_ranges:
+            if gathered_index < last_edge - first_edge:
+                return first_edge + gathered_index
+            gathered_index -= last_edge - first_edge
+        return None
+
+    def edge(self, edge_index: int) -> tuple:
+        """
+        Returns an edge of the flat arrays.
+
+        :param edge_index: Index of the edge, as returned by contact_manifold.
+        :return: (start, vector) as pygame.Vector2, None if the edge is unknown.
+        """
+        if edge_index is None:
+            return None
+        return (pygame.Vector2(float(self.starts[edge_index][0]), float(self.starts[edge_index][1])),
+                pygame.Vector2(float(self.vectors[edge_index][0]), float(self.vectors[edge_index][1])))
+
+    def nearest_distance(self, point, entity_indices: list, max_distance: float = None):
+        """
+        Distance between a point and the closest edge of the given entities.
+        If max_distance is given, edges further away than it may be skipped.
+
+        :return: The distance, or None if no edge was tested.
+        """
+        if max_distance is None:
+            edge_ranges = self.edges_near(entity_indices, -math.inf, -math.inf, math.inf, math.inf)
+        else:
+            edge_ranges = self.edges_near(entity_indices, point[0] - max_distance, point[1] - max_distance,
+                                          point[0] + max_distance, point[1] + max_distance)
+        if not edge_ranges:
+            return None
+
+        starts, vectors, inv_length_sq, _ = self.gather(edge_ranges)
+        _, _, dist_sq = narrow_phase.closest_edge(starts, vectors, inv_length_sq, point)
+        return dist_sq ** 0.5
+
+    def time_of_impact(self, start, motion, radius, entity_indices: list):
+        """
+        First impact of a moving circle against the given entities (see ccd.time_of_impact).
+
+        Returns:
+            (toi, entity_index, normal) or None if nothing is touched.
+        """
+        end = (start[0] + motion[0], start[1] + motion[1])
+        edge_ranges = self.edges_near(entity_indices, min(start[0], end[0]) - radius, min(start[1], end[1]) - radius,
+                                      max(start[0], end[0]) + radius, max(start[1], end[1]) + radius)
+        if not edge_ranges:
+            return None
+
+        starts, vectors, inv_length_sq, owners = self.gather(edge_ranges)
+        impact = ccd.time_of_impact(start, motion, radius, starts, vectors, inv_length_sq)
+        if impact is None:
+            return None
+        toi, edge_index, normal = impact
+        return toi, int(owners[edge_index]), normal
@@ -0,0 +1,108 @@
+import numpy as np
+
+BVH_LEAF_SIZE = 8  # Number of consecutive edges grouped in a leaf
+
+
+class EdgeBVH:
+    """
+        Bounding volume hierarchy (AABB tree) over the edges of one entity.
+        The edges of a polygon outline follow each other, so consecutive edges are spatially close: leaves group
+        BVH_LEAF_SIZE consecutive edges and every node covers a contiguous range of edges. A query returns the
+        ranges of edges whose boxes overlap the queried box, visiting O(log n) nodes for a ball-sized box.
+    """
+
+    def __init__(self, starts: np.ndarray, vectors: np.ndarray):
+        """
+        Builds the tree.
+
+        :param starts: (N, 2) array of the edges start points.
+        :param vectors: (N, 2) array of the edges vectors.
+        """
+        ends = starts + vectors
+        self.edge_mins = np.minimum(starts, ends)
+        self.edge_maxs = np.maximum(starts, ends)
+
+        # Nodes are (min_x, min_y, max_x, max_y, left_child, right_child, first_edge, last_edge), -1 for no child
+        self.nodes = []
+        if len(starts):
+            self.build(0, len(starts))
+        self.leaves = [index for index, node in enumerate(self.nodes) if node[4] == -1]
+
+    def build(self, first_edge: int, last_edge: int) -> int:
+        """
+        Recursively builds the node covering the edges [first_edge, last_edge).
+
+        :return: The index of the node.
+        """
+        min_x, min_y = self.edge_mins[first_edge:last_edge].min(axis=0)
+        max_x, max_y = self.edge_maxs[first_edge:last_edge].max(axis=0)
+        index = len(self.nodes)
+        self.nodes.append(None)
+
+        left = right = -1
+        if last_edge - first_edge > BVH_LEAF_SIZE:
+            # Split on a leaf boundary so that leaves stay full
+            leaves = (last_edge - first_edge + BVH_LEAF_SIZE - 1) // BVH_LEAF_SIZE
+            middle = first_edge + (leaves // 2) * BVH_LEAF_SIZE
+            left = self.build(first_edge, middle)
+            right = self.build(middle, last_edge)
+
+        self.nodes[index] = (float(min_x), float(min_y), float(max_x), float(max_y), left, right, first_edge, last_edge)
+        return index
+
+    def refit(self, starts: np.ndarray, vectors: np.ndarray):
+        """
+        Updates the boxes of the nodes after the edges moved, keeping the tree. The edges of a rigid body stay
+        in the same order and close to each other, so a refit is enough and much cheaper than a rebuild.
+
+        :param starts: (N, 2) array of the new edges start points, N being the number of edges of the tree.
+        :param vectors: (N, 2) array of the new edges vectors.
+        """
+        ends = starts + vectors
+        self.edge_mins = np.minimum(starts, ends)
+        self.edge_maxs = np.maximum(starts, ends)
+        if not self.nodes:
+            return
+
+        # Every leaf at once, then the inner nodes from their children (children come after their parent)
+        leaf_firsts = [self.nodes[index][6] for index in self.leaves]
+        leaf_mins = np.minimum.reduceat(self.edge_mins, leaf_firsts, axis=0).tolist()
+        leaf_maxs = np.maximum.reduceat(self.edge_maxs, leaf_firsts, axis=0).tolist()
+        for index, (min_x, min_y), (max_x, max_y) in zip(self.leaves, leaf_mins, leaf_maxs):
+            node = self.nodes[index]
+            self.nodes[index] = (min_x, min_y, max_x, max_y) + node[4:]
+
+        for index in range(len(self.nodes) - 1, -1, -1):
+            node = self.nodes[index]
+            if node[4] == -1:
+                continue
+            left, right = self.nodes[node[4]], self.nodes[node[5]]
+            self.nodes[index] = (min(left[0], right[0]), min(left[1], right[1]),
+                                 max(left[2], right[2]), max(left[3], right[3])) + node[4:]
+
+    def query(self, min_x: float, min_y: float, max_x: float, max_y: float) -> list:
+        """
+        Finds the edges whose bounding box overlaps a box.
+
+        :return: List of (first_edge, last_edge) ranges, merged when contiguous.
+        """
+        ranges = []
+        if not self.nodes:
+            return ranges
+
+        stack = [0]
+        while stack:
+            node_min_x, node_min_y, node_max_x, node_max_y, left, right, first_edge, last_edge = self.nodes[stack.pop()]
+            if node_min_x > max_x or node_max_x < min_x or node_min_y > max_y or node_max_y < min_y:
+                continue
+            if left == -1:
+                if ranges and ranges[-1][1] == first_edge:
+                    ranges[-1] = (ranges[-1][0], last_edge)
+                else:
+                    ranges.append((first_edge, last_edge))
+            else:
+                # Right first so that the left child is popped first and ranges come out in order
+                stack.append(right)
+                stack.append(left)
+
+        return ranges
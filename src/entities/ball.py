@@ -1,4 +1,4 @@
-﻿from math import floor
+﻿from math import floor, inf
 import pygame
 
 
@@ -22,6 +22,10 @@ class Ball:
 
         self.is_moving = False
         self.is_colliding = False
+        self.rolling_contact = None  # physics.RollingContact of the edge the ball rolls on, None in free flight
+        self.sleep_anchor = None  # Position the ball must stay around to fall asleep (see physics.update_sleep)
+        self.sleep_time = 0.0  # Time spent settling around sleep_anchor, in seconds
+        self.time_since_contact = inf  # Time since the ball last touched a surface, in seconds (contact friction)
         self.image_path = image_path
 
         self.force = 0
@@ -1,6 +1,13 @@
-﻿import pygame
+﻿import math
+
+import numpy as np
+import pygame
 from pygame.transform import rotate
 
+from src.materials import OBSTACLE_MATERIAL, material_id
+from src.narrow_phase import EdgeArrays
+from src.outline import image_outline, rotate_outline
+
 
 class Obstacle:
     def __init__(self, position: pygame.Vector2, image_path: str, size: int = 100, is_colliding: bool = True,
@@ -10,6 +17,7 @@ class Obstacle:
         self.position = position.copy()  # Use .copy() to avoid references
         self.shift = pygame.Vector2(0, 0)
         self.is_colliding = is_colliding  # Value to false for decorative elements
+        self.material_id = material_id(OBSTACLE_MATERIAL)
         self.moving = False  # Define if we are placing the obstacle
         self.nb_points = nb_points  # Number of points to keep for the mask
 
@@ -25,18 +33,22 @@ class Obstacle:
 
         # Resize the image
         self.image = pygame.transform.scale(self.original_image, (self.size, int(self.size * self.aspect_ratio)))
-        self.mask = pygame.mask.from_surface(self.image.convert_alpha())
-        self.points = self.mask.outline()
-        self.points = self.reduce_nb_points(self.points, self.nb_points)
+        self.points = image_outline(self.image_path, self.image, self.nb_points)
 
         self.transparent_surface = pygame.Surface(self.image.get_size(), pygame.SRCALPHA)
 
         # Rotation attributes
         self.angle = angle  # in degrees
         self.rotated_image = self.image.copy()  # Store the rotated image
-        self.rotated_mask = self.mask.copy()  # Store the rotated mask
         self.rotated_points = self.points.copy()  # Store rotated points
 
+        # Edge arrays for the narrow-phase, with the position they were built for
+        self.collision_edges = None
+        self.collision_edges_position = None
+
+        self.motion = None  # Optional kinematics.KinematicMotion animating the obstacle (level json "motion")
+        self.base_edges = None  # EdgeArrays of the outline relative to the image center, cached by set_pose
+
         # Rotate the image a first time to ensure it is in the correct position
         self.rotate(self.angle)
         self.rect = self.rotated_image.get_rect(topleft=(self.position.x, self.position.y))
@@ -50,9 +62,7 @@ class Obstacle:
         # Recalculate the height based on the aspect ratio
         height = int(size * self.aspect_ratio)
         self.image = pygame.transform.scale(self.original_image, (size, height))
-        self.mask = pygame.mask.from_surface(self.image.convert_alpha())
-        self.points = self.mask.outline()
-        self.points = self.reduce_nb_points(self.points, self.nb_points)
+        self.points = image_outline(self.image_path, self.image, self.nb_points)
         self.rotated_points = self.points.copy()  # Update the rotated points
         self.transparent_surface = pygame.Surface(self.image.get_size(), pygame.SRCALPHA)
         self.rotate(self.angle) # Keep the rotation when resized
@@ -63,13 +73,45 @@ class Obstacle:
         new_width = max(20, int(mouse_pos.x - self.position.x))
         self.resize(new_width)
 
-    def reduce_nb_points(self, points, nb_points: int = 100):
-        """Reduce the number of contour points to optimize performance"""
-        if len(points) <= nb_points:
-            return points
-        step = max(1, len(points) // nb_points)
-        point_new = [points[i] for i in range(0, len(points), step)]
-        return point_new
+    def get_collision_edges(self) -> EdgeArrays:
+        """
+        Returns the edges of the rotated outline in world coordinates as contiguous arrays,
+        rebuilt only when the obstacle has been moved, rotated or resized.
+        """
+        if self.collision_edges is None or self.collision_edges_position != self.position:
+            self.collision_edges = EdgeArrays([(p[0] + self.position.x, p[1] + self.position.y)
+                                               for p in self.rotated_points])
+            self.collision_edges_position = self.position.copy()
+        return self.collision_edges
+
+    def set_pose(self, center: pygame.Vector2, angle: float):
+        """
+        Moves and rotates the obstacle around its center, for the kinematic obstacles animated every frame.
+        The outline is transformed from the base points cached on the first call instead of being rotated
+        point by point, and the image is only rotated again when the angle changed.
+
+        :param center: New center of the obstacle, in world coordinates.
+        :param angle: New rotation angle, in degrees.
+        """
+        if self.base_edges is None:
+            width, height = self.image.get_size()
+            self.base_edges = EdgeArrays(np.asarray(self.points, dtype=np.float64).reshape(-1, 2) +
+                                         (0.5 - width / 2, 0.5 - height / 2))
+        angle %= 360
+        if angle != self.angle:
+            self.angle = angle
+            self.rotated_image = pygame.transform.rotate(self.image, self.angle)
+
+        # Same transform as rotate_outline, around the image center
+        cos = math.cos(math.radians(self.angle))
+        sin = math.sin(math.radians(self.angle))
+        self.collision_edges = self.base_edges.rigid_transform(cos, sin, center.x - 0.5, center.y - 0.5)
+
+        width, height = self.rotated_image.get_size()
+        self.position = pygame.Vector2(center.x - width / 2, center.y - height / 2)
+        self.rect = self.rotated_image.get_rect(topleft=(self.position.x, self.position.y))
+        self.rotated_points = (self.collision_edges.starts - (self.position.x, self.position.y)).tolist()
+        self.collision_edges_position = self.position.copy()
 
     def draw_points(self, screen: pygame.Surface):
         """Display the contour points (debug)"""
@@ -140,7 +182,8 @@ class Obstacle:
         """Rotate the obstacle by a given angle in degrees."""
         self.angle = angle_degrees % 360  # Keep angle within 0-360 range
         self.rotated_image = pygame.transform.rotate(self.image, self.angle)
-        self.rotated_mask = pygame.mask.from_surface(self.rotated_image.convert_alpha())
 
-        self.rotated_points = self.rotated_mask.outline()
-        self.rotated_points = self.reduce_nb_points(self.rotated_points, self.nb_points)
\ No newline at end of file
+        # The outline is rotated with the image instead of being traced again from a mask
+        self.rotated_points = rotate_outline(self.points, self.image.get_size(), self.rotated_image.get_size(),
+                                             self.angle)
+        self.collision_edges = None
\ No newline at end of file
@@ -1,6 +1,9 @@
 ﻿import pygame
 import math
 
+from src.materials import get_material_table
+from src.narrow_phase import EdgeArrays
+
 
 class Terrain:
     def __init__(self, terrain_type: str, vertices: list):
@@ -19,6 +22,7 @@ class Terrain:
             raise ValueError("Terrain must have at least two points.")
 
         self.original_points = self.points.copy()
+        self.collision_edges = None  # Edge arrays for the narrow-phase, built on first use
 
         # Calculate the rect (bounding box) of the polygon
         # Find min/max x and y coordinates
@@ -40,32 +44,11 @@ class Terrain:
         pygame.draw.polygon(self.surface_collision, (255, 255, 255), shifted_points)
 
         self.mask = pygame.mask.from_surface(self.surface_collision)
-        friction_factor = {
-            'green': 0.2,
-            'fairway': 0.3,
-            'bunker': 0.7,
-            'lake': -1,
-            'rocks': 0.25,
-            'dirt': 0.4,
-            'darkgreen': 0.4,
-            'darkrocks': 0.3,
-            'darkdirt': 0.6,
-            "void": -1,
-        }
-        self.friction = friction_factor[self.terrain_type]
-        bounce = {
-            'green': 0.4,  # Moderate-low bounce, promotes roll.
-            'fairway': 0.5,  # Standard moderate bounce.
-            'bunker': 0.15,  # Very low bounce, absorbs energy.
-            'lake': -1,
-            'rocks': 0.7,  # High bounce.
-            'dirt': 0.35,  # Moderate-low bounce.
-            'darkgreen': 0.3,  # Low bounce (like rough).
-            'darkrocks': 0.65,  # High bounce, slightly less than clean rocks.
-            'darkdirt': 0.3,  # Low bounce (softer/looser dirt).
-            "void": -1,
-        }
-        self.bounce_factor = bounce[self.terrain_type]
+        # Material of the zone, its properties are read once from the material table
+        materials = get_material_table()
+        self.material_id = materials.id_of(self.terrain_type)
+        self.friction = float(materials.friction[self.material_id])
+        self.bounce_factor = float(materials.bounce[self.material_id])
 
     def draw_polygon(self, screen: pygame.Surface, points: list = None):
         """
@@ -73,29 +56,17 @@ class Terrain:
         :param surface: The main draw surface to draw the terrain on.
         """
 
-        colors = {
-            'green': (62, 179, 62),  # @Lucas ici pour la couleur des terrains
-            'fairway': (62, 133, 54),
-            'bunker': (255, 197, 106),
-            'lake': (46, 118, 201),
-            'rocks': (156, 151, 144),
-            'dirt': (130, 99, 54),
-            'darkgreen': (49, 110, 46),
-            'darkrocks': (128, 128, 128),
-            'darkdirt': (87, 59, 19),
-            'void': (0, 0, 0, 0)
-        }
-        
-        color = colors.get(self.terrain_type, (255, 255, 255))
+        color = get_material_table().colors[self.material_id]
         if points is None:
             points = self.points
         if len(points) > 2:
-    
-            if self.terrain_type == 'void':
-                surface = pygame.Surface((10000, 30), pygame.SRCALPHA)
-                pygame.draw.polygon(surface, color, points)
-            else:
-                pygame.draw.polygon(screen, color, points)
+            pygame.draw.polygon(screen, color, points)
+
+    def get_collision_edges(self) -> EdgeArrays:
+        """Returns the edges of the polygon as contiguous arrays for the vectorized narrow-phase"""
+        if self.collision_edges is None:
+            self.collision_edges = EdgeArrays(self.points)
+        return self.collision_edges
 
     def shift_poly(self, shift: pygame.Vector2):
         """
@@ -103,6 +74,7 @@ class Terrain:
             DO NOT GIVE COORDINATES OF CAMERA
         """
         self.points = [(point[0] - shift.x, point[1] - shift.y) for point in self.points]
+        self.collision_edges = None
 
     def update(self, screen: pygame.Surface, camera_movement: pygame.Vector2):
         self.shift_poly(camera_movement)
@@ -1,5 +1,7 @@
 import pygame
 
+from src.outline import image_outline, rotate_outline
+
 
 class Obstacle:
     def __init__(self, position: pygame.Vector2, image_path: str, size: int = 100, is_colliding: bool = True,
@@ -24,16 +26,13 @@ class Obstacle:
 
         # Resize the image
         self.image = pygame.transform.scale(self.original_image, (self.size, int(self.size * self.aspect_ratio)))
-        self.mask = pygame.mask.from_surface(self.image.convert_alpha())
-        self.points = self.mask.outline()
-        self.points = self.reduce_nb_points(self.points, self.nb_points)
+        self.points = image_outline(self.image_path, self.image, self.nb_points)
 
         self.transparent_surface = pygame.Surface(self.image.get_size(), pygame.SRCALPHA)
 
         # Rotation attributes
         self.angle = 0  # in degrees
         self.rotated_image = self.image.copy()  # Store the rotated image
-        self.rotated_mask = self.mask.copy()  # Store the rotated mask
         self.rotated_points = self.points.copy()  # Store rotated points
 
         # Rotate the image a first time to ensure it is in the correct position
@@ -47,9 +46,7 @@ class Obstacle:
         # Recalculate the height based on the aspect ratio
         height = int(size * self.aspect_ratio)
         self.image = pygame.transform.scale(self.original_image, (size, height))
-        self.mask = pygame.mask.from_surface(self.image.convert_alpha())
-        self.points = self.mask.outline()
-        self.points = self.reduce_nb_points(self.points, self.nb_points)
+        self.points = image_outline(self.image_path, self.image, self.nb_points)
         self.rotated_points = self.points.copy()  # Update the rotated points
         self.transparent_surface = pygame.Surface(self.image.get_size(), pygame.SRCALPHA)
         self.rotate(self.angle) # Keep the rotation when resized
@@ -60,14 +57,6 @@ class Obstacle:
         new_width = max(20, int(mouse_pos.x - self.position.x))
         self.resize(new_width)
 
-    def reduce_nb_points(self, points, nb_points: int = 100):
-        """Reduce the number of contour points to optimize performance"""
-        if len(points) <= nb_points:
-            return points
-        step = max(1, len(points) // nb_points)
-        point_new = [points[i] for i in range(0, len(points), step)]
-        return point_new
-
     def draw_points(self, screen: pygame.Surface):
         """Display the contour points (debug)"""
         for point in self.rotated_points:
@@ -131,7 +120,7 @@ class Obstacle:
         """Rotate the obstacle by a given angle in degrees."""
         self.angle = angle_degrees % 360  # Keep angle within 0-360 range
         self.rotated_image = pygame.transform.rotate(self.image, self.angle)
-        self.rotated_mask = pygame.mask.from_surface(self.rotated_image.convert_alpha())
 
-        self.rotated_points = self.rotated_mask.outline()
-        self.rotated_points = self.reduce_nb_points(self.rotated_points, self.nb_points)
\ No newline at end of file
+        # The outline is rotated with the image instead of being traced again from a mask
+        self.rotated_points = rotate_outline(self.points, self.image.get_size(), self.rotated_image.get_size(),
+                                             self.angle)
\ No newline at end of file
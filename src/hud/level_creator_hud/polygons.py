@@ -1,6 +1,8 @@
 import math
 import pygame
 
+from src.materials import get_material_table
+
 
 class Polygon:
     def __init__(self, terrain_type="fairway", points: list = None, compensates=False):
@@ -18,20 +20,9 @@ class Polygon:
 
     def draw_polygon(self, screen: pygame.Surface):
 
-        colors = {
-            'green': (62,179,62), # @Lucas ici pour la couleur des terrains
-            'fairway': (62, 133, 54),
-            'bunker': (255, 197, 106),
-            'lake': (46,118,201),
-            'rocks': (156, 151, 144),#
-            'dirt': (130, 99, 54),
-            'darkgreen': (49, 110, 46),
-            'darkrocks': (128, 128, 128),
-            'darkdirt': (87, 59, 19)
-        }
-
         if len(self.points) > 2:
-            pygame.draw.polygon(screen, colors[self.terrain_type], self.points)
+            materials = get_material_table()
+            pygame.draw.polygon(screen, materials.colors[materials.id_of(self.terrain_type)], self.points)
 
     def shift_poly(self, shift: pygame.Vector2):
         """
@@ -0,0 +1,135 @@
+import pygame
+
+
+class KinematicMotion:
+    """
+        Scripted motion of a moving obstacle (sliding block, elevator, windmill): its center follows a path at a
+        constant speed and it rotates at a constant angular speed. The motion only depends on the time, so the
+        obstacle is where it should be whatever the frame rate.
+    """
+
+    def __init__(self, path: list = None, speed: float = 0.0, loop: bool = False, angular_speed: float = 0.0):
+        """
+        :param path: List of (x, y) offsets of the center from its position in the level, in world coordinates.
+                     The first point is usually (0, 0).
+        :param speed: Speed along the path, in pixels/s.
+        :param loop: If True the path is closed and followed in circles, otherwise it is followed back and forth.
+        :param angular_speed: Rotation speed, in degrees/s (counterclockwise, as pygame.transform.rotate).
+        """
+        self.path = [pygame.Vector2(point) for point in (path or [(0, 0)])]
+        if loop and len(self.path) > 1:
+            self.path.append(self.path[0])
+        self.speed = speed
+        self.loop = loop
+        self.angular_speed = angular_speed
+
+        # Distance along the path at each point
+        self.distances = [0.0]
+        for start, end in zip(self.path, self.path[1:]):
+            self.distances.append(self.distances[-1] + start.distance_to(end))
+        self.length = self.distances[-1]
+
+    def offset_at(self, time: float) -> pygame.Vector2:
+        """Offset of the center from its position in the level at a time, in seconds"""
+        if self.length <= 0 or self.speed == 0:
+            return pygame.Vector2(self.path[0])
+
+        travelled = self.speed * time
+        if self.loop:
+            distance = travelled % self.length
+        else:
+            distance = travelled % (2 * self.length)
+            if distance > self.length:
+                distance = 2 * self.length - distance  # On the way back
+
+        for index in range(1, len(self.distances)):
+            if distance <= self.distances[index]:
+                segment = self.distances[index] - self.distances[index - 1]
+                ratio = (distance - self.distances[index - 1]) / segment if segment > 0 else 0.0
+                return self.path[index - 1].lerp(self.path[index], ratio)
+        return pygame.Vector2(self.path[-1])
+
+    def rotation_at(self, time: float) -> float:
+        """Rotation added to the angle of the obstacle at a time, in degrees"""
+        return self.angular_speed * time
+
+
+def motion_from_json(data: dict):
+    """
+    Reads the "motion" of an obstacle of a level json file, in level coordinates (y towards the top):
+
+        "motion": {"path": [{"x": 0, "y": 0}, {"x": 0, "y": 200}], "speed": 80, "loop": false, "angular_speed": 90}
+
+    Every key is optional.
+
+    :param data: The motion dictionary, or None.
+    :return: The KinematicMotion, or None if the obstacle does not move.
+    """
+    if not data:
+        return None
+    path = [(point.get("x", 0), -point.get("y", 0)) for point in data.get("path", [])]
+    return KinematicMotion(path, data.get("speed", 0.0), data.get("loop", False), data.get("angular_speed", 0.0))
+
+
+class KinematicBody:
+    """Obstacle animated by its KinematicMotion, from the pose it has in the level"""
+
+    def __init__(self, obstacle):
+        """
+        :param obstacle: Obstacle with a motion.
+        """
+        self.obstacle = obstacle
+        self.motion = obstacle.motion
+        self.origin = pygame.Vector2(obstacle.rect.center)
+        self.base_angle = obstacle.angle
+        self.center = pygame.Vector2(self.origin)
+        self.angle = self.base_angle
+
+    def update(self, time: float) -> bool:
+        """
+        Puts the obstacle in its pose at a time.
+
+        :param time: Time since the level started, in seconds.
+        :return: True if the obstacle moved.
+        """
+        center = self.origin + self.motion.offset_at(time)
+        angle = (self.base_angle + self.motion.rotation_at(time)) % 360
+        if center == self.center and angle == self.angle:
+            return False
+        self.center, self.angle = center, angle
+        self.obstacle.set_pose(center, angle)
+        return True
+
+
+def build_kinematic_bodies(obstacles: list) -> list:
+    """Returns a KinematicBody for every obstacle of the list with a motion"""
+    return [KinematicBody(obstacle) for obstacle in obstacles if getattr(obstacle, 'motion', None) is not None]
+
+
+def update_kinematic_bodies(bodies: list, time: float, world=None) -> list:
+    """
+    Animates the kinematic bodies. Only the moved bodies are written back to the collision world, each in its own
+    slot with its edge tree refitted (see CollisionWorld.update_entity): the world is never rebuilt.
+
+    :param bodies: List of KinematicBody.
+    :param time: Time since the level started, in seconds.
+    :param world: Optional CollisionWorld holding the collidable bodies.
+    :return: The list of the bodies that moved.
+    """
+    moved = [body for body in bodies if body.update(time)]
+    if world is not None:
+        for body in moved:
+            if id(body.obstacle) in world.indices:
+                world.update_entity(body.obstacle, rigid=True)
+    return moved
+
+
+def touches_ball(bodies: list, ball) -> bool:
+    """
+    Tells whether a collidable body touches the ball, so that a resting ball reached by a moving obstacle wakes up.
+
+    :param bodies: List of KinematicBody, usually the bodies that just moved.
+    :param ball: The Ball object.
+    """
+    ball_area = ball.rect.inflate(2, 2)
+    return any(body.obstacle.is_colliding and body.obstacle.rect.colliderect(ball_area) for body in bodies)
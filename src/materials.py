@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+import pygame
+
+MATERIALS_PATH = "data/materials/materials.json"
+OBSTACLE_MATERIAL = "obstacle"  # Material of the collidable obstacles
+DEFAULT_COLOR = (255, 255, 255)
+
+material_table = None  # MaterialTable loaded on first use by get_material_table
+
+
+class MaterialTable:
+    """
+        Properties of every material, loaded once. Each material name is interned as a small integer ID carried
+        by the entities, the physics and the rendering index the flat arrays below with it instead of looking up
+        strings on every contact or draw.
+    """
+
+    def __init__(self, materials: list):
+        """
+        :param materials: List of the material descriptions, as read from the materials json file. Each one has a
+                          name, a friction, a bounce and a color, and optional lists of sound files
+                          (collision_sounds, hazard_sounds). A negative friction makes the material a hazard.
+        """
+        self.names = [material["name"] for material in materials]
+        self.ids = {name: material_id for material_id, name in enumerate(self.names)}
+        self.friction = np.array([material["friction"] for material in materials], dtype=np.float64)
+        self.bounce = np.array([material["bounce"] for material in materials], dtype=np.float64)
+        self.colors = [tuple(material.get("color", DEFAULT_COLOR)) for material in materials]
+        self.collision_sound_paths = [material.get("collision_sounds", []) for material in materials]
+        self.hazard_sound_paths = [material.get("hazard_sounds", []) for material in materials]
+
+    def __len__(self):
+        return len(self.names)
+
+    def id_of(self, name: str) -> int:
+        """
+        Returns the ID of a material.
+
+        :param name: Name of the material (terrain type).
+        :raises KeyError: If the material is unknown.
+        """
+        return self.ids[name]
+
+    def load_sounds(self, sound_paths: list) -> list:
+        """
+        Loads the sounds of every material, each file being loaded once.
+
+        :param sound_paths: collision_sound_paths or hazard_sound_paths.
+        :return: List of the lists of pygame.mixer.Sound, indexed by material ID.
+        """
+        loaded = {}
+        sounds = []
+        for paths in sound_paths:
+            for path in paths:
+                if path not in loaded:
+                    loaded[path] = pygame.mixer.Sound(path)
+            sounds.append([loaded[path] for path in paths])
+        return sounds
+
+
+def load_material_table(file_path: str = MATERIALS_PATH) -> MaterialTable:
+    """
+    Loads a material table from a json file.
+
+    :param file_path: Path of the json file, a list of material descriptions.
+    """
+    with open(file_path) as json_file:
+        return MaterialTable(json.load(json_file))
+
+
+def get_material_table() -> MaterialTable:
+    """Returns the material table of the game, loaded from MATERIALS_PATH on first use"""
+    global material_table
+    if material_table is None:
+        material_table = load_material_table()
+    return material_table
+
+
+def material_id(name: str) -> int:
+    """Returns the ID of a material of the game table"""
+    return get_material_table().id_of(name)
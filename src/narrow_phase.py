@@ -0,0 +1,150 @@
+import numpy as np
+import pygame
+
+MANIFOLD_NORMAL_TOLERANCE = 0.95  # Contacts whose normals have a larger cosine are the same contact of a manifold
+
+
+class EdgeArrays:
+    """
+        Edges of a closed polygon (or of independent segments) stored as contiguous NumPy arrays, so that the
+        narrow-phase can test all of them at once instead of walking them one by one.
+    """
+
+    def __init__(self, points, ends=None):
+        """
+        Builds the edge arrays of a closed polygon.
+
+        :param points: List of the polygon points in world coordinates.
+        :param ends: Optional list of segment end points. When given, points are the start points of independent
+                     segments instead of a closed polygon.
+        """
+        points_array = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if ends is not None:
+            self.starts = points_array
+            self.vectors = np.asarray(ends, dtype=np.float64).reshape(-1, 2) - points_array
+        else:
+            if len(points_array) < 2:
+                points_array = np.empty((0, 2), dtype=np.float64)
+            self.starts = points_array
+            self.vectors = np.roll(points_array, -1, axis=0) - points_array  # Wrap around to the first point
+        length_sq = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        # Zero length edges are kept with an inverse of 0 so that their closest point is their start
+        self.inv_length_sq = np.divide(1.0, length_sq, out=np.zeros_like(length_sq), where=length_sq > 1e-9)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def rigid_transform(self, cos: float, sin: float, offset_x: float, offset_y: float):
+        """
+        Returns the edges rotated then translated, as a moving rigid body sees them. The lengths do not change,
+        so the inverse squared lengths are shared instead of being computed again.
+
+        :param cos: Cosine of the rotation angle.
+        :param sin: Sine of the rotation angle (same convention as outline.rotate_outline).
+        :param offset_x: Translation along x, applied after the rotation.
+        :param offset_y: Translation along y, applied after the rotation.
+        """
+        transformed = EdgeArrays.__new__(EdgeArrays)
+        xs, ys = self.starts[:, 0], self.starts[:, 1]
+        transformed.starts = np.column_stack((xs * cos + ys * sin + offset_x, ys * cos - xs * sin + offset_y))
+        xs, ys = self.vectors[:, 0], self.vectors[:, 1]
+        transformed.vectors = np.column_stack((xs * cos + ys * sin, ys * cos - xs * sin))
+        transformed.inv_length_sq = self.inv_length_sq
+        return transformed
+
+
+def edge_offsets(starts, vectors, inv_length_sq, center):
+    """
+    Computes the clamped closest point of every edge to a point.
+
+    Returns:
+        (offsets, dist_sq): (N, 2) vectors from the closest point of each edge to the point, and their
+        squared lengths.
+    """
+    center_array = np.array((center[0], center[1]), dtype=np.float64)
+    to_center = center_array - starts
+    t = np.clip(np.einsum("ij,ij->i", to_center, vectors) * inv_length_sq, 0.0, 1.0)
+    offsets = to_center - t[:, None] * vectors
+    return offsets, np.einsum("ij,ij->i", offsets, offsets)
+
+
+def closest_edge(starts, vectors, inv_length_sq, center):
+    """
+    Computes the clamped closest point of every edge to a point and returns the closest one.
+
+    Args:
+        starts: (N, 2) array of the edges start points.
+        vectors: (N, 2) array of the edges vectors (end - start).
+        inv_length_sq: (N,) array of the inverse squared length of each edge (0 for degenerated edges).
+        center: The point to test, as a pygame.Vector2 or a pair of floats.
+
+    Returns:
+        (edge_index, offset, dist_sq): index of the closest edge, vector from the closest point to the
+        point to test, and the squared distance between them.
+    """
+    offsets, dist_sq = edge_offsets(starts, vectors, inv_length_sq, center)
+
+    edge_index = int(np.argmin(dist_sq))
+    return edge_index, offsets[edge_index], float(dist_sq[edge_index])
+
+
+def contact_from_offset(offset, dist_sq, ball_radius):
+    """
+    Converts the offset between the ball center and its closest point into a contact.
+
+    Returns:
+        (normal_vector, depth_value) or (None, 0) if no collision.
+    """
+    if dist_sq >= (ball_radius * ball_radius) + 1e-5:  # Add epsilon for float precision
+        return None, 0
+
+    dist = dist_sq ** 0.5
+    depth = ball_radius - dist
+    if depth <= 1e-5:  # Avoid zero or negative depth
+        return None, 0
+
+    normal = pygame.Vector2(0, -1)  # Default normal
+    if dist > 1e-6:  # Avoid normalization of zero vector
+        normal = pygame.Vector2(float(offset[0]), float(offset[1])) / dist
+    return normal, depth
+
+
+def touching_edges(starts, vectors, inv_length_sq, center, ball_radius, margin=0.0):
+    """
+    Computes the contact of every edge touching the ball, or closer to it than the margin.
+
+    Returns:
+        List of (edge_index, normal_vector, depth_value), the deepest first. The depth of the edges within the
+        margin is negative.
+    """
+    offsets, dist_sq = edge_offsets(starts, vectors, inv_length_sq, center)
+    reach = ball_radius + margin
+    touching = np.nonzero(dist_sq < (reach * reach) + 1e-5)[0]
+
+    contacts = []
+    for edge_index in touching[np.argsort(dist_sq[touching], kind="stable")]:
+        dist = float(dist_sq[edge_index]) ** 0.5
+        normal = pygame.Vector2(0, -1)  # Default normal
+        if dist > 1e-6:  # Avoid normalization of zero vector
+            normal = pygame.Vector2(float(offsets[edge_index][0]), float(offsets[edge_index][1])) / dist
+        contacts.append((int(edge_index), normal, ball_radius - dist))
+    return contacts
+
+
+def merge_contacts(contacts: list, tolerance: float = MANIFOLD_NORMAL_TOLERANCE) -> list:
+    """
+    Builds a contact manifold: of the contacts pushing the ball in the same direction (the edges meeting at a
+    vertex, the segments of a smooth curve), only the deepest one is kept.
+
+    Args:
+        contacts: List of contact tuples whose second item is the normal vector, the deepest first.
+        tolerance: Cosine above which two normals are the same direction.
+
+    Returns:
+        The kept contacts, the deepest first.
+    """
+    manifold = []
+    for contact in contacts:
+        if all(contact[1].dot(kept[1]) < tolerance for kept in manifold):
+            manifold.append(contact)
+    return manifold
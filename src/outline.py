@@ -0,0 +1,192 @@
+import math
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+OUTLINE_TOLERANCE = 0.75  # Maximum distance between the mask outline and its simplified polygon, in pixels
+PROPS_DIR = "assets/images/props"
+IMAGE_OUTLINE_CACHE_SIZE = 256  # Number of outlines kept, the least recently used ones are dropped first
+
+image_outlines = OrderedDict()  # (image_path, width, height, max_points) -> simplified outline of the scaled image
+
+
+def segment_distances(points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """
+    Distances between points and a segment.
+
+    :param points: (N, 2) array of points.
+    :param start: Start point of the segment.
+    :param end: End point of the segment.
+    """
+    vector = end - start
+    length_sq = vector.dot(vector)
+    to_points = points - start
+    if length_sq < 1e-12:
+        return np.hypot(to_points[:, 0], to_points[:, 1])
+    t = np.clip(to_points @ vector / length_sq, 0.0, 1.0)
+    offsets = to_points - t[:, None] * vector
+    return np.hypot(offsets[:, 0], offsets[:, 1])
+
+
+def douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of an open chain of points, both ends being kept.
+
+    :param points: (N, 2) array of the chain points.
+    :param tolerance: Maximum distance between a removed point and the simplified chain, in pixels.
+    :return: (N,) boolean array of the kept points.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = segment_distances(points[first + 1:last], points[first], points[last])
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            middle = first + 1 + index
+            keep[middle] = True
+            stack.append((first, middle))
+            stack.append((middle, last))
+    return keep
+
+
+def simplify_chain(points: list, tolerance: float) -> list:
+    """
+    Simplifies an open chain of points (see douglas_peucker).
+
+    :return: The kept points, in the order of the chain.
+    """
+    if len(points) <= 2:
+        return list(points)
+    keep = douglas_peucker(np.array(points, dtype=np.float64), tolerance)
+    return [points[index] for index in np.nonzero(keep)[0]]
+
+
+def simplify_outline(points: list, tolerance: float = OUTLINE_TOLERANCE, max_points: int = None) -> list:
+    """
+    Simplifies a closed outline (as returned by pygame.mask.Mask.outline) with the Douglas-Peucker algorithm:
+    no point of the outline is further than the tolerance from the simplified polygon. Flat runs become a single
+    edge while sharp tips are kept.
+
+    :param points: Points of the closed outline, the last point being connected to the first one.
+    :param tolerance: Maximum error, in pixels.
+    :param max_points: Optional maximum number of points, the tolerance is raised until it is respected.
+    :return: The kept points, in the order of the outline.
+    """
+    if len(points) <= 3:
+        return list(points)
+
+    closed = np.array(list(points) + [points[0]], dtype=np.float64)
+
+    # A closed outline is split in two chains, at the point the furthest from the first one
+    furthest = int(np.argmax(np.hypot(closed[:-1, 0] - closed[0, 0], closed[:-1, 1] - closed[0, 1])))
+    keep = np.concatenate((douglas_peucker(closed[:furthest + 1], tolerance)[:-1],
+                           douglas_peucker(closed[furthest:], tolerance)))
+
+    simplified = [points[index] for index in np.nonzero(keep[:-1])[0]]
+    if max_points is not None and len(simplified) > max(max_points, 3):
+        return simplify_outline(points, tolerance * 1.25, max_points)
+    return simplified
+
+
+def image_outline(image_path: str, image: pygame.Surface, max_points: int = None) -> list:
+    """
+    Simplified outline of an image, traced from its mask once per (image, size) and then cached:
+    rotating an obstacle or giving it back a recent size never traces a mask again. The cache keeps the
+    IMAGE_OUTLINE_CACHE_SIZE most recently used outlines, the sizes a resize went through are dropped over time.
+
+    :param image_path: Path of the image, used as cache key.
+    :param image: The image, scaled to the size of the obstacle.
+    :param max_points: Optional maximum number of points (see simplify_outline).
+    :return: List of (x, y) points in the image coordinates.
+    """
+    key = (image_path, image.get_width(), image.get_height(), max_points)
+    if key in image_outlines:
+        image_outlines.move_to_end(key)
+        return image_outlines[key]
+
+    outline = pygame.mask.from_surface(image).outline()
+    image_outlines[key] = simplify_outline(outline, OUTLINE_TOLERANCE, max_points)
+    if len(image_outlines) > IMAGE_OUTLINE_CACHE_SIZE:
+        image_outlines.popitem(last=False)
+    return image_outlines[key]
+
+
+def rotate_outline(points: list, size: tuple, rotated_size: tuple, angle: float) -> list:
+    """
+    Moves the points of an image outline the same way pygame.transform.rotate moves the image pixels:
+    counterclockwise rotation around the image center, in a surface grown to rotated_size.
+
+    :param points: Outline in the image coordinates.
+    :param size: (width, height) of the image.
+    :param rotated_size: (width, height) of the rotated image.
+    :param angle: Rotation angle, in degrees.
+    :return: List of (x, y) points in the rotated image coordinates.
+    """
+    cos = math.cos(math.radians(angle))
+    sin = math.sin(math.radians(angle))
+    center_x, center_y = size[0] / 2, size[1] / 2
+    rotated_center_x, rotated_center_y = rotated_size[0] / 2, rotated_size[1] / 2
+
+    rotated = []
+    for x, y in points:
+        dx = x + 0.5 - center_x
+        dy = y + 0.5 - center_y
+        rotated.append((rotated_center_x + dx * cos + dy * sin - 0.5, rotated_center_y - dx * sin + dy * cos - 0.5))
+    return rotated
+
+
+def outline_error(points: list, simplified: list) -> float:
+    """Largest distance between a point of an outline and the closed polygon of its simplified version"""
+    if len(simplified) < 2:
+        return 0.0
+    original = np.array(points, dtype=np.float64)
+    polygon = np.array(simplified, dtype=np.float64)
+    distances = np.full(len(original), np.inf)
+    for start, end in zip(polygon, np.roll(polygon, -1, axis=0)):
+        np.minimum(distances, segment_distances(original, start, end), out=distances)
+    return float(distances.max())
+
+
+def outline_report(props_dir: str = PROPS_DIR, nb_points: int = 150, tolerance: float = OUTLINE_TOLERANCE):
+    """
+    Prints, for every prop image, the number of outline points and the error kept by the previous decimation
+    (one point every len // nb_points) and by simplify_outline.
+
+    :param props_dir: Directory of the prop images.
+    :param nb_points: nb_points given to the obstacles by the level loader.
+    :param tolerance: Tolerance of the simplification, in pixels.
+    """
+    print(f"{'prop':<40}{'outline':>8}{'decimated':>10}{'error':>7}{'simplified':>11}{'error':>7}")
+    totals = [0, 0, 0]
+    for directory, _, file_names in sorted(os.walk(props_dir)):
+        for file_name in sorted(file_names):
+            if not file_name.endswith(".png"):
+                continue
+            image = pygame.image.load(os.path.join(directory, file_name))
+            points = pygame.mask.from_surface(image).outline()
+            if not points:
+                continue
+
+            step = max(1, len(points) // nb_points) if len(points) > nb_points else 1
+            decimated = points[::step]
+            simplified = simplify_outline(points, tolerance, nb_points)
+            totals[0] += len(points)
+            totals[1] += len(decimated)
+            totals[2] += len(simplified)
+
+            name = os.path.relpath(os.path.join(directory, file_name), props_dir)
+            print(f"{name:<40}{len(points):>8}{len(decimated):>10}{outline_error(points, decimated):>7.1f}"
+                  f"{len(simplified):>11}{outline_error(points, simplified):>7.1f}")
+    print(f"{'total':<40}{totals[0]:>8}{totals[1]:>10}{'':>7}{totals[2]:>11}")
+
+
+if __name__ == "__main__":
+    # python -m src.outline [props_dir]
+    outline_report(sys.argv[1] if len(sys.argv) > 1 else PROPS_DIR)
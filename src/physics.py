@@ -1,10 +1,9 @@
-﻿import os
-import random
-
-import pygame
+﻿import pygame
 import math
 
-from src.entities import Obstacle, Terrain
+from src import narrow_phase
+from src.materials import get_material_table
+from src.triggers import TRIGGER_PICKUP
 
 # --- Constants ---
 GRAVITY_ACCELERATION = 980.0  # Gravitational acceleration in pixels/s²
@@ -13,109 +12,382 @@ BALL_STOP_SPEED_THRESHOLD = 8.0  # Speed (pixels/s) below which the ball is cons
 MIN_BOUNCE_VELOCITY_NORMAL = 15.0  # Minimum velocity component normal to surface after bounce
 COLLISION_PENETRATION_PUSH_FACTOR = 1.01  # Factor to push ball out of penetration (slightly > 1)
 MAX_PHYSICS_COLLISION_ITERATIONS = 3  # Max times to re-check collisions within one sub-step
+MANIFOLD_CONTACT_MARGIN = 0.5  # Surfaces closer than this (pixels) to a colliding ball join its contact manifold
+MAX_CCD_IMPACTS = 4  # Max impacts resolved within one continuous step
+CCD_CONTACT_SKIN = 0.05  # Gap (pixels) left between the ball and a surface after a continuous impact
+CCD_GRAZING_TOI = 1e-6  # Fraction of a continuous motion below which an impact is found at the start of the motion
+CCD_GRAZING_SPEED = 1.0  # An impact at the start of a motion slower than this (pixels/s) into the surface is grazing
+ADAPTIVE_MAX_STEP_ERROR = 0.5  # Max position error (pixels) allowed per adaptive step in free flight
+ADAPTIVE_CLEARANCE_SAFETY = 0.5  # Fraction of the clearance the ball may travel in one adaptive step
+CONTACT_FRICTION_INTERVAL = 0.03  # The friction of a material is the tangent speed lost over this time of contact (s),
+                                  # the time between two contacts of a ball bouncing in place
+ROLLING_ENTRY_NORMAL_SPEED = 40.0  # A ball hitting a surface slower than this (pixels/s) rolls on it instead of bouncing
+ROLLING_MAX_NORMAL_SPEED = 1.0  # A rolling ball given a larger normal velocity (pixels/s) leaves its surface
+ROLLING_MIN_SUPPORT = 0.5  # Minimum upward component of the normal of a surface the ball can roll on (60° slope)
+ROLLING_POSITION_TOLERANCE = 0.01  # Distance (pixels) between a rolling ball and its surface past which it left it
+SLEEP_WINDOW = 0.25  # Time (s) the ball must stay slow and in place before it is put to sleep
+SLEEP_MAX_KINETIC_ENERGY = 800.0  # Kinetic energy per unit of mass (pixels²/s², 40 pixels/s) of a settling ball
+SLEEP_MAX_DRIFT_SPEED = 12.0  # Average speed (pixels/s) of a ball creeping down a slope while settling
+SLEEP_MAX_DISPLACEMENT = SLEEP_MAX_DRIFT_SPEED * SLEEP_WINDOW  # Distance (pixels) a settling ball may drift
+
+# --- Physics events ---
+EVENT_COLLISION = "collision"  # The ball bounced on or slid along a surface
+EVENT_HAZARD = "hazard"  # The ball touched a restart zone (water, void)
+EVENT_PICKUP = "pickup"  # The ball went through a pickup
+
+
+class PhysicsEvent:
+    """
+        Something that happened during a physics sub-step.
+        The physics only reports these events, the game layer decides which sounds and scene events they trigger.
+    """
 
-pygame.mixer.init()
+    def __init__(self, kind: str, material: int, position: pygame.Vector2, trigger=None):
+        """
+        :param kind: EVENT_COLLISION, EVENT_HAZARD or EVENT_PICKUP.
+        :param material: Material ID of the touched entity (see materials.MaterialTable), None for the pickups.
+        :param position: Position of the ball when the event happened.
+        :param trigger: The TriggerVolume touched, for the events raised by the trigger volumes.
+        """
+        self.kind = kind
+        self.material = material
+        self.position = position.copy()
+        self.trigger = trigger
 
-grass_sound = pygame.mixer.Sound("assets/audio/sound_effect/rebounds/rebond_herbe.mp3")
-rock_sound_1 = pygame.mixer.Sound("assets/audio/sound_effect/rebounds/rebond_pierre.mp3")
-rock_sound_2 = pygame.mixer.Sound("assets/audio/sound_effect/rebounds/rebond_pierre2.mp3")
 
-rock_sounds = [rock_sound_1, rock_sound_2]
+class RollingContact:
+    """
+        Edge the ball rolls on. While the ball touches this edge only, roll_ball moves it analytically along the
+        edge instead of integrating it into the ground and pushing it back out on every sub-step.
+    """
 
-defeat_effects = []
-for effect in os.listdir("assets/audio/sound_effect/defeat"):
-    sound = pygame.mixer.Sound("assets/audio/sound_effect/defeat/" + effect)
-    defeat_effects.append(sound)
+    def __init__(self, edge_index: int, start: pygame.Vector2, vector: pygame.Vector2, normal: pygame.Vector2,
+                 material: tuple):
+        """
+        :param edge_index: Index of the edge in the flat arrays of the CollisionWorld (see PolygonGeometry.edge on
+                           the reference path).
+        :param start: First vertex of the edge, in world coordinates.
+        :param vector: Vector from the first to the last vertex of the edge.
+        :param normal: Unit normal of the edge, pointing towards the ball.
+        :param material: (bounce, friction, material_id) of the entity of the edge.
+        """
+        self.edge_index = edge_index
+        self.start = start
+        self.vector = vector
+        self.length = vector.length()
+        self.tangent = vector / self.length
+        self.normal = normal
+        self.material = material
+
+class PolygonGeometry:
+    """
+        Level geometry of the reference path of update_ball_physics: the terrain zones and obstacles are walked one
+        edge at a time, without precomputed arrays nor broad-phase. It answers the contact queries of a
+        CollisionWorld, so that both paths share the same contact model (manifolds and rolling contacts). Its edges
+        are identified by (entity_index, edge_number) pairs instead of indices in flat arrays.
+    """
 
-water_effects = []
-for effect in os.listdir("assets/audio/sound_effect/water"):
-    sound = pygame.mixer.Sound("assets/audio/sound_effect/water/" + effect)
-    water_effects.append(sound)
-    
-sand_effect = pygame.mixer.Sound("assets/audio/sound_effect/rebounds/rebond_sable.mp3")
+    def __init__(self, entities: list):
+        """
+        :param entities: Collidable entities (TerrainGroup, Terrain and Obstacle objects), in the order contacts are
+                         resolved.
+        """
+        self.entities = entities
+
+    def edges(self, index: int) -> list:
+        """
+        World edges of an entity, as the CollisionWorld builds them: the closed outline of a Terrain or an Obstacle,
+        the segments of a TerrainGroup.
+
+        :param index: Index of the entity.
+        :return: List of (start, vector) as pygame.Vector2.
+        """
+        edges = self.entities[index].get_collision_edges()
+        return [(pygame.Vector2(start), pygame.Vector2(vector)) for start, vector in zip(edges.starts.tolist(),
+                                                                                          edges.vectors.tolist())]
+
+    def material(self, index: int) -> tuple:
+        """See CollisionWorld.material"""
+        materials = get_material_table()
+        material_id = self.entities[index].material_id
+        return float(materials.bounce[material_id]), float(materials.friction[material_id]), material_id
+
+    def query(self, rect: pygame.Rect) -> list:
+        """See CollisionWorld.query, the rects of the entities are used as bounding boxes"""
+        return [index for index, entity in enumerate(self.entities) if entity.rect.colliderect(rect)]
+
+    def query_around(self, position, distance: float) -> list:
+        """See CollisionWorld.query_around"""
+        reach = math.ceil(distance)
+        return self.query(pygame.Rect(int(position[0]) - reach, int(position[1]) - reach, 2 * reach + 1, 2 * reach + 1))
+
+    def contact_manifold(self, ball_center, ball_radius, entity_indices: list, margin: float = 0.0) -> list:
+        """
+        Finds every contact between the ball and the given entities (see CollisionWorld.contact_manifold).
+
+        Returns:
+            List of (entity_index, normal_vector, depth_value, (entity_index, edge_number)), the deepest first.
+        """
+        reach_sq = (ball_radius + margin) ** 2 + 1e-5  # Add epsilon for float precision
+        contacts = []
+        for index in entity_indices:
+            for edge_number, (p1, edge) in enumerate(self.edges(index)):
+                edge_len_sq = edge.length_squared()
+
+                t = 0.0
+                if edge_len_sq > 1e-9:  # non-zero edge length
+                    t = max(0.0, min(1.0, (ball_center - p1).dot(edge) / edge_len_sq))  # Clamp t to the segment
+                offset = ball_center - (p1 + t * edge)
+                dist_sq = offset.length_squared()
+                if dist_sq >= reach_sq:
+                    continue
+
+                dist = math.sqrt(dist_sq)
+                normal = pygame.Vector2(0, -1)  # Default normal
+                if dist > 1e-6:  # Avoid normalization of zero vector
+                    normal = offset / dist
+                contacts.append((index, normal, ball_radius - dist, (index, edge_number)))
+
+        contacts.sort(key=lambda contact: -contact[2])
+        return narrow_phase.merge_contacts(contacts)
+
+    def edge(self, edge_index: tuple) -> tuple:
+        """
+        Returns an edge of an entity.
+
+        :param edge_index: (entity_index, edge_number) of the edge, as returned by contact_manifold.
+        :return: (start, vector) as pygame.Vector2, None if the edge is unknown.
+        """
+        if edge_index is None:
+            return None
+        index, edge_number = edge_index
+        return self.edges(index)[edge_number]
+
+
+def contact_friction_factor(friction_coeff, contact_time=None):
+    """
+    Fraction of the tangent speed kept after a contact. Friction acts per unit of time: a sustained contact loses
+    the friction of its material over each CONTACT_FRICTION_INTERVAL, whatever the size of the sub-steps, and an
+    impact after a flight loses it once.
 
+    Args:
+        friction_coeff: Friction of the touched material.
+        contact_time: Time (s) since the previous contact of the ball, None for an impact.
+
+    Returns:
+        float: The factor applied to the tangent velocity.
+    """
+    if contact_time is None or contact_time >= CONTACT_FRICTION_INTERVAL:
+        return 1.0 - friction_coeff
+    return (1.0 - friction_coeff) ** (contact_time / CONTACT_FRICTION_INTERVAL)
 
-played_sound = False
 
-def get_polygon_collision_normal_depth(poly_points_world, ball_center_world, ball_radius):
+def bounce_velocity(velocity, normal_vec, bounce_coeff, friction_coeff, minimum_bounce=True, contact_time=None):
     """
-    Calculates collision normal and depth for a circle and a convex polygon.
-    Normal points away from the polygon towards the ball. Depth is penetration.
+    Computes the velocity of the ball after touching a surface.
 
     Args:
-        poly_points_world: List of pygame.Vector2 points defining the polygon in world coordinates.
-        ball_center_world: pygame.Vector2 position of the ball's center in world coordinates.
-        ball_radius: Float radius of the ball.
+        velocity: pygame.Vector2 velocity of the ball before the contact.
+        normal_vec: Unit pygame.Vector2 normal of the surface, pointing towards the ball.
+        bounce_coeff: Restitution of the touched material.
+        friction_coeff: Friction of the touched material, applied to the tangent velocity.
+        minimum_bounce: If True, a significant impact bounces with at least MIN_BOUNCE_VELOCITY_NORMAL.
+        contact_time: Time (s) since the previous contact of the ball (see contact_friction_factor).
 
     Returns:
-        (normal_vector, depth_value) or (None, 0) if no collision.
+        pygame.Vector2: The new velocity.
     """
-    if not poly_points_world or len(poly_points_world) < 2:
-        return None, 0
+    velocity_normal_component_scalar = velocity.dot(normal_vec)
+    normal_velocity_vector = velocity_normal_component_scalar * normal_vec
+    tangent_velocity_vector = velocity - normal_velocity_vector
+
+    if velocity_normal_component_scalar < 0:  # Ball is moving into the surface
+        new_normal_scalar = -velocity_normal_component_scalar * bounce_coeff
+        # Ensure minimum bounce velocity if it was significant before impact
+        if minimum_bounce and abs(new_normal_scalar) < MIN_BOUNCE_VELOCITY_NORMAL and \
+                abs(velocity_normal_component_scalar) > MIN_BOUNCE_VELOCITY_NORMAL / 2:
+            # Preserve sign for bounce direction
+            new_normal_scalar = MIN_BOUNCE_VELOCITY_NORMAL if new_normal_scalar >= 0 else -MIN_BOUNCE_VELOCITY_NORMAL
+        normal_velocity_vector = new_normal_scalar * normal_vec
+
+    # Apply friction to tangent velocity
+    tangent_velocity_vector *= contact_friction_factor(friction_coeff, contact_time)
+    return normal_velocity_vector + tangent_velocity_vector
+
 
-    closest_point_on_poly = None
-    min_dist_sq = float('inf')
+def ball_clearance(ball, world, search_distance):
+    """
+    Distance between the surface of the ball and the closest geometry of the level.
+
+    Args:
+        ball: The Ball object.
+        world: CollisionWorld of the level.
+        search_distance: Only the geometry closer than this distance is looked at.
 
-    # Find the closest point
-    for i in range(len(poly_points_world)):
-        p1 = poly_points_world[i]
-        p2 = poly_points_world[(i + 1) % len(poly_points_world)]  # Wrap around to the first point
-        edge = p2 - p1
-        edge_len_sq = edge.length_squared()
+    Returns:
+        The clearance in pixels, search_distance if nothing is closer.
+    """
+    ball_scaled_radius = ball.radius * ball.scale_value
+    candidate_indices = world.query_around(ball.position, search_distance + ball_scaled_radius)
+
+    distance = world.nearest_distance(ball.position, candidate_indices, search_distance + ball_scaled_radius)
+    if distance is None:
+        return search_distance
+    return max(0.0, min(search_distance, distance - ball_scaled_radius))
+
+
+def adaptive_step_size(speed, clearance, min_dt, max_dt, max_error=ADAPTIVE_MAX_STEP_ERROR):
+    """
+    Chooses the size of the next physics step.
+    The step is limited so that the ball only travels a fraction of its clearance, and so that the
+    position error of the integration under gravity (0.5 * g * dt²) stays below max_error.
+
+    Args:
+        speed: Speed of the ball, in pixels/s.
+        clearance: Distance between the ball and the closest geometry, in pixels.
+        min_dt: Smallest step allowed (the fixed sub-step, used near contact).
+        max_dt: Largest step allowed.
+        max_error: Position error bound per step, in pixels.
+
+    Returns:
+        The step size, in seconds.
+    """
+    step_dt = math.sqrt(2.0 * max_error / GRAVITY_ACCELERATION)
+    if speed > 1e-6:
+        step_dt = min(step_dt, ADAPTIVE_CLEARANCE_SAFETY * clearance / speed)
+    return max(min_dt, min(max_dt, step_dt))
+
+
+def solve_contact_constraints(vector, normals, targets):
+    """
+    Smallest change of a vector so that its component along the normal of every contact reaches the target of the
+    contact (normal_i . result >= target_i). In 2D the smallest change rests against at most two contacts, so every
+    single contact and every pair of contacts is tried: a wedge is solved in one pass instead of alternating
+    between its two surfaces.
+
+    Args:
+        vector: pygame.Vector2 to correct (the push out of the contacts starts from a null vector).
+        normals: Unit pygame.Vector2 normals of the contacts.
+        targets: Minimum component of the result along each normal.
+
+    Returns:
+        (result, active): the corrected vector and the indices of the contacts it rests against.
+    """
+    if len(normals) == 1:
+        missing = targets[0] - normals[0].dot(vector)
+        if missing <= 0:
+            return pygame.Vector2(vector), []
+        return vector + normals[0] * missing, [0]
+
+    def is_feasible(candidate):
+        return all(normal.dot(candidate) >= target - 1e-6 for normal, target in zip(normals, targets))
+
+    if is_feasible(vector):
+        return pygame.Vector2(vector), []
+
+    # Projecting on a single contact is optimal as soon as it satisfies the others
+    missing = [target - normal.dot(vector) for normal, target in zip(normals, targets)]
+    best = None
+    for index, normal in enumerate(normals):
+        if missing[index] <= 0:
+            continue
+        candidate = vector + normal * missing[index]
+        if is_feasible(candidate) and (best is None or missing[index] < best[0]):
+            best = (missing[index], candidate, [index])
+    if best is not None:
+        return best[1], best[2]
+
+    # Otherwise the result rests against two contacts: solve normal_i . change = missing_i for each pair
+    for first in range(len(normals)):
+        for second in range(first + 1, len(normals)):
+            normal_a, normal_b = normals[first], normals[second]
+            determinant = normal_a.x * normal_b.y - normal_a.y * normal_b.x
+            if abs(determinant) < 1e-9:
+                continue
+            change = pygame.Vector2((missing[first] * normal_b.y - missing[second] * normal_a.y) / determinant,
+                                    (normal_a.x * missing[second] - normal_b.x * missing[first]) / determinant)
+            candidate = vector + change
+            if is_feasible(candidate) and (best is None or change.length_squared() < best[0]):
+                best = (change.length_squared(), candidate, [first, second])
+    if best is not None:
+        return best[1], best[2]
 
-        segment_to_ball_center = ball_center_world - p1
+    # Opposite contacts (the ball squeezed between two parallel surfaces): only the deepest is solved
+    return vector + normals[0] * max(0.0, missing[0]), [0]
 
-        t = 0.0
-        if edge_len_sq > 1e-9:  # non-zero edge length
-            t = segment_to_ball_center.dot(edge) / edge_len_sq
-            t = max(0.0, min(1.0, t))  # Clamp t to [0, 1] for segment
 
-        point_on_segment = p1 + t * edge
-        dist_sq_to_segment_point = ball_center_world.distance_squared_to(point_on_segment)
+def manifold_velocity(velocity, normals, materials, contact_time=None):
+    """
+    Computes the velocity of the ball after touching every contact of a manifold.
+    A ball touching a single surface bounces on it (see bounce_velocity). When several surfaces hold the ball
+    (a wedge), the minimum bounce is not applied, as it would send the ball back and forth between them forever,
+    and a ball moving into both surfaces is blocked by both, only keeping the restitution of its impacts.
 
-        if dist_sq_to_segment_point < min_dist_sq:
-            min_dist_sq = dist_sq_to_segment_point
-            closest_point_on_poly = point_on_segment
+    Args:
+        velocity: pygame.Vector2 velocity of the ball before the contacts.
+        normals: Unit pygame.Vector2 normals of the contacts, the deepest first.
+        materials: (bounce, friction, material_id) of each contact.
+        contact_time: Time (s) since the previous contact of the ball (see contact_friction_factor).
 
-    if closest_point_on_poly is None: # No valid closest point found
-        return None, 0
+    Returns:
+        pygame.Vector2: The new velocity.
+    """
+    if len(normals) == 1:
+        bounce_coeff, friction_coeff, _ = materials[0]
+        return bounce_velocity(velocity, normals[0], bounce_coeff, friction_coeff, contact_time=contact_time)
 
-    # Check for collision: if distance to closest point is less than ball's radius
-    if min_dist_sq < (ball_radius * ball_radius) + 1e-5:  # Add epsilon for float precision
-        dist = math.sqrt(min_dist_sq)
-        depth = ball_radius - dist
+    blocked, active = solve_contact_constraints(velocity, normals, [0.0] * len(normals))
+    if len(active) <= 1:
+        index = active[0] if active else 0  # Resting contacts: the friction of the deepest one applies
+        bounce_coeff, friction_coeff, _ = materials[index]
+        return bounce_velocity(velocity, normals[index], bounce_coeff, friction_coeff, minimum_bounce=False,
+                               contact_time=contact_time)
 
-        if depth > 1e-5: # Avoid zero or negative depth
-            normal = pygame.Vector2(0, -1) # Default normal
-            if dist > 1e-6:  # Avoid normalization of zero vector
-                normal = (ball_center_world - closest_point_on_poly).normalize()
-            return normal, depth
-        else:
-            return None, 0  # No penetration
-    else:
-        return None, 0  # No collision
+    for index in active:
+        blocked += normals[index] * (-velocity.dot(normals[index]) * materials[index][0])
+    return blocked
 
 
-def update_ball_physics(ball, terrain_polys, obstacles, dt, game_instance):
+def update_ball_physics(ball, terrain_polys, obstacles, dt, world=None, triggers=None):
     """
     Updates the ball's position, velocity, and handles collisions for one fixed sub-step (dt).
+    Every contact of the ball is gathered in a manifold and resolved at once, so a ball stuck in a crevice between
+    two entities is pushed out of both instead of alternating between them.
 
     Args:
         ball: The Ball object.
-        terrain_polys: List of Terrain objects.
+        terrain_polys: List of solid terrain entities (TerrainGroup or Terrain objects).
         obstacles: List of collidable Obstacle objects.
         dt: Fixed time delta for the sub-step (in seconds).
-        game_instance: The Game class instance, for accessing/modifying game-level state
-                       like anti-stuck counters (`physics_last_collided_object_id`,
-                       `physics_collision_toggle_count`, `max_toggle_toggles`).
+        world: Optional CollisionWorld of the level. When given, terrain_polys and obstacles are ignored: only the
+               entities around the ball's swept bounding box are tested, with the vectorized narrow-phase on the
+               world's precomputed edges. Without it, every entity is walked one edge at a time (reference path, see
+               PolygonGeometry), with the same contact model.
+               A SignedDistanceField baked from the world can be given instead, contacts are then grid lookups.
+        triggers: Optional TriggerIndex of the level. It is tested before any solid contact: touching a hazard
+                  (water, out of bounds) stops the sub-step right away with a hazard event.
 
     Returns:
-        bool: True if the ball is still considered moving after this sub-step, False otherwise.
+        (still_moving, events): still_moving is True if the ball is still considered moving after this sub-step,
+        events is the list of PhysicsEvent raised during the sub-step.
     """
+    events = []
     if not ball.is_moving:
-        return False
-    
-    global played_sound
+        return False, events
+
+    if world is None:
+        world = PolygonGeometry(terrain_polys + obstacles)
+
+    if ball.rolling_contact is not None:
+        rolled = roll_ball(ball, dt, world, triggers)
+        if rolled is not None:
+            if rolled[0] and update_sleep(ball, dt):
+                stop_ball(ball)
+                return False, rolled[1]
+            return rolled
+
+    ball.time_since_contact += dt
+    start_velocity = pygame.Vector2(ball.velocity)
 
     # apply gravity to the ball's velocity
     ball.velocity.y += GRAVITY_ACCELERATION * dt
@@ -123,144 +395,441 @@ def update_ball_physics(ball, terrain_polys, obstacles, dt, game_instance):
     effective_damping = DEFAULT_DAMPING_FACTOR ** dt
     ball.velocity *= effective_damping
 
-    # Update Ball Position
-    ball.position += ball.velocity * dt
+    # Update Ball Position with the mean velocity of the sub-step: the parabola does not depend on the step size
+    previous_rect = ball.rect.copy()
+    ball.position += (start_velocity + ball.velocity) * (0.5 * dt)
     ball.rect.center = ball.position  # keep ball Rect updated
 
+    if check_triggers(ball, triggers, events):
+        return False, events
+
     # collision detection and resolution
-    collidable_entities = terrain_polys + obstacles
+    # Swept box of the sub-step, grown by the ball size to also cover the push-outs
+    ball_size = ball.rect.width
+    swept_rect = previous_rect.union(ball.rect).inflate(ball_size, ball_size)
+    last_manifold = resolve_contacts(ball, world, world.query(swept_rect), dt, events)
+
+    # Check for Stopping Condition
+    if ball.velocity.length_squared() < BALL_STOP_SPEED_THRESHOLD ** 2:
+        # Stop if slow enough
+        if last_manifold is None or manifold_supports_ball(last_manifold):
+            stop_ball(ball)
+            return False, events  # Ball has stopped
 
-    collision_resolved_this_sub_step = False
+    # Micro-bounces against a rock or on a slope: the ball is settled once its energy and motion stayed low
+    if update_sleep(ball, dt):
+        stop_ball(ball)
+        return False, events
+
+    return True, events
+
+
+def resolve_contacts(ball, world, candidate_indices, dt, events):
+    """
+    Resolves the contacts of the ball after its free-flight integration: every contact is gathered in a manifold
+    and solved at once, and a slow impact on a single surface makes the ball roll on it (see find_rolling_contact).
+    Shared by update_ball_physics and the batch engine (see batch_physics.BatchSimulation).
 
+    Args:
+        ball: The Ball object, already moved for the sub-step.
+        world: CollisionWorld (or SignedDistanceField, PolygonGeometry) of the level.
+        candidate_indices: Indices of the entities of the world the ball may touch.
+        dt: Fixed time delta for the sub-step (in seconds).
+        events: List of the events of the sub-step, the collision and hazard events are appended to it.
+
+    Returns:
+        The last manifold solved, as a list of (collided_object, normal, depth, (bounce, friction, material_id),
+        edge_index), or None if the ball touched nothing.
+    """
+    last_manifold = None  # keep [(collided_object, normal, depth, (bounce, friction, material_id), edge_index), ...]
+    impact_velocity = None  # Velocity of the ball before its last contacts
+    ball_scaled_radius = ball.radius * ball.scale_value
+
+    # The manifold is solved in one pass, the next iterations only catch the surfaces reached by the push
     for _ in range(MAX_PHYSICS_COLLISION_ITERATIONS):
-        max_penetration_depth = -1.0
-        most_significant_collision = None  # keep (collided_object, normal, depth)
-        found_collision_this_iteration = False
+        # Every edge of the candidates is tested, in one batched call with a CollisionWorld
+        manifold = [(world.entities[entity_index], normal, depth, world.material(entity_index), edge_index)
+                    for entity_index, normal, depth, edge_index in world.contact_manifold(
+                        ball.position, ball_scaled_radius, candidate_indices, MANIFOLD_CONTACT_MARGIN)]
 
-        for entity in collidable_entities:
-            # bounding box check
-            entity_rect = entity.rect
+        if not manifold or manifold[0][2] <= 1e-4:
+            # If no collisions with penetration were found in this iteration, the ball is clear
+            break
+        last_manifold = manifold
+
+        normals = [contact[1] for contact in manifold]
+        materials = [contact[3] for contact in manifold]
+
+        # Push ball out of every contact at once to escape penetration
+        push, _ = solve_contact_constraints(pygame.Vector2(0, 0), normals,
+                                            [contact[2] * COLLISION_PENETRATION_PUSH_FACTOR for contact in manifold])
+        ball.position += push
+        ball.rect.center = ball.position
+
+        # compute new velocity
+        impact_velocity = pygame.Vector2(ball.velocity)
+        # Time the ball spent past the surface during the sub-step, the gravity of that time is not part of the impact
+        approach_speed = -impact_velocity.dot(normals[0])
+        time_past_impact = min(dt, manifold[0][2] / approach_speed) if approach_speed > 1e-6 else 0.0
+        gravity_past_impact = pygame.Vector2(0, GRAVITY_ACCELERATION * time_past_impact)
+
+        bounced_velocity = manifold_velocity(impact_velocity - gravity_past_impact, normals, materials,
+                                             ball.time_since_contact)
+        ball.velocity = bounced_velocity + gravity_past_impact
+        ball.time_since_contact = 0.0
+
+        # The push put the ball back on the surface: it goes on from there with its new velocity, so the step size
+        # does not shorten the bounces
+        impact_tangent = impact_velocity - normals[0] * impact_velocity.dot(normals[0])
+        ball.position += (bounced_velocity - impact_tangent) * time_past_impact
+        ball.rect.center = ball.position
+
+        hazard = next((material for material in materials if material[1] < 0), None)
+        if hazard is not None:
+            events.append(PhysicsEvent(EVENT_HAZARD, hazard[2], ball.position))
+            break
 
-            ball_scaled_radius = ball.radius * ball.scale_value
-            if not ball.rect.colliderect(entity_rect):
-                continue
+        for material in materials:
+            events.append(PhysicsEvent(EVENT_COLLISION, material[2], ball.position))
+
+    # A slow impact on a single surface: the ball rolls on it from the next sub-step
+    if last_manifold is not None and len(last_manifold) == 1:
+        ball.rolling_contact = find_rolling_contact(world, last_manifold[0], impact_velocity)
+        if ball.rolling_contact is not None:
+            place_on_rolling_contact(ball, ball.rolling_contact, ball.velocity.dot(ball.rolling_contact.tangent))
+
+    return last_manifold
+
+
+def manifold_supports_ball(manifold) -> bool:
+    """
+    Checks if a slow ball can stop on a manifold: it is supported along the sum of the normals of its contacts,
+    which must point up (a flat ground or the bottom of a wedge).
+
+    Args:
+        manifold: List of contacts, as returned by resolve_contacts.
+
+    Returns:
+        True if the manifold holds the ball.
+    """
+    support = sum((contact[1] for contact in manifold), pygame.Vector2(0, 0))
+    return support.length_squared() > 1e-12 and abs(support.y) > 0.9 * support.length()
+
+
+def find_rolling_contact(world, contact, impact_velocity):
+    """
+    Checks if the ball starts rolling on the surface of a contact: the contact must be the only one of the ball,
+    on the inside of a solid edge that can hold the ball, and hit slowly enough for the bounce to be negligible.
+
+    Args:
+        world: CollisionWorld (or SignedDistanceField, PolygonGeometry) of the level.
+        contact: (collided_object, normal, depth, (bounce, friction, material_id), edge_index) of the manifold.
+        impact_velocity: pygame.Vector2 velocity of the ball before the contact.
+
+    Returns:
+        A RollingContact, or None if the ball keeps bouncing.
+    """
+    _, normal, _, material, edge_index = contact
+    if edge_index is None or material[1] < 0 or normal.y > -ROLLING_MIN_SUPPORT:
+        return None
+    if -impact_velocity.dot(normal) > ROLLING_ENTRY_NORMAL_SPEED:
+        return None
+
+    start, vector = world.edge(edge_index)
+    if vector.length_squared() < 1e-12 or abs(normal.dot(vector)) > 1e-3 * vector.length():
+        return None  # The ball touches a vertex, not the inside of the edge
+    return RollingContact(edge_index, start, vector, normal, material)
 
-            # more precise collision check with mask
-            entity_world_points = []
-            if isinstance(entity, Terrain):
-                entity_world_points = [pygame.Vector2(p) for p in entity.points]
-                
-            elif isinstance(entity, Obstacle):
-                # Obstacle points are relative to topleft, convert to world coordinate
-                entity_world_points = [(pygame.Vector2(p) + entity.position) for p in entity.rotated_points]
-
-            if not entity_world_points or len(entity_world_points) < 2:
-                continue  # Not enough points
-
-            normal, depth = get_polygon_collision_normal_depth(entity_world_points, ball.position, ball_scaled_radius)
-
-            if normal and depth > 1e-4:  # If a collision with penetration is found
-                found_collision_this_iteration = True
-                if depth > max_penetration_depth:
-                    max_penetration_depth = depth
-                    most_significant_collision = (entity, normal, depth)
-
-        # Find best collision
-        if most_significant_collision:
-            collided_object, normal_vec, penetration_depth = most_significant_collision
-            collision_resolved_this_sub_step = True  # Mark that a collision was handled
-
-            # Anti-stuck mechanism
-            current_object_id = id(collided_object)
-            if game_instance.physics_last_collided_object_id is not None and \
-                    current_object_id != game_instance.physics_last_collided_object_id:
-                game_instance.physics_collision_toggle_count += 1
-            else:  # Colliding with the same object again
-                game_instance.physics_collision_toggle_count = 0
-            game_instance.physics_last_collided_object_id = current_object_id
-
-            if game_instance.physics_collision_toggle_count >= game_instance.max_toggle_toggles:
-                ball.velocity = pygame.Vector2(0, 0)
-                ball.is_moving = False
-                # Reset anti-stuck state for the next shot
-                game_instance.physics_last_collided_object_id = None
-                game_instance.physics_collision_toggle_count = 0
-                return False  # Ball is stuck, stop physics update
-
-            # Push ball out of the collision to escape penetration
-            ball.position += normal_vec * (penetration_depth * COLLISION_PENETRATION_PUSH_FACTOR)
+
+def place_on_rolling_contact(ball, contact, speed, offset=None):
+    """
+    Puts the ball on its rolling surface, moving along the tangent.
+
+    Args:
+        ball: The Ball object.
+        contact: RollingContact of the ball.
+        speed: Signed speed of the ball along the tangent of the edge (pixels/s).
+        offset: Distance of the contact point from the start of the edge, by default the current one of the ball.
+    """
+    if offset is None:
+        offset = (ball.position - contact.start).dot(contact.tangent)
+    ball.position = contact.start + contact.tangent * offset + contact.normal * (ball.radius * ball.scale_value)
+    ball.rect.center = ball.position
+    ball.velocity = contact.tangent * speed
+
+
+def roll_ball(ball, dt, world, triggers=None):
+    """
+    Moves a rolling ball along its edge for one sub-step: gravity along the slope, damping and the friction of
+    the material are applied to its speed, and it stays on the edge without any push-out or bounce.
+    The ball goes back to the free-flight integration when it reaches a vertex, when another surface blocks it,
+    when its edge moved (a kinematic obstacle), or when its velocity was changed outside of the physics (a new shot).
+
+    Args:
+        ball: The Ball object, with a rolling_contact.
+        dt: Fixed time delta for the sub-step (in seconds).
+        world: CollisionWorld (or SignedDistanceField, PolygonGeometry) of the level.
+        triggers: Optional TriggerIndex of the level.
+
+    Returns:
+        (still_moving, events) as update_ball_physics, or None if the ball does not roll anymore: the ball is left
+        untouched and the sub-step must be integrated by update_ball_physics.
+    """
+    contact = ball.rolling_contact
+    ball_scaled_radius = ball.radius * ball.scale_value
+    relative_position = ball.position - contact.start
+    if (abs(ball.velocity.dot(contact.normal)) > ROLLING_MAX_NORMAL_SPEED or
+            abs(relative_position.dot(contact.normal) - ball_scaled_radius) > ROLLING_POSITION_TOLERANCE or
+            world.edge(contact.edge_index) != (contact.start, contact.vector)):  # A kinematic obstacle moved
+        ball.rolling_contact = None
+        return None
+
+    _, friction_coeff, _ = contact.material
+    speed = ball.velocity.dot(contact.tangent)
+    speed += GRAVITY_ACCELERATION * contact.tangent.y * dt
+    speed *= DEFAULT_DAMPING_FACTOR ** dt * contact_friction_factor(friction_coeff, dt)
+
+    offset = relative_position.dot(contact.tangent) + speed * dt
+    if not 0.0 <= offset <= contact.length:
+        ball.rolling_contact = None  # Vertex reached: the next edge may slope away
+        return None
+
+    previous_position, previous_velocity = ball.position, ball.velocity
+    place_on_rolling_contact(ball, contact, speed, offset)
+    ball.time_since_contact = 0.0
+
+    # Any other surface reached along the edge (a wall, an obstacle, a rising edge) is solved by the free flight
+    candidate_indices = world.query_around(ball.position, ball_scaled_radius + MANIFOLD_CONTACT_MARGIN + 1)
+    for _, _, depth, edge_index in world.contact_manifold(ball.position, ball_scaled_radius, candidate_indices):
+        if depth > 1e-4 and edge_index != contact.edge_index:
+            ball.position, ball.velocity = previous_position, previous_velocity
             ball.rect.center = ball.position
+            ball.rolling_contact = None
+            return None
+
+    events = []
+    if check_triggers(ball, triggers, events):
+        return False, events
+
+    if abs(speed) < BALL_STOP_SPEED_THRESHOLD and abs(contact.normal.y) > 0.9:
+        stop_ball(ball)
+        return False, events
+
+    return True, events
+
+
+def update_sleep(ball, dt) -> bool:
+    """
+    Tracks the kinetic energy and the displacement of the ball over a window of SLEEP_WINDOW seconds. The window
+    starts over each time the ball drifts too far from where the window started, or is too fast while out of
+    contact, so the ball is only reported settled after a whole window spent in place. A ball that touched a
+    surface during the window is judged on its displacement alone: a ball wedged against a corner may keep a high
+    velocity that the solver cancels every step without ever moving it.
+
+    Args:
+        ball: The Ball object.
+        dt: Time delta of the step (in seconds).
+
+    Returns:
+        True if the ball is settled and the solver can stop.
+    """
+    in_contact = ball.time_since_contact <= SLEEP_WINDOW
+    kinetic_energy = 0.5 * ball.velocity.length_squared()
+    if (ball.sleep_anchor is None or (not in_contact and kinetic_energy > SLEEP_MAX_KINETIC_ENERGY) or
+            ball.position.distance_squared_to(ball.sleep_anchor) > SLEEP_MAX_DISPLACEMENT ** 2):
+        ball.sleep_anchor = ball.position.copy()
+        ball.sleep_time = 0.0
+        return False
+    ball.sleep_time += dt
+    return ball.sleep_time >= SLEEP_WINDOW
+
+
+def stop_ball(ball):
+    """Stops the ball and clears its rolling and sleep state, so the next shot starts from a clean state"""
+    ball.velocity = pygame.Vector2(0, 0)
+    ball.is_moving = False
+    ball.rolling_contact = None
+    ball.sleep_anchor = None
+    ball.sleep_time = 0.0
+    ball.time_since_contact = math.inf
+
+
+def check_triggers(ball, triggers, events) -> bool:
+    """
+    Tests the trigger volumes touched by the ball. Pickups are collected and the ball keeps going, a hazard stops
+    the ball: the game puts it back to its last position when it handles the event.
 
-            # compute new velocity
-            bounce_coeff = getattr(collided_object, 'bounce_factor', 0.4)
-            friction_coeff = getattr(collided_object, 'friction', 0.3)
-
-            terrain_type = getattr(collided_object, 'terrain_type', "rocks")
-
-            if terrain_type == "green" or terrain_type == "fairway" or terrain_type == "darkgreen":
-                pygame.mixer.Channel(0).play(grass_sound)
-            elif terrain_type == "rocks" or terrain_type == "darkrocks":
-                pygame.mixer.Channel(0).play(random.choice(rock_sounds))
-            elif terrain_type == "bunker":
-                pygame.mixer.Channel(0).play(sand_effect)
-
-            velocity_normal_component_scalar = ball.velocity.dot(normal_vec)
-            normal_velocity_vector = velocity_normal_component_scalar * normal_vec
-            tangent_velocity_vector = ball.velocity - normal_velocity_vector
-
-            if velocity_normal_component_scalar < 0:  # Ball is moving into the surface
-                new_normal_scalar = -velocity_normal_component_scalar * bounce_coeff
-                # Ensure minimum bounce velocity if it was significant before impact
-                if abs(new_normal_scalar) < MIN_BOUNCE_VELOCITY_NORMAL and \
-                        abs(velocity_normal_component_scalar) > MIN_BOUNCE_VELOCITY_NORMAL / 2:
-                    # Preserve sign for bounce direction
-                    new_normal_scalar = MIN_BOUNCE_VELOCITY_NORMAL if new_normal_scalar >= 0 else -MIN_BOUNCE_VELOCITY_NORMAL
-                normal_velocity_vector = new_normal_scalar * normal_vec
-
-            # Apply friction to tangent velocity
-            tangent_velocity_vector *= (1.0 - friction_coeff)
-            ball.velocity = normal_velocity_vector + tangent_velocity_vector
-
-            if friction_coeff < 0:
-
-                pygame.event.post(pygame.event.Event(pygame.USEREVENT + 30))
-
-                if not played_sound:
-                    if getattr(collided_object, 'terrain_type') == "lake":
-                        pygame.mixer.Channel(0).play(random.choice(water_effects))
-                        played_sound = True
-                    else:
-                        pygame.mixer.Channel(0).play(random.choice(defeat_effects))
-                        played_sound = True
-
-                break
-
-        if not found_collision_this_iteration:
-            # If no collisions were found in this iteration, the ball is clear
-            played_sound = False
+    Args:
+        ball: The Ball object.
+        triggers: TriggerIndex of the level, or None.
+        events: List of the events of the sub-step, the trigger event is appended to it.
+
+    Returns:
+        True if the ball touched a hazard and the sub-step must stop.
+    """
+    if triggers is None:
+        return False
+    trigger = triggers.test(ball.position, ball.radius * ball.scale_value)
+    if trigger is None:
+        return False
+
+    if trigger.kind == TRIGGER_PICKUP:
+        triggers.disable(trigger)
+        events.append(PhysicsEvent(EVENT_PICKUP, trigger.material_id, ball.position, trigger))
+        return False
+
+    events.append(PhysicsEvent(EVENT_HAZARD, trigger.material_id, ball.position, trigger))
+    stop_ball(ball)
+    return True
+
+
+def resolve_continuous_contacts(ball, world, manifold, impact_velocity, events) -> bool:
+    """
+    Bounces the ball on the contacts of update_ball_physics_continuous, as update_ball_physics does: all the
+    contacts of the manifold at once, and a slow impact on a single surface starts a rolling contact.
+
+    Args:
+        ball: The Ball object, touching the surfaces of the manifold.
+        world: CollisionWorld of the level.
+        manifold: Contacts of the ball, as returned by CollisionWorld.contact_manifold.
+        impact_velocity: pygame.Vector2 velocity of the ball at the time of the impact.
+        events: List of the events of the step, the contact events are appended to it.
+
+    Returns:
+        True if one of the surfaces is a hazard.
+    """
+    normals = [normal for _, normal, _, _ in manifold]
+    materials = [world.material(entity_index) for entity_index, _, _, _ in manifold]
+    ball.velocity = manifold_velocity(impact_velocity, normals, materials, ball.time_since_contact)
+    ball.time_since_contact = 0.0
+
+    hazard = next((material for material in materials if material[1] < 0), None)
+    if hazard is not None:
+        events.append(PhysicsEvent(EVENT_HAZARD, hazard[2], ball.position))
+        return True
+    for material in materials:
+        events.append(PhysicsEvent(EVENT_COLLISION, material[2], ball.position))
+
+    if len(manifold) == 1:
+        _, normal, depth, edge_index = manifold[0]
+        ball.rolling_contact = find_rolling_contact(world, (None, normal, depth, materials[0], edge_index),
+                                                    impact_velocity)
+        if ball.rolling_contact is not None:
+            place_on_rolling_contact(ball, ball.rolling_contact, ball.velocity.dot(ball.rolling_contact.tangent))
+    return False
+
+
+def update_ball_physics_continuous(ball, dt, world, triggers=None):
+    """
+    Continuous collision detection alternative to update_ball_physics.
+    Instead of moving the ball then pushing it out of what it entered, the time of impact of the moving ball
+    against the polygon edges is computed, so thin terrain cannot be tunnelled through even with large steps.
+    The contact model is the one of update_ball_physics: the flight between two impacts is integrated with the mean
+    velocity, the velocity at the time of each impact is bounced, and a slow impact on a single surface starts a
+    rolling contact.
+
+    Args:
+        ball: The Ball object.
+        dt: Time delta of the step (in seconds), can be several times larger than the discrete sub-step.
+        world: CollisionWorld of the level.
+        triggers: Optional TriggerIndex of the level, tested at the end of the step.
+
+    Returns:
+        (still_moving, events): same as update_ball_physics.
+    """
+    events = []
+    if not ball.is_moving:
+        return False, events
+
+    if ball.rolling_contact is not None:
+        rolled = roll_ball(ball, dt, world, triggers)
+        if rolled is not None:
+            if rolled[0] and update_sleep(ball, dt):
+                stop_ball(ball)
+                return False, rolled[1]
+            return rolled
+
+    ball_scaled_radius = ball.radius * ball.scale_value
+
+    # Bounces can send the ball in any direction, so every entity within reach of the whole motion is a candidate
+    reach = (ball.velocity.length() + GRAVITY_ACCELERATION * dt + MIN_BOUNCE_VELOCITY_NORMAL) * dt
+    candidate_indices = world.query_around(ball.position, reach + ball_scaled_radius + 1)
+
+    support = None  # Sum of the normals of the surfaces touched during the step
+    remaining = dt  # Time of the step left to simulate
+    for _ in range(MAX_CCD_IMPACTS):
+        # Flight until the end of the step, with the mean velocity as in update_ball_physics
+        start_velocity = pygame.Vector2(ball.velocity)
+        end_velocity = (start_velocity + pygame.Vector2(0, GRAVITY_ACCELERATION * remaining)) * \
+            DEFAULT_DAMPING_FACTOR ** remaining
+        motion = (start_velocity + end_velocity) * (0.5 * remaining)
+        impact = world.time_of_impact(ball.position, motion, ball_scaled_radius, candidate_indices)
+        if impact is None:
+            ball.position += motion
+            ball.velocity = end_velocity
+            ball.time_since_contact += remaining
+            remaining = 0.0
             break
 
-    # Ball is still moving, but check if it is on a flat surface
-    if not collision_resolved_this_sub_step:
-        game_instance.physics_last_collided_object_id = None
+        toi, entity_index, normal_vec = impact
+        impact_velocity = start_velocity + (end_velocity - start_velocity) * toi
+        if toi < CCD_GRAZING_TOI and -impact_velocity.dot(normal_vec) < CCD_GRAZING_SPEED:
+            # The ball already touches the surface and moves along it: bouncing would not change its velocity and the
+            # same impact would be found again. It slides along the surface for the rest of the step instead, without
+            # its motion into the surface, the surfaces it reaches are solved as the contacts left after the flight
+            ball.position += motion - normal_vec * min(0.0, motion.dot(normal_vec))
+            ball.velocity = end_velocity - normal_vec * min(0.0, end_velocity.dot(normal_vec))
+            ball.time_since_contact = 0.0
+            support = normal_vec + (support or pygame.Vector2(0, 0))
+            remaining = 0.0
+            break
 
+        ball.position += motion * toi + normal_vec * CCD_CONTACT_SKIN
+        ball.time_since_contact += remaining * toi
+        remaining *= 1.0 - toi
 
-    # Check for Stopping Condition
+        # Every surface the ball touches at the time of impact is part of the contact (the two sides of a wedge)
+        manifold = world.contact_manifold(ball.position, ball_scaled_radius, candidate_indices,
+                                          MANIFOLD_CONTACT_MARGIN) or [(entity_index, normal_vec, 0.0, None)]
+        support = sum((normal for _, normal, _, _ in manifold), support or pygame.Vector2(0, 0))
+        if resolve_continuous_contacts(ball, world, manifold, impact_velocity, events):
+            break
+        if ball.rolling_contact is not None:
+            break  # The ball rolls on its surface for the rest of the step
+    ball.rect.center = ball.position
+
+    if ball.rolling_contact is not None and remaining > 0:
+        rolled = roll_ball(ball, remaining, world, triggers)
+        if rolled is not None:
+            events += rolled[1]
+            if not rolled[0]:
+                return False, events
+
+    # Numerical errors can still leave the ball slightly inside surfaces: they are solved as the contacts of
+    # update_ball_physics, pushed out all at once and bounced with the time since the previous contact
+    manifold = [contact for contact in world.contact_manifold(ball.position, ball_scaled_radius, candidate_indices)
+                if contact[2] > 1e-4]
+    if manifold and ball.rolling_contact is None:
+        normals = [normal for _, normal, _, _ in manifold]
+        push, _ = solve_contact_constraints(pygame.Vector2(0, 0), normals,
+                                            [depth * COLLISION_PENETRATION_PUSH_FACTOR for _, _, depth, _ in manifold])
+        ball.position += push
+        ball.rect.center = ball.position
+        support = sum(normals, support or pygame.Vector2(0, 0))
+        if any(ball.velocity.dot(normal) < 0 for normal in normals):
+            resolve_continuous_contacts(ball, world, manifold, pygame.Vector2(ball.velocity), events)
+
+    if check_triggers(ball, triggers, events):
+        return False, events
+
+    # Same stopping condition as the discrete solver
     if ball.velocity.length_squared() < BALL_STOP_SPEED_THRESHOLD ** 2:
-        is_on_flat_surface = False
-        if collision_resolved_this_sub_step and most_significant_collision:
-            # Check the normal from the last resolved collision in this sub-step
-            _, last_normal, _ = most_significant_collision
-            if abs(last_normal.y) > 0.9:  # Check if flat ground
-                is_on_flat_surface = True
+        if support is None or (support.length_squared() > 1e-12 and abs(support.y) > 0.9 * support.length()):
+            stop_ball(ball)
+            return False, events
 
-        # Stop if slow enough
-        if not collision_resolved_this_sub_step or is_on_flat_surface:
-            ball.velocity = pygame.Vector2(0, 0)
-            ball.is_moving = False
-            # Fully reset anti-stuck state when ball stops
-            game_instance.physics_last_collided_object_id = None
-            game_instance.physics_collision_toggle_count = 0
-            return False  # Ball has stopped
-        
-    return True
\ No newline at end of file
+    if update_sleep(ball, dt):
+        stop_ball(ball)
+        return False, events
+
+    return True, events
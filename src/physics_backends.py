@@ -0,0 +1,169 @@
+import abc
+import threading
+
+from src import physics, sdf
+from src.queries import LevelQueries
+
+PHYSICS_SUB_STEPS = 8  # Number of physics sub-steps per frame of the discrete backends
+CONTINUOUS_PHYSICS_SUB_STEPS = 2  # Number of physics steps per frame with the continuous backend
+DEFAULT_PHYSICS_BACKEND = "vectorized"
+# Solver names of the older settings files
+PHYSICS_BACKEND_ALIASES = {"discrete": "vectorized", "continuous": "ccd"}
+
+
+class PhysicsBackend(abc.ABC):
+    """
+        Physics solver used by the Game scene. The scene hands it the geometry of each level once, then only asks it
+        to step the ball and to answer geometric queries: solvers can be swapped without touching the scene.
+        A step moves the Ball object it is given (its position, velocity and contact state are the ball state) and
+        returns the events it raised, as physics.update_ball_physics.
+    """
+
+    name = None
+    sub_steps = PHYSICS_SUB_STEPS  # Physics steps per frame the backend is meant to run at
+    contact_model = "edge"  # Backends with the same contact model stop a shot at the same place
+
+    def __init__(self):
+        self.terrain_polys = []
+        self.obstacles = []
+        self.world = None
+        self.triggers = None
+        self.queries = None
+
+    def load_level(self, terrain_polys: list, obstacles: list, world, triggers, level_path: str = None,
+                   moving_geometry: bool = False):
+        """
+        Receives the geometry of a level.
+
+        :param terrain_polys: Solid terrain of the level, as in the world (the TerrainGroup objects of optimize_terrain,
+                              or Terrain objects).
+        :param obstacles: Collidable Obstacle objects of the level.
+        :param world: CollisionWorld of the level.
+        :param triggers: TriggerIndex of the level (hazards, pickups, hole), or None.
+        :param level_path: Path of the level json file, for the backends caching baked data.
+        :param moving_geometry: True if the level has kinematic obstacles (see geometry_moved).
+        """
+        self.terrain_polys = terrain_polys
+        self.obstacles = obstacles
+        self.world = world
+        self.triggers = triggers
+        self.queries = LevelQueries(world)
+
+    def geometry_moved(self, entities: list):
+        """
+        Called after kinematic obstacles moved, once their slots of the world were updated.
+
+        :param entities: The moved obstacles.
+        """
+        self.queries.update_entities(entities)
+
+    @abc.abstractmethod
+    def step(self, ball, dt: float, triggers=None) -> tuple:
+        """
+        Runs one physics step on a ball.
+
+        :param ball: The Ball object, updated in place.
+        :param dt: Time delta of the step, in seconds.
+        :param triggers: TriggerIndex to test, by default the one of the level. The simulations run ahead of the game
+                         give a copy of it (see TriggerIndex.copy), so that they do not collect the level pickups.
+        :return: (still_moving, events), see physics.update_ball_physics.
+        """
+
+    def step_triggers(self, triggers):
+        """TriggerIndex a step tests: the one it was given, or the one of the level"""
+        return self.triggers if triggers is None else triggers
+
+    def query(self) -> LevelQueries:
+        """Ray casts, circle casts and nearest surface queries on the loaded level"""
+        return self.queries
+
+
+class ReferenceBackend(PhysicsBackend):
+    """
+        Walks the terrain zones and obstacles one edge at a time (physics.PolygonGeometry), with the contact model of
+        the vectorized backend: slow, but the reference of the other backends
+    """
+
+    name = "reference"
+
+    def step(self, ball, dt: float, triggers=None) -> tuple:
+        return physics.update_ball_physics(ball, self.terrain_polys, self.obstacles, dt, None,
+                                           self.step_triggers(triggers))
+
+
+class VectorizedBackend(PhysicsBackend):
+    """Tests the edges of the entities around the ball in batched NumPy calls, on the CollisionWorld"""
+
+    name = "vectorized"
+
+    def step(self, ball, dt: float, triggers=None) -> tuple:
+        return physics.update_ball_physics(ball, self.terrain_polys, self.obstacles, dt, self.world,
+                                           self.step_triggers(triggers))
+
+
+class ContinuousBackend(PhysicsBackend):
+    """Sweeps the ball along its motion and stops it at the first impact (continuous collision detection)"""
+
+    name = "ccd"
+    sub_steps = CONTINUOUS_PHYSICS_SUB_STEPS
+
+    def step(self, ball, dt: float, triggers=None) -> tuple:
+        return physics.update_ball_physics_continuous(ball, dt, self.world, self.step_triggers(triggers))
+
+
+class SignedDistanceBackend(VectorizedBackend):
+    """
+        Looks the contacts up in the signed distance field of the level. The field is loaded from its cache or baked
+        in the background, the polygons are used until it is ready. It is static: the levels with moving obstacles
+        keep the polygons.
+    """
+
+    name = "sdf"
+    contact_model = "distance field"  # Single contact per step, without rolling
+
+    def __init__(self):
+        super().__init__()
+        self.signed_distance_field = None
+
+    def load_level(self, terrain_polys: list, obstacles: list, world, triggers, level_path: str = None,
+                   moving_geometry: bool = False):
+        super().load_level(terrain_polys, obstacles, world, triggers, level_path, moving_geometry)
+        self.signed_distance_field = None
+        if level_path is not None and not moving_geometry:
+            threading.Thread(target=self.load_signed_distance_field, args=(level_path, world), daemon=True).start()
+
+    def load_signed_distance_field(self, level_path: str, world):
+        """
+        Background step loading the signed distance field of a level from its cache, or baking it.
+        The field is dropped if another level was loaded in the meantime.
+
+        :param level_path: Path of the level json file.
+        :param world: Collision world of the level.
+        """
+        signed_distance_field = sdf.load_or_bake_signed_distance_field(level_path, world)
+        if world is self.world:
+            self.signed_distance_field = signed_distance_field
+
+    def step(self, ball, dt: float, triggers=None) -> tuple:
+        if self.signed_distance_field is None:
+            return super().step(ball, dt, triggers)
+        return physics.update_ball_physics(ball, self.terrain_polys, self.obstacles, dt, self.signed_distance_field,
+                                           self.step_triggers(triggers))
+
+
+PHYSICS_BACKENDS = {backend.name: backend for backend in (ReferenceBackend, VectorizedBackend, ContinuousBackend,
+                                                          SignedDistanceBackend)}
+
+
+def create_physics_backend(name: str = None) -> PhysicsBackend:
+    """
+    Creates a backend from its name (settings "physics" > "solver", or the --physics command line option).
+
+    :param name: Name of the backend, None for the default one. Unknown names fall back to the default backend.
+    :return: The new PhysicsBackend.
+    """
+    name = PHYSICS_BACKEND_ALIASES.get(name, name) or DEFAULT_PHYSICS_BACKEND
+    if name not in PHYSICS_BACKENDS:
+        print(f"Warning: Unknown physics backend '{name}', using '{DEFAULT_PHYSICS_BACKEND}'")
+        name = DEFAULT_PHYSICS_BACKEND
+    return PHYSICS_BACKENDS[name]()
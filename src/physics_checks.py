@@ -0,0 +1,476 @@
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from src import kinematics, physics, sdf
+from src.collision_world import CollisionWorld
+from src.entities import Ball, Flag, Terrain
+from src.physics_backends import SignedDistanceBackend, create_physics_backend
+from src.terrain_optimizer import LEVELS_DIR, optimize_terrain
+from src.triggers import build_trigger_index, is_trigger_terrain
+from src.utils import level_loader
+from src.utils.drag_handler import shot_velocity
+from src.utils.physics_utils import ballistic_positions
+
+CHECK_FPS = 60  # Frame rate the sub-steps are taken from, as in the Game scene
+SUB_STEP_COUNTS = (2, 4, 8, 16)  # Sub-step counts compared by check_sub_step_invariance
+# Backends checked by check_sub_step_invariance. The contacts of the sdf backend have no edge to roll on: its balls
+# keep hopping down the slopes with large sub-steps, so it is left out and its rest positions depend on the step size
+SUB_STEP_BACKENDS = ("reference", "vectorized", "ccd")
+REST_POSITION_TOLERANCE = 0.01  # Allowed spread of the rest positions, as a fraction of the distance travelled
+REST_POSITION_MIN_TOLERANCE = 2.0  # Spread always allowed, in pixels
+CHECK_BALL_DIAMETER = 4.2  # Same ball as the game
+CHECK_MAX_TIME = 60.0  # A shot still moving after this time (s) fails the check
+
+# Ground of the checks: (material, slope in degrees)
+CHECK_GROUNDS = [("fairway", 0), ("green", 0), ("bunker", 0), ("fairway", 5), ("green", 5), ("bunker", 5)]
+# Shots of the checks: initial velocities, in pixels/s
+CHECK_SHOTS = [(300, 0), (400, -300), (800, -200)]
+# Launches of the ballistic check: initial velocities, in pixels/s. They keep some horizontal speed, a ball slower than
+# physics.BALL_STOP_SPEED_THRESHOLD (at the top of a vertical shot) would be stopped by the integrator
+BALLISTIC_LAUNCHES = [(300, 0), (1500, -900), (-800, -400), (60, -1200), (2500, 100)]
+BALLISTIC_DURATION = 2.0  # Flight time (s) compared by check_ballistic_positions
+BALLISTIC_TOLERANCE = 0.001  # Allowed distance (pixels) between the closed form of the sub-steps and the integrator
+BALLISTIC_CONTINUOUS_TOLERANCE = 1.0  # Allowed distance (pixels) between the continuous closed form and the integrator
+BACKEND_REST_TOLERANCE = 1.0  # Allowed distance (pixels) between the rest positions of two backends
+
+CHECK_SCREEN_SIZE = (1920, 1080)  # Screen the levels are loaded for, their y axis starts from the bottom of the screen
+CHECK_LEVELS = tuple(range(1, 12))  # Shipped levels (data/levels/level<n>.json)
+# Shots played on the levels: (force, angle), as given to drag_handler.shot_velocity
+CHECK_LEVEL_SHOTS = [(600, -135), (1000, -110), (1500, -160), (2200, -145)]
+# Shots once frozen by the continuous solver, which found the same grazing impact at the start of every step:
+# (level, force, angle)
+GRAZING_SHOTS = [(4, 1000, -110), (9, 600, -135)]
+# Allowed distance (pixels) between the rest positions of a grazing shot with the backends sharing the edge contact
+# model: a frozen ball is put to sleep by physics.update_sleep, its shot ends but far from the others
+GRAZING_REST_TOLERANCE = 5.0
+LEVEL_SHOT_BACKENDS = ("reference", "vectorized", "ccd", "sdf")  # Backends checked by check_level_shots
+
+# Velocity (pixels/s) of a ball wedged against a vertex, cancelled by the solver at every step
+SLEEP_HELD_VELOCITY = (-35.2, 47.3)
+SLEEP_CHECK_SUB_STEPS = 8  # Sub-steps per frame of check_sleep
+
+KINEMATIC_CHECK_LEVEL = 1  # Level whose obstacles are animated by check_kinematic_bodies
+KINEMATIC_BODY_COUNT = 12  # Number of obstacles animated
+KINEMATIC_FRAMES = 300  # Frames animated, at CHECK_FPS
+KINEMATIC_LIFT = 150  # Distance (pixels) the sliding obstacles go up and down
+KINEMATIC_SPEED = 80  # Speed of the sliding obstacles, in pixels/s
+KINEMATIC_ANGULAR_SPEED = 90  # Rotation speed of the spinning obstacles, in degrees/s
+KINEMATIC_BALL_GAP = 60  # Distance (pixels) between the resting ball and the platform coming up to it
+
+
+class CheckLevel:
+    """Shipped level loaded as the Game scene loads it: solid terrain merged by optimize_terrain and triggers"""
+
+    def __init__(self, level_number: int, levels_dir: str = LEVELS_DIR):
+        """
+        The display must be set to CHECK_SCREEN_SIZE, the obstacle images are converted for it.
+
+        :param level_number: Number of the level.
+        :param levels_dir: Directory of the level json files.
+        """
+        screen = pygame.display.get_surface()
+        self.path = os.path.join(levels_dir, f"level{level_number}.json")
+        terrain_data, obstacles_data = level_loader.load_json_level(self.path)
+        self.terrain_polys = level_loader.json_to_list(terrain_data, screen, 0)
+        self.all_obstacles = level_loader.json_to_list(obstacles_data, screen, 1)
+        self.kill_plane_y = level_loader.get_kill_plane_y(terrain_data, screen)
+
+        self.start = (0, 0)
+        self.flag = None
+        for obstacle in self.all_obstacles:
+            if isinstance(obstacle, Flag):
+                self.flag = obstacle
+            elif getattr(obstacle, 'characteristic', None) == "start":
+                self.start = tuple(obstacle.position)
+
+        self.obstacles = [obstacle for obstacle in self.all_obstacles
+                          if not isinstance(obstacle, Flag) and obstacle.is_colliding]
+        self.terrain_groups = optimize_terrain([terrain for terrain in self.terrain_polys
+                                                if not is_trigger_terrain(terrain)])
+        self.world = CollisionWorld(self.terrain_groups + self.obstacles)
+
+    def load(self, backend):
+        """
+        Loads the level in a backend, with triggers of its own: the pickups it collects are not collected by the
+        other backends.
+
+        :param backend: PhysicsBackend to load the level in.
+        """
+        triggers = build_trigger_index(self.terrain_polys, self.all_obstacles, self.flag, self.kill_plane_y)
+        backend.load_level(self.terrain_groups, self.obstacles, self.world, triggers)
+        if isinstance(backend, SignedDistanceBackend):
+            backend.signed_distance_field = sdf.load_or_bake_signed_distance_field(self.path, self.world)
+
+
+def simulate_rest_position(backend, start: tuple, velocity: tuple, sub_steps: int) -> pygame.Vector2:
+    """
+    Plays a shot with a physics backend until the ball stops.
+
+    :param backend: PhysicsBackend, with the ground loaded.
+    :param start: Start position of the ball.
+    :param velocity: Initial velocity of the ball.
+    :param sub_steps: Number of physics sub-steps per frame.
+    :return: The rest position of the ball, None if it was still moving after CHECK_MAX_TIME.
+    """
+    ball = Ball(pygame.Vector2(start), CHECK_BALL_DIAMETER, 0.047, pygame.Color("white"))
+    ball.velocity = pygame.Vector2(velocity)
+    ball.is_moving = True
+
+    dt = 1.0 / (CHECK_FPS * sub_steps)
+    for _ in range(int(CHECK_MAX_TIME / dt)):
+        still_moving, _ = backend.step(ball, dt)
+        if not still_moving:
+            return ball.position
+    return None
+
+
+def load_check_ground(backend, material: str, slope: float):
+    """
+    Loads the ground of a check in a backend: a single straight slope, 30000 pixels long.
+
+    :param backend: PhysicsBackend to load the ground in.
+    :param material: Terrain type of the ground.
+    :param slope: Slope of the ground, in degrees (going down to the right).
+    """
+    drop = 30000 * math.tan(math.radians(slope))
+    ground = Terrain(material, [(0, 300), (30000, 300 + drop), (30000, 2000 + drop), (0, 2000)])
+    world = CollisionWorld([ground])
+    backend.load_level([ground], [], world, None)
+    if isinstance(backend, SignedDistanceBackend):
+        backend.signed_distance_field = sdf.bake_signed_distance_field(world)
+
+
+def check_sub_step_invariance(sub_step_counts: tuple = SUB_STEP_COUNTS, backends: tuple = SUB_STEP_BACKENDS) -> bool:
+    """
+    Plays the same shots with every sub-step count and prints their rest positions. The contact model being
+    expressed per unit of time, the sub-step count must only change the cost and the accuracy of a shot, not
+    where it stops.
+
+    :param sub_step_counts: Sub-step counts to compare.
+    :param backends: Names of the physics backends to check (see physics_backends.PHYSICS_BACKENDS).
+    :return: True if the rest positions of every shot agree within the tolerance.
+    """
+    print(f"{'backend':<12}{'ground':<14}{'shot':>14}" + "".join(f"{count:>9}" for count in sub_step_counts) +
+          f"{'spread':>9}")
+    passed = True
+    for name in backends:
+        backend = create_physics_backend(name)
+        for material, slope in CHECK_GROUNDS:
+            load_check_ground(backend, material, slope)
+            start = (100, 300 - CHECK_BALL_DIAMETER * 7 / 2 - 100)
+
+            for shot in CHECK_SHOTS:
+                rest_positions = [simulate_rest_position(backend, start, shot, count) for count in sub_step_counts]
+                if any(position is None for position in rest_positions):
+                    spread = math.inf
+                    distance = 0.0
+                else:
+                    distances = [position.x - start[0] for position in rest_positions]
+                    spread = max(distances) - min(distances)
+                    distance = max(distances)
+                shot_passed = spread <= max(REST_POSITION_MIN_TOLERANCE, REST_POSITION_TOLERANCE * distance)
+                passed &= shot_passed
+
+                print(f"{name:<12}{material + ' ' + str(slope) + '°':<14}{str(shot):>14}" +
+                      "".join(f"{position.x:>9.1f}" if position is not None else f"{'moving':>9}"
+                              for position in rest_positions) +
+                      f"{spread:>9.1f}" + ("" if shot_passed else "  FAILED"))
+    return passed
+
+
+def check_ballistic_positions(sub_step_counts: tuple = SUB_STEP_COUNTS) -> bool:
+    """
+    Flies balls with the discrete solver, without any ground, and compares every sub-step position with
+    physics_utils.ballistic_positions, evaluated once for all the launches and sub-steps.
+
+    :param sub_step_counts: Sub-step counts to compare.
+    :return: True if the closed forms stay within their tolerances of the integrator.
+    """
+    print(f"{'sub-steps':<11}{'sub-step form':>15}{'continuous':>12}")
+    passed = True
+    for sub_steps in sub_step_counts:
+        dt = 1.0 / (CHECK_FPS * sub_steps)
+        step_count = int(BALLISTIC_DURATION / dt)
+        start = (100.0, 200.0)
+
+        integrated = []
+        for launch in BALLISTIC_LAUNCHES:
+            ball = Ball(pygame.Vector2(start), CHECK_BALL_DIAMETER, 0.047, pygame.Color("white"))
+            ball.velocity = pygame.Vector2(launch)
+            ball.is_moving = True
+            positions = []
+            for _ in range(step_count):
+                physics.update_ball_physics(ball, [], [], dt)
+                positions.append((ball.position.x, ball.position.y))
+            integrated.append(positions)
+
+        times = [(step + 1) * dt for step in range(step_count)]
+        starts = [start] * len(BALLISTIC_LAUNCHES)
+        sub_step_error = max_distance(ballistic_positions(starts, BALLISTIC_LAUNCHES, times, dt=dt), integrated)
+        continuous_error = max_distance(ballistic_positions(starts, BALLISTIC_LAUNCHES, times), integrated)
+        count_passed = sub_step_error <= BALLISTIC_TOLERANCE and continuous_error <= BALLISTIC_CONTINUOUS_TOLERANCE
+        passed &= count_passed
+
+        print(f"{sub_steps:<11}{sub_step_error:>15.2e}{continuous_error:>12.3f}" + ("" if count_passed else "  FAILED"))
+    return passed
+
+
+def play_side_by_side(backends: list, start: tuple, velocity: tuple) -> tuple:
+    """
+    Plays the same shot with several backends, frame by frame, each backend running its own sub-steps.
+
+    :param backends: PhysicsBackend objects, with the same level loaded.
+    :param start: Start position of the ball.
+    :param velocity: Initial velocity of the ball.
+    :return: (rest_positions, divergence): the rest position of the ball with each backend (None if it was still
+             moving after CHECK_MAX_TIME), and the largest distance between the balls at the end of a frame.
+    """
+    balls = []
+    for backend in backends:
+        if backend.triggers is not None:
+            backend.triggers.reset()
+        ball = Ball(pygame.Vector2(start), CHECK_BALL_DIAMETER, 0.047, pygame.Color("white"))
+        ball.velocity = pygame.Vector2(velocity)
+        ball.is_moving = True
+        balls.append(ball)
+
+    divergence = 0.0
+    for _ in range(int(CHECK_MAX_TIME * CHECK_FPS)):
+        for backend, ball in zip(backends, balls):
+            dt = 1.0 / (CHECK_FPS * backend.sub_steps)
+            for _ in range(backend.sub_steps):
+                if not ball.is_moving or not backend.step(ball, dt)[0]:
+                    ball.is_moving = False
+                    break
+        divergence = max(divergence, max(ball.position.distance_to(balls[0].position) for ball in balls))
+        if not any(ball.is_moving for ball in balls):
+            break
+    return [None if ball.is_moving else ball.position for ball in balls], divergence
+
+
+def check_backend_equivalence(first: str = "reference", second: str = "vectorized", levels: tuple = CHECK_LEVELS) -> bool:
+    """
+    Plays the shots of the checks on the check grounds, and the level shots on the shipped levels, with two physics
+    backends side by side and prints, for every shot, the largest distance between the two balls during the shot
+    and the distance between their rest positions. Only the backends sharing a contact model (see
+    PhysicsBackend.contact_model) can be compared.
+
+    :param first: Name of the first backend (see physics_backends.PHYSICS_BACKENDS).
+    :param second: Name of the second backend.
+    :param levels: Numbers of the shipped levels to play.
+    :return: True if the rest positions of every shot agree within BACKEND_REST_TOLERANCE.
+    """
+    contact_models = [create_physics_backend(name).contact_model for name in (first, second)]
+    if contact_models[0] != contact_models[1]:
+        print(f"The {first} backend ({contact_models[0]} contacts) and the {second} backend "
+              f"({contact_models[1]} contacts) do not share a contact model, they cannot be compared")
+        return False
+
+    print(f"{'ground':<14}{'shot':>14}{first:>12}{second:>12}{'divergence':>12}{'rest':>8}")
+    passed = True
+    for material, slope in CHECK_GROUNDS:
+        backends = [create_physics_backend(first), create_physics_backend(second)]
+        for backend in backends:
+            load_check_ground(backend, material, slope)
+        start = (100, 300 - CHECK_BALL_DIAMETER * 7 / 2 - 100)
+        for shot in CHECK_SHOTS:
+            passed &= compare_backends(backends, material + ' ' + str(slope) + '°', start, shot, shot)
+
+    for level_number in levels:
+        level = CheckLevel(level_number)
+        backends = [create_physics_backend(first), create_physics_backend(second)]
+        for backend in backends:
+            level.load(backend)
+        for force, angle in CHECK_LEVEL_SHOTS:
+            passed &= compare_backends(backends, f"level {level_number}", level.start, shot_velocity(force, angle),
+                                       (force, angle))
+    return passed
+
+
+def compare_backends(backends: list, ground: str, start: tuple, velocity: tuple, shot: tuple) -> bool:
+    """
+    Plays a shot with two backends side by side and prints the row of the shot (see check_backend_equivalence).
+
+    :param backends: The two PhysicsBackend objects, with the same ground or level loaded.
+    :param ground: Name of the ground or level, printed.
+    :param start: Start position of the ball.
+    :param velocity: Initial velocity of the ball.
+    :param shot: Description of the shot, printed.
+    :return: True if the rest positions agree within BACKEND_REST_TOLERANCE.
+    """
+    rest_positions, divergence = play_side_by_side(backends, start, velocity)
+    if any(position is None for position in rest_positions):
+        rest_distance = math.inf
+    else:
+        rest_distance = rest_positions[0].distance_to(rest_positions[1])
+    shot_passed = rest_distance <= BACKEND_REST_TOLERANCE
+
+    print(f"{ground:<14}{str(shot):>14}" +
+          "".join(f"{position.x:>12.1f}" if position is not None else f"{'moving':>12}"
+                  for position in rest_positions) +
+          f"{divergence:>12.1f}{rest_distance:>8.1f}" + ("" if shot_passed else "  FAILED"))
+    return shot_passed
+
+
+def check_level_shots(backends: tuple = LEVEL_SHOT_BACKENDS, levels: tuple = CHECK_LEVELS) -> bool:
+    """
+    Plays the level shots and the grazing shots on the shipped levels with every backend and prints where they
+    ended. The backends with different contact models stop the ball at different places, only the end of the
+    shots is checked: each one must end at rest, in a hazard or in the hole before CHECK_MAX_TIME. The grazing shots
+    must also end within GRAZING_REST_TOLERANCE of each other with the backends using edge contacts.
+
+    :param backends: Names of the physics backends to check (see physics_backends.PHYSICS_BACKENDS).
+    :param levels: Numbers of the shipped levels to play.
+    :return: True if every shot ended with every backend.
+    """
+    shots = sorted({(level_number, force, angle) for level_number in levels for force, angle in CHECK_LEVEL_SHOTS} |
+                   set(GRAZING_SHOTS))
+    print(f"{'level':<7}{'shot':>14}" + "".join(f"{name:>18}" for name in backends))
+    passed = True
+    for level_number in sorted({shot[0] for shot in shots}):
+        level = CheckLevel(level_number)
+        loaded = [create_physics_backend(name) for name in backends]
+        for backend in loaded:
+            level.load(backend)
+
+        for _, force, angle in [shot for shot in shots if shot[0] == level_number]:
+            rest_positions = [play_side_by_side([backend], level.start, shot_velocity(force, angle))[0][0]
+                              for backend in loaded]
+            shot_passed = all(position is not None for position in rest_positions)
+            if shot_passed and (level_number, force, angle) in GRAZING_SHOTS:
+                edge_positions = [position for backend, position in zip(loaded, rest_positions)
+                                  if backend.contact_model == "edge"]
+                shot_passed = all(position.distance_to(edge_positions[0]) <= GRAZING_REST_TOLERANCE
+                                  for position in edge_positions)
+            passed &= shot_passed
+
+            print(f"{level_number:<7}{str((force, angle)):>14}" +
+                  "".join(f"{f'({position.x:.1f}, {position.y:.1f})':>18}" if position is not None
+                          else f"{'moving':>18}" for position in rest_positions) +
+                  ("" if shot_passed else "  FAILED"))
+    return passed
+
+
+def check_sleep(sub_steps: int = SLEEP_CHECK_SUB_STEPS) -> bool:
+    """
+    Holds a ball in place with the velocity of a ball wedged against a vertex, and prints the time physics.update_sleep
+    took to put it to sleep. Touching a surface at every step, the ball must fall asleep after SLEEP_WINDOW whatever
+    its speed. The same ball out of contact must not: its energy is that of a ball in flight.
+
+    :param sub_steps: Number of physics sub-steps per frame.
+    :return: True if only the ball in contact fell asleep, after SLEEP_WINDOW.
+    """
+    dt = 1.0 / (CHECK_FPS * sub_steps)
+    print(f"{'ball':<12}{'asleep after':>14}")
+    passed = True
+    for in_contact in (True, False):
+        ball = Ball(pygame.Vector2(100, 100), CHECK_BALL_DIAMETER, 0.047, pygame.Color("white"))
+        ball.velocity = pygame.Vector2(SLEEP_HELD_VELOCITY)
+        ball.is_moving = True
+        ball.time_since_contact = 0.0 if in_contact else physics.SLEEP_WINDOW
+
+        asleep_time = None
+        for step in range(int(2 * physics.SLEEP_WINDOW / dt)):
+            if in_contact:
+                ball.time_since_contact = 0.0  # The solver pushes the ball out of the surface at every step
+            else:
+                ball.time_since_contact += dt
+            if physics.update_sleep(ball, dt):
+                asleep_time = (step + 1) * dt
+                break
+
+        if in_contact:
+            # The first step anchors the window
+            ball_passed = asleep_time is not None and asleep_time <= physics.SLEEP_WINDOW + 2 * dt + 1e-9
+        else:
+            ball_passed = asleep_time is None
+        passed &= ball_passed
+        print(f"{'in contact' if in_contact else 'in flight':<12}" +
+              (f"{asleep_time:>12.3f} s" if asleep_time is not None else f"{'awake':>14}") +
+              ("" if ball_passed else "  FAILED"))
+    return passed
+
+
+def check_kinematic_bodies(level_number: int = KINEMATIC_CHECK_LEVEL, body_count: int = KINEMATIC_BODY_COUNT,
+                           frames: int = KINEMATIC_FRAMES) -> bool:
+    """
+    Animates obstacles of a shipped level, every other one sliding up and down and the others spinning, as the Game
+    scene animates its kinematic bodies. Checks at every frame that only the slots of the moved obstacles changed in
+    the collision world, and that they hold the edges of their obstacle. A resting ball is put above the first
+    sliding obstacle: it must stay asleep until the obstacle reaches it, then wake up. Prints the cost of a frame.
+
+    :param level_number: Number of the shipped level.
+    :param body_count: Number of obstacles to animate.
+    :param frames: Number of frames to animate, at CHECK_FPS.
+    :return: True if the world and the ball were updated as expected.
+    """
+    level = CheckLevel(level_number)
+    world = level.world
+    if len(level.obstacles) < body_count:
+        print(f"Level {level_number} has {len(level.obstacles)} collidable obstacles, {body_count} are needed  FAILED")
+        return False
+
+    for number, obstacle in enumerate(level.obstacles[:body_count]):
+        if number % 2:
+            obstacle.motion = kinematics.KinematicMotion([(0, 0), (0, -KINEMATIC_LIFT)], KINEMATIC_SPEED)
+        else:
+            obstacle.motion = kinematics.KinematicMotion(angular_speed=KINEMATIC_ANGULAR_SPEED)
+    bodies = kinematics.build_kinematic_bodies(level.obstacles)
+
+    platform = bodies[1].obstacle
+    platform_index = world.indices[id(platform)]
+    ball = Ball(pygame.Vector2(platform.rect.centerx, platform.rect.top - KINEMATIC_BALL_GAP), CHECK_BALL_DIAMETER,
+                0.047, pygame.Color("white"))
+    woken_frame = None
+    ball_passed = False
+
+    slots_passed = True
+    for frame in range(frames):
+        starts, vectors = world.starts.copy(), world.vectors.copy()
+        moved = kinematics.update_kinematic_bodies(bodies, (frame + 1) / CHECK_FPS, world)
+
+        moved_indices = {world.indices[id(body.obstacle)] for body in moved}
+        changed = (np.any(world.starts[:len(starts)] != starts, axis=1) |
+                   np.any(world.vectors[:len(vectors)] != vectors, axis=1))
+        slots_passed &= set(world.edge_owners[:len(starts)][changed].tolist()) <= moved_indices
+        for body in moved:
+            slot = world.edge_ranges[world.indices[id(body.obstacle)]]
+            edges = body.obstacle.get_collision_edges()
+            slots_passed &= np.array_equal(world.starts[slot], edges.starts) and np.array_equal(world.vectors[slot],
+                                                                                                  edges.vectors)
+
+        if woken_frame is None and kinematics.touches_ball(moved, ball):
+            # Woken up before the platform pushes into the ball
+            woken_frame = frame
+            ball_passed = not world.contact_manifold(ball.position, ball.radius, [platform_index])
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        kinematics.update_kinematic_bodies(bodies, (frames + frame + 1) / CHECK_FPS, world)
+    frame_cost = (time.perf_counter() - start) / frames
+
+    print(f"{len(bodies)} obstacles animated on level {level_number}, {frame_cost * 1000:.2f} ms per frame")
+    print(f"Only the moved slots changed: {'yes' if slots_passed else 'no  FAILED'}")
+    print(f"Resting ball woken up by the platform at frame {woken_frame}" + ("" if ball_passed else "  FAILED"))
+    return slots_passed and ball_passed
+
+
+def max_distance(predicted, integrated: list) -> float:
+    """Largest distance between the predicted positions (N, T, 2) and the integrated ones, in pixels"""
+    return max(math.dist(predicted_position, position)
+               for predicted_path, path in zip(predicted.tolist(), integrated)
+               for predicted_position, position in zip(predicted_path, path))
+
+
+if __name__ == "__main__":
+    # python -m src.physics_checks [first_backend second_backend]
+    pygame.init()
+    pygame.display.set_mode(CHECK_SCREEN_SIZE, pygame.HIDDEN)
+    results = [check_sub_step_invariance(), check_ballistic_positions(), check_sleep(), check_kinematic_bodies(),
+               check_level_shots(), check_backend_equivalence(*sys.argv[1:3])]
+    print("All checks passed" if all(results) else "Some checks FAILED")
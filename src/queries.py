@@ -0,0 +1,391 @@
+import numpy as np
+import pygame
+
+from src import ccd
+
+QUERY_CELL_SIZE = 64  # Cell size (pixels) of the edge grid walked by the queries
+QUERY_MAX_DISTANCE = 2000.0  # Default length of the casts and search radius of the nearest surface queries (pixels)
+QUERY_CAST_STRETCH = 256.0  # Distance (pixels) the casts advance by before the casts that hit something are dropped
+
+
+class QueryHit:
+    """Level geometry found by a query"""
+
+    def __init__(self, position: pygame.Vector2, point: pygame.Vector2, normal: pygame.Vector2, distance: float,
+                 entity_index: int, material: int):
+        """
+        :param position: Position of the ray or of the circle center when it touched the surface, the queried point
+                         for the nearest surface queries.
+        :param point: Point of the surface that was found.
+        :param normal: Unit normal of the surface at the point, pointing towards the position.
+        :param distance: Distance travelled by the cast before the hit, or distance between the point and the
+                         surface for the nearest surface queries.
+        :param entity_index: Index of the entity of the surface in the CollisionWorld.
+        :param material: Material ID of the entity (see materials.MaterialTable).
+        """
+        self.position = position
+        self.point = point
+        self.normal = normal
+        self.distance = distance
+        self.entity_index = entity_index
+        self.material = material
+
+
+class QueryHits:
+    """
+        Results of a batch of queries as arrays, one row per query, for the callers running many queries per frame
+        (see LevelQueries.circle_cast_arrays). The rows of the queries that found nothing have hit set to False, an
+        infinite distance and an entity index of -1.
+    """
+
+    def __init__(self, count: int):
+        self.hit = np.zeros(count, dtype=bool)
+        self.positions = np.full((count, 2), np.nan)  # See QueryHit
+        self.points = np.full((count, 2), np.nan)
+        self.normals = np.full((count, 2), np.nan)
+        self.distances = np.full(count, np.inf)
+        self.entity_indices = np.full(count, -1, dtype=np.int64)
+        self.materials = np.full(count, -1, dtype=np.int64)
+
+    def to_list(self) -> list:
+        """Returns the results as a list of QueryHit, or None for the queries that found nothing"""
+        results = [None] * len(self.hit)
+        found = np.nonzero(self.hit)[0]
+        for query, position, point, normal, distance, entity_index, material in zip(
+                found.tolist(), self.positions[found].tolist(), self.points[found].tolist(),
+                self.normals[found].tolist(), self.distances[found].tolist(), self.entity_indices[found].tolist(),
+                self.materials[found].tolist()):
+            results[query] = QueryHit(pygame.Vector2(position), pygame.Vector2(point), pygame.Vector2(normal),
+                                      distance, entity_index, material)
+        return results
+
+
+def box_cells(mins: np.ndarray, maxs: np.ndarray) -> tuple:
+    """
+    Lists the cells covered by boxes of cells.
+
+    :param mins: (N, 2) int array of the first cell (x, y) of each box.
+    :param maxs: (N, 2) int array of the last cell (x, y) of each box, included.
+    :return: (box_indices, cell_xs, cell_ys): one item per covered cell.
+    """
+    widths = maxs[:, 0] - mins[:, 0] + 1
+    counts = widths * (maxs[:, 1] - mins[:, 1] + 1)
+    box_indices = np.repeat(np.arange(len(mins)), counts)
+    local = np.arange(len(box_indices)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return (box_indices, mins[box_indices, 0] + local % widths[box_indices],
+            mins[box_indices, 1] + local // widths[box_indices])
+
+
+def ray_hit_times(origins: np.ndarray, motions: np.ndarray, starts: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """
+    Intersects (ray, edge) pairs, a cheaper test than ccd.impact_times for circles of radius 0.
+
+    :param origins: (N, 2) array of the rays origins.
+    :param motions: (N, 2) array of the rays vectors, from their origin to their end.
+    :param starts: (N, 2) array of the edges start points.
+    :param vectors: (N, 2) array of the edges vectors (end - start).
+    :return: (N,) array of the fraction of each ray before its edge, in [0, 1], inf for the missed edges.
+    """
+    to_starts = starts - origins
+    denominators = motions[:, 0] * vectors[:, 1] - motions[:, 1] * vectors[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        times = (to_starts[:, 0] * vectors[:, 1] - to_starts[:, 1] * vectors[:, 0]) / denominators
+        ratios = (to_starts[:, 0] * motions[:, 1] - to_starts[:, 1] * motions[:, 0]) / denominators
+    # Parallel edges are never hit, the edges next to them are
+    hits = (np.abs(denominators) > 1e-12) & (times >= 0.0) & (times <= 1.0) & (ratios >= 0.0) & (ratios <= 1.0)
+    return np.where(hits, times, np.inf)
+
+
+class LevelQueries:
+    """
+        Geometric queries on the collision geometry of a level: ray casts, circle casts and nearest surface.
+        The edges of the CollisionWorld are registered at load time in a uniform grid, so a query only tests the
+        edges of the cells along its path. Queries are answered in batches: the (query, edge) pairs of every
+        query are gathered and tested at once. The single query functions are batches of one, and the *_arrays
+        functions skip the QueryHit objects: a thousand casts of a few hundred pixels take a few milliseconds.
+        The entities that move (kinematic obstacles) are kept out of the grid once they moved, their few edges are
+        tested against the box of every query instead (see update_entities).
+    """
+
+    def __init__(self, world, cell_size: int = QUERY_CELL_SIZE):
+        """
+        :param world: The CollisionWorld of the level.
+        :param cell_size: Width and height of a grid cell, in pixels.
+        """
+        self.world = world
+        self.cell_size = cell_size
+        self.moving = set()  # Indices of the entities that moved, kept out of the grid
+        self.moving_edges = np.zeros(0, np.int64)  # Edges of the moving entities and their boxes
+        self.moving_mins = np.zeros((0, 2))
+        self.moving_maxs = np.zeros((0, 2))
+        self.build()
+
+    def build(self):
+        """Registers every edge of the static entities of the world in the cells its bounding box overlaps"""
+        world = self.world
+        static_ranges = [edge_range for index, edge_range in enumerate(world.edge_ranges) if index not in self.moving]
+        self.edge_indices = (np.concatenate(static_ranges).astype(np.int64) if static_ranges
+                             else np.zeros(0, np.int64))
+        starts = world.starts[self.edge_indices]
+        ends = starts + world.vectors[self.edge_indices]
+        edge_mins = np.floor(np.minimum(starts, ends) / self.cell_size).astype(np.int64)
+        edge_maxs = np.floor(np.maximum(starts, ends) / self.cell_size).astype(np.int64)
+
+        if len(self.edge_indices):
+            self.origin = edge_mins.min(axis=0)
+            self.size = edge_maxs.max(axis=0) - self.origin + 1
+        else:
+            self.origin = np.zeros(2, np.int64)
+            self.size = np.ones(2, np.int64)
+
+        # Compressed cells: the edges of the cell c are cell_edges[cell_offsets[c]:cell_offsets[c + 1]]
+        owners, cell_xs, cell_ys = box_cells(edge_mins - self.origin, edge_maxs - self.origin)
+        cells = cell_ys * self.size[0] + cell_xs
+        order = np.argsort(cells, kind="stable")
+        self.cell_edges = self.edge_indices[owners[order]]
+        self.cell_offsets = np.concatenate(([0], np.cumsum(np.bincount(cells, minlength=int(self.size.prod())))))
+
+    def update_entities(self, entities: list):
+        """
+        Follows entities of the world that moved, once their slots of the world were updated. An entity moving for
+        the first time leaves the grid, which is built again without it. Then only the boxes of the edges of the
+        moving entities are computed again, the grid is left untouched.
+
+        :param entities: The moved entities.
+        """
+        world = self.world
+        indices = {world.indices[id(entity)] for entity in entities if id(entity) in world.indices}
+        if not indices <= self.moving:
+            self.moving |= indices
+            self.build()
+
+        # The slots of the moving entities may have been moved (see CollisionWorld.update_entity)
+        self.moving_edges = np.concatenate([world.edge_ranges[index] for index in sorted(self.moving)]).astype(np.int64)
+        starts = world.starts[self.moving_edges]
+        ends = starts + world.vectors[self.moving_edges]
+        self.moving_mins = np.minimum(starts, ends)
+        self.moving_maxs = np.maximum(starts, ends)
+
+    def candidate_pairs(self, starts: np.ndarray, ends: np.ndarray, reach: np.ndarray) -> tuple:
+        """
+        Finds the edges registered along the segments of several queries. The segments are cut in pieces no
+        longer than a cell, and every piece looks up the cells of its box grown by the reach of the query.
+
+        :param starts: (N, 2) array of the segments start points.
+        :param ends: (N, 2) array of the segments end points.
+        :param reach: (N,) array of the distance around each segment where the edges are looked for.
+        :return: (query_indices, edge_indices) arrays of the candidate pairs, sorted by query. An edge may appear
+                 more than once.
+        """
+        lengths = np.hypot(*(ends - starts).T)
+        pieces = np.maximum(np.ceil(lengths / self.cell_size), 1).astype(np.int64)
+        piece_queries = np.repeat(np.arange(len(starts)), pieces)
+        piece_indices = np.arange(len(piece_queries)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        ratios = (piece_indices + 0.5) / pieces[piece_queries]
+        middles = starts[piece_queries] + ratios[:, None] * (ends - starts)[piece_queries]
+        half_sizes = (lengths / pieces / 2 + reach)[piece_queries, None]
+
+        mins = np.floor((middles - half_sizes) / self.cell_size).astype(np.int64) - self.origin
+        maxs = np.floor((middles + half_sizes) / self.cell_size).astype(np.int64) - self.origin
+        inside = np.all((maxs >= 0) & (mins < self.size), axis=1)
+        mins = np.maximum(mins[inside], 0)
+        maxs = np.minimum(maxs[inside], self.size - 1)
+        piece_queries = piece_queries[inside]
+
+        # Cells of every query, once each: only the boxes of the pieces of a same segment overlap
+        boxes, cell_xs, cell_ys = box_cells(mins, maxs)
+        cell_count = int(self.size.prod())
+        keys = piece_queries[boxes] * cell_count + cell_ys * self.size[0] + cell_xs
+        if len(piece_queries) > len(starts):
+            keys = np.unique(keys)
+        queries, cells = keys // cell_count, keys % cell_count
+
+        counts = self.cell_offsets[cells + 1] - self.cell_offsets[cells]
+        positions = np.repeat(self.cell_offsets[cells] - (np.cumsum(counts) - counts), counts)
+        query_indices = np.repeat(queries, counts)
+        edge_indices = self.cell_edges[positions + np.arange(len(positions))]
+        if len(self.moving_edges) == 0:
+            return query_indices, edge_indices
+
+        # Edges of the moving entities whose box overlaps the box of the segment
+        box_mins = np.minimum(starts, ends) - reach[:, None]
+        box_maxs = np.maximum(starts, ends) + reach[:, None]
+        moving_queries, moving_edges = np.nonzero(
+            np.all((self.moving_mins[None] <= box_maxs[:, None]) & (self.moving_maxs[None] >= box_mins[:, None]),
+                   axis=2))
+        query_indices = np.concatenate((query_indices, moving_queries))
+        edge_indices = np.concatenate((edge_indices, self.moving_edges[moving_edges]))
+        order = np.argsort(query_indices, kind="stable")
+        return query_indices[order], edge_indices[order]
+
+    @staticmethod
+    def first_pairs(query_indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Finds the pair with the smallest value of every query, ignoring the infinite values.
+
+        :param query_indices: Query of every pair, sorted as returned by candidate_pairs.
+        :param values: Value of every pair.
+        :return: Indices of the kept pairs, one per query having a finite value, in the order of the queries.
+        """
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.int64)
+        group_starts = np.nonzero(np.concatenate(([True], query_indices[1:] != query_indices[:-1])))[0]
+        minimums = np.repeat(np.minimum.reduceat(values, group_starts), np.diff(np.append(group_starts, len(values))))
+        best = np.nonzero((values == minimums) & np.isfinite(values))[0]
+        best_queries = query_indices[best]
+        return best[np.concatenate(([True], best_queries[1:] != best_queries[:-1]))[:len(best)]]
+
+    def circle_casts(self, origins, directions, radius, max_distance: float = QUERY_MAX_DISTANCE) -> list:
+        """
+        Moves circles in straight lines and finds the first surface each one touches.
+
+        :param origins: Start positions of the circle centers, (N, 2) array or list of pairs.
+        :param directions: Directions of the casts, (N, 2) array or list of pairs. They do not need to be unit
+                           vectors, a null direction never hits.
+        :param radius: Radius of the circles, a float or one per query.
+        :param max_distance: Distance travelled by the circles, in pixels.
+        :return: List of QueryHit, or None for the casts that hit nothing, in the order of the queries.
+        """
+        return self.circle_cast_arrays(origins, directions, radius, max_distance).to_list()
+
+    def circle_cast_arrays(self, origins, directions, radius, max_distance: float = QUERY_MAX_DISTANCE) -> QueryHits:
+        """Same as circle_casts, returns the results as QueryHits arrays"""
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 2)
+        radii = np.broadcast_to(np.asarray(radius, dtype=np.float64), len(origins))
+        lengths = np.hypot(*directions.T)
+        units = directions / np.where(lengths > 1e-12, lengths, 1.0)[:, None]
+        world = self.world
+
+        # The casts advance by stretches so that the casts hitting early do not gather the edges of their whole path
+        results = QueryHits(len(origins))
+        pending = np.nonzero(lengths > 1e-12)[0]
+        travelled = 0.0
+        while len(pending) and travelled < max_distance:
+            stretch = min(QUERY_CAST_STRETCH, max_distance - travelled)
+            starts = origins[pending] + units[pending] * travelled
+            motions = units[pending] * stretch
+            query_indices, edge_indices = self.candidate_pairs(starts, starts + motions, radii[pending])
+            edge_starts, edge_vectors = world.starts[edge_indices], world.vectors[edge_indices]
+            if radii[pending].any():
+                times = ccd.impact_times(starts[query_indices], motions[query_indices], radii[pending][query_indices],
+                                         edge_starts, edge_vectors, world.inv_length_sq[edge_indices])
+            else:
+                times = ray_hit_times(starts[query_indices], motions[query_indices], edge_starts, edge_vectors)
+            pairs = self.first_pairs(query_indices, times)
+            queries, edges, times = query_indices[pairs], edge_indices[pairs], times[pairs]
+
+            # Touched point of every hit edge, the normal goes from it to the circle center
+            centers = starts[queries] + times[:, None] * motions[queries]
+            edge_starts, edge_vectors = world.starts[edges], world.vectors[edges]
+            t = np.clip(np.einsum("ij,ij->i", centers - edge_starts, edge_vectors) * world.inv_length_sq[edges],
+                        0.0, 1.0)
+            points = edge_starts + t[:, None] * edge_vectors
+            normals = centers - points
+            # A ray touches the surface itself: the normal is the side of the edge facing the cast
+            on_surface = np.einsum("ij,ij->i", normals, normals) < 1e-12
+            edge_normals = np.column_stack((-edge_vectors[:, 1], edge_vectors[:, 0]))
+            edge_normals[np.einsum("ij,ij->i", edge_normals, motions[queries]) > 0] *= -1
+            normals[on_surface] = edge_normals[on_surface]
+            normals /= np.hypot(*normals.T)[:, None]
+
+            hit_queries = pending[queries]
+            entities = world.edge_owners[edges]
+            results.hit[hit_queries] = True
+            results.positions[hit_queries] = centers
+            results.points[hit_queries] = points
+            results.normals[hit_queries] = normals
+            results.distances[hit_queries] = travelled + times * stretch
+            results.entity_indices[hit_queries] = entities
+            results.materials[hit_queries] = world.material_ids[entities]
+
+            missed = np.ones(len(pending), dtype=bool)
+            missed[queries] = False
+            pending = pending[missed]
+            travelled += stretch
+        return results
+
+    def raycasts(self, origins, directions, max_distance: float = QUERY_MAX_DISTANCE) -> list:
+        """
+        Casts rays and finds the first surface each one hits (circle casts of radius 0).
+
+        :return: List of QueryHit, or None for the rays that hit nothing, in the order of the queries.
+        """
+        return self.circle_casts(origins, directions, 0.0, max_distance)
+
+    def raycast_arrays(self, origins, directions, max_distance: float = QUERY_MAX_DISTANCE) -> QueryHits:
+        """Same as raycasts, returns the results as QueryHits arrays"""
+        return self.circle_cast_arrays(origins, directions, 0.0, max_distance)
+
+    def nearest_surfaces(self, points, max_distance: float = QUERY_MAX_DISTANCE) -> list:
+        """
+        Finds the closest surface of several points. The search starts around the points and only grows for the
+        points with no surface nearby, so far surfaces do not slow down the common case.
+
+        :param points: The points, (N, 2) array or list of pairs.
+        :param max_distance: Search distance, in pixels.
+        :return: List of QueryHit, or None for the points further than max_distance from any surface.
+        """
+        return self.nearest_surface_arrays(points, max_distance).to_list()
+
+    def nearest_surface_arrays(self, points, max_distance: float = QUERY_MAX_DISTANCE) -> QueryHits:
+        """Same as nearest_surfaces, returns the results as QueryHits arrays"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        results = QueryHits(len(points))
+        world = self.world
+        pending = np.arange(len(points))
+        reach = min(self.cell_size, max_distance)
+        while len(pending):
+            query_indices, edge_indices = self.candidate_pairs(points[pending], points[pending],
+                                                               np.full(len(pending), reach))
+            starts, vectors = world.starts[edge_indices], world.vectors[edge_indices]
+            to_points = points[pending[query_indices]] - starts
+            t = np.clip(np.einsum("ij,ij->i", to_points, vectors) * world.inv_length_sq[edge_indices], 0.0, 1.0)
+            offsets = to_points - t[:, None] * vectors
+            dist_sq = np.einsum("ij,ij->i", offsets, offsets)
+            # Edges further than the reach may hide closer ones outside of the searched cells
+            dist_sq[dist_sq > reach * reach] = np.inf
+
+            pairs = self.first_pairs(query_indices, dist_sq)
+            distances = np.sqrt(dist_sq[pairs])
+            # Default normal as narrow_phase.contact_from_offset, for the points on a surface
+            normals = np.tile((0.0, -1.0), (len(pairs), 1))
+            away = distances > 1e-6
+            normals[away] = offsets[pairs][away] / distances[away, None]
+
+            queries = pending[query_indices[pairs]]
+            entities = world.edge_owners[edge_indices[pairs]]
+            results.hit[queries] = True
+            results.positions[queries] = points[queries]
+            results.points[queries] = points[queries] - offsets[pairs]
+            results.normals[queries] = normals
+            results.distances[queries] = distances
+            results.entity_indices[queries] = entities
+            results.materials[queries] = world.material_ids[entities]
+
+            if reach >= max_distance:
+                break
+            pending = pending[~results.hit[pending]]
+            reach = min(reach * 2, max_distance)
+        return results
+
+    def circle_cast(self, origin, direction, radius: float, max_distance: float = QUERY_MAX_DISTANCE):
+        """Casts a single circle, see circle_casts. Returns a QueryHit or None"""
+        return self.circle_casts([origin], [direction], radius, max_distance)[0]
+
+    def raycast(self, origin, direction, max_distance: float = QUERY_MAX_DISTANCE):
+        """Casts a single ray, see raycasts. Returns a QueryHit or None"""
+        return self.circle_casts([origin], [direction], 0.0, max_distance)[0]
+
+    def nearest_surface(self, point, max_distance: float = QUERY_MAX_DISTANCE):
+        """Finds the closest surface of a single point, see nearest_surfaces. Returns a QueryHit or None"""
+        return self.nearest_surfaces([point], max_distance)[0]
+
+    def material_at(self, point, max_distance: float = QUERY_MAX_DISTANCE):
+        """
+        Material of the closest surface of a point.
+
+        :return: The material ID, or None if no surface is within max_distance.
+        """
+        hit = self.nearest_surface(point, max_distance)
+        return hit.material if hit is not None else None
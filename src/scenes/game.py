@@ -10,7 +10,15 @@ import json
 import os
 from datetime import datetime
 from src.scene import Scene, SceneType
+from src.events import collision_events, interact_events
 from src import physics
+from src.collision_world import CollisionWorld
+from src.physics_backends import create_physics_backend
+from src import shot_timeline
+from src import kinematics
+from src.materials import get_material_table
+from src.terrain_optimizer import optimize_terrain
+from src.triggers import build_trigger_index, is_trigger_terrain, TRIGGER_HOLE
 
 
 BALL_START_X, BALL_START_Y = 0, 0  # Default start position
@@ -20,10 +28,11 @@ PRECISION_NB_DOTS = 6 # Number of dots to draw
 PREDICTION_DOT_SPACING = PREDICTION_STEPS//PRECISION_NB_DOTS # Draw a dot every N steps
 PREDICTION_DOT_RADIUS = 5
 PREDICTION_DOT_COLOR = (255, 255, 255, 150) # Semi-transparent white
-PHYSICS_SUB_STEPS = 8 # Number of physics sub-steps per frame
+BROAD_PHASE_CELL_SIZE = 256 # Size of a spatial hash cell, in pixels
 
 class Game(Scene):
-    def __init__(self, screen, levels_dir_path: str, scene_from: SceneType = None):  # Keep existing signature
+    def __init__(self, screen, levels_dir_path: str, scene_from: SceneType = None,
+                 physics_backend: str = None):  # Keep existing signature
         super().__init__(screen, SceneType.GAME, "Game", scene_from)
         self.dragging = False
 
@@ -34,16 +43,28 @@ class Game(Scene):
         self.width = self.screen.get_width()
         self.height = self.screen.get_height()
 
-        # Physics sub-stepping variables
-        self.physics_sub_steps = PHYSICS_SUB_STEPS
+        # Physics backend (see physics_backends.PHYSICS_BACKENDS), from the command line or the settings, and
+        # sub-stepping variables
+        self.physics_backend = create_physics_backend(physics_backend or
+                                                      self.settings.get("physics", {}).get("solver"))
+        self.physics_sub_steps = self.physics_backend.sub_steps
         target_fps = getattr(self, 'fps', 200)
         if target_fps <= 0: target_fps = 60  # Ensure FPS is positive
         self.fixed_dt = 1.0 / (target_fps * self.physics_sub_steps)
         self.physics_accumulator = 0.0
+        self.physics_steps_last_frame = 0  # Number of physics steps run during the last frame
+
+        # Adaptive sub-stepping: the step size follows the ball speed and clearance, within an error bound
+        physics_settings = self.settings.get("physics", {})
+        self.adaptive_sub_steps = physics_settings.get("adaptive_sub_steps", False)
+        self.physics_max_step_error = physics_settings.get("max_step_error", physics.ADAPTIVE_MAX_STEP_ERROR)
+        # Shot timeline: the whole shot is simulated by a worker when it is played, the frames only play it back
+        self.shot_timeline_enabled = physics_settings.get("shot_timeline", False)
+        self.shot_playback = None  # shot_timeline.ShotPlayback of the shot being played back
+        # Collision-aware aiming preview, simulated with the physics steps of the game
+        self.trajectory_preview = TrajectoryPreview(self.simulate_step, self.fixed_dt, PREDICTION_STEPS,
+                                                    PREDICTION_DOT_SPACING)
 
-        self.physics_last_collided_object_id = None
-        self.physics_collision_toggle_count = 0
-        self.max_toggle_toggles = 4
 
         self.level_dir = levels_dir_path
         self.level_path = f"{self.level_dir}/level1.json"  # default level
@@ -59,6 +80,7 @@ class Game(Scene):
 
         self.terrain_polys = level_loader.json_to_list(self.terrain_data, self.screen, 0)
         self.obstacles = level_loader.json_to_list(self.obstacles_data, self.screen, 1)
+        self.kill_plane_y = level_loader.get_kill_plane_y(self.terrain_data, self.screen)
         if not hasattr(self, 'dt') or self.dt == 0:
             self.dt = 1.0 / target_fps
 
@@ -87,17 +109,16 @@ class Game(Scene):
         WORLD_MAX_Y_BOUNDARY = self.terrain_polys[0].points[0][1]
 
         for terrain in self.terrain_polys:
-            if not (terrain.terrain_type == "void"):
-                for point_tuple in terrain.points:
-                    point = pygame.Vector2(point_tuple)
-                    if point.x < WORLD_MIN_X_BOUNDARY:
-                        WORLD_MIN_X_BOUNDARY = point.x
-                    if point.x > WORLD_MAX_X_BOUNDARY:
-                        WORLD_MAX_X_BOUNDARY = point.x
-                    if point.y < WORLD_MIN_Y_BOUNDARY:
-                        WORLD_MIN_Y_BOUNDARY = point.y
-                    if point.y > WORLD_MAX_Y_BOUNDARY:
-                        WORLD_MAX_Y_BOUNDARY = point.y
+            for point_tuple in terrain.points:
+                point = pygame.Vector2(point_tuple)
+                if point.x < WORLD_MIN_X_BOUNDARY:
+                    WORLD_MIN_X_BOUNDARY = point.x
+                if point.x > WORLD_MAX_X_BOUNDARY:
+                    WORLD_MAX_X_BOUNDARY = point.x
+                if point.y < WORLD_MIN_Y_BOUNDARY:
+                    WORLD_MIN_Y_BOUNDARY = point.y
+                if point.y > WORLD_MAX_Y_BOUNDARY:
+                    WORLD_MAX_Y_BOUNDARY = point.y
         WORLD_MIN_Y_BOUNDARY = WORLD_MIN_Y_BOUNDARY - self.height
         WORLD_MIN_X_BOUNDARY += 10
         WORLD_MAX_X_BOUNDARY -= 10
@@ -124,6 +145,17 @@ class Game(Scene):
             
         self.win_effect = pygame.mixer.Sound("assets/audio/sound_effect/victory/victory.mp3")
 
+        # Sounds played when the ball bounces on or falls in each material, indexed by material ID
+        materials = get_material_table()
+        self.collision_sounds = materials.load_sounds(materials.collision_sound_paths)
+        self.hazard_sounds = materials.load_sounds(materials.hazard_sound_paths)
+
+        self.defeat_effects = []
+        for effect in os.listdir("assets/audio/sound_effect/defeat"):
+            sound = pygame.mixer.Sound("assets/audio/sound_effect/defeat/" + effect)
+            self.defeat_effects.append(sound)
+        self.hazard_sound_played = False
+
         self.flag = None
         for obstacle in self.obstacles:
             if not isinstance(obstacle, Flag) and getattr(obstacle, 'characteristic', None) == "start":
@@ -133,6 +165,9 @@ class Game(Scene):
                 self.flag = obstacle
 
         self.collidable_obstacles_list = [obs for obs in self.obstacles if (not isinstance(obs, Flag)) and obs.is_colliding]
+        self.kinematic_bodies = kinematics.build_kinematic_bodies(self.obstacles)
+        self.kinematic_time = 0.0  # Time the kinematic obstacles were animated for, in seconds
+        self.build_collision_world()
 
         self.saved = False
         self.camera.calculate_position(self.ball.position)
@@ -149,7 +184,7 @@ class Game(Scene):
 
         for obs in self.obstacles:
             if not (isinstance(obs, Flag)):
-                if obs.characteristic == "start":
+                if obs.characteristic == "start" or obs in self.collected_pickups:
                     continue
                 if obs.rect.colliderect(camera_view_rect_world):
                     obs.draw(self.screen, camera_offset)
@@ -166,10 +201,9 @@ class Game(Scene):
             pygame.draw.line(self.screen, pygame.Color("red"), ball_screen_pos, current_mouse_screen_pos, 2)
             ball_screen_pos = self.ball.position - camera_offset
             pygame.draw.line(self.screen, pygame.Color("red"), ball_screen_pos, current_mouse_screen_pos, 2)
-            preview_vel_x = -self.force * math.cos(math.radians(self.angle))
-            preview_vel_y = self.force * math.sin(math.radians(self.angle))  # Or -self.force * sin if math angle
-            initial_vel_for_prediction = pygame.Vector2(preview_vel_x, preview_vel_y)
-            draw_predicted_trajectory(self.screen,self.ball.position,initial_vel_for_prediction,physics.GRAVITY_ACCELERATION,physics.DEFAULT_DAMPING_FACTOR,self.fixed_dt,PREDICTION_STEPS,self.camera.position,PREDICTION_DOT_COLOR,PREDICTION_DOT_RADIUS,PREDICTION_DOT_SPACING)
+            prediction_dots = self.trajectory_preview.dots(self.ball, self.force, self.angle, self.triggers)
+            draw_predicted_trajectory(self.screen, prediction_dots, self.camera.position, PREDICTION_DOT_COLOR,
+                                      PREDICTION_DOT_RADIUS)
 
         # --- AFFICHAGE AMÉLIORÉ DU COMPTEUR (CENTERED at width/5, height/5) ---
         current_scale = 1.0
@@ -239,8 +273,8 @@ class Game(Scene):
         """Resets the state of the level"""
         self.ball.position = self.ball.start_position.copy()
         self.last_position = self.ball.position.copy()
-        self.ball.velocity = pygame.Vector2(0, 0)
-        self.ball.is_moving = False
+        physics.stop_ball(self.ball)
+        self.cancel_shot_playback()
 
         self.stroke_count = 0
         self.previous_stroke_count = -1
@@ -251,10 +285,13 @@ class Game(Scene):
         self.force = 0
         self.angle = 0
 
-        self.physics_last_collided_object_id = None
-        self.physics_collision_toggle_count = 0
         self.physics_accumulator = 0.0
 
+        # Collected pickups are put back
+        self.triggers.reset()
+        self.collected_pickups.clear()
+        self.trajectory_preview.clear()
+
         self.saved_level_stats = False
 
         self.camera.calculate_position(self.ball.position)
@@ -262,7 +299,7 @@ class Game(Scene):
     def handle_events(self):
         """
         Handle input, ball movement, gravity, collisions with bounce/slide,
-        hole detection, flat-surface slide, prevent infinite toggling.
+        hole detection, flat-surface slide.
         Allows multiple drag-and-release actions.
         """
         for event in pygame.event.get():
@@ -278,23 +315,11 @@ class Game(Scene):
                     return
                 if event.key == pygame.K_r:
                     self.reset_level_state()
+                if event.key == pygame.K_SPACE and self.shot_playback is not None:
+                    self.skip_shot_playback()
 
             if event.type == pygame.USEREVENT + 30:  # HIT RESTART ZONE (see events.py)
-                
-                self.ball.position = self.last_position.copy()  # Use copy to avoid reference issues
-                self.ball.velocity = pygame.Vector2(0, 0)
-                self.ball.is_moving = False  # Stop the ball so it can be shot again
-            
-                # Update camera to follow the teleported ball
-                self.camera.calculate_position(self.ball.position)
-            
-                # Reset physics accumulator to prevent residual physics calculations
-                self.physics_accumulator = 0.0
-            
-                # Reset anti-stuck mechanism if it was active
-                self.physics_last_collided_object_id = None
-                self.physics_collision_toggle_count = 0
-            
+                self.restart_from_last_position()
                 continue
                 
             # --- Input Handling for Dragging and Shooting ---
@@ -335,51 +360,30 @@ class Game(Scene):
                     MIN_SHOT_FORCE = 50
                     if self.force >= MIN_SHOT_FORCE:
                         # Apply velocity based on force and angle
-                        vel_x = -self.force * math.cos(math.radians(self.angle))
-                        vel_y = self.force * math.sin(math.radians(self.angle))
-                        self.ball.velocity = pygame.Vector2(vel_x, vel_y)
+                        self.ball.velocity = shot_velocity(self.force, self.angle)
 
                         self.ball.is_moving = True
                         self.stroke_count += 1
-                        # Reset anti-stuck for new shot
-                        self.physics_last_collided_object_id = None
-                        self.physics_collision_toggle_count = 0
+                        # The worker would run ahead of the moving obstacles, these levels are simulated live
+                        if self.shot_timeline_enabled and not self.kinematic_bodies:
+                            self.shot_playback = shot_timeline.start_shot(self.ball, self.simulate_step,
+                                                                          self.fixed_dt, self.dt, self.triggers)
                     # Reset drag state
                     self.drag_start_pos = None
                     self.force = 0
                     self.angle = 0
 
-        if self.ball.is_moving:
-            self.physics_accumulator += self.dt
+        self.animate_kinematic_bodies(self.dt)
 
-            # Limit max steps per frame
-            max_sub_steps_per_frame = self.physics_sub_steps * 2
-            sub_steps_this_frame = 0
-
-            while self.physics_accumulator >= self.fixed_dt and sub_steps_this_frame < max_sub_steps_per_frame:
-                if self.ball.is_moving:  # Recheck if ball is moving after each sub-step
-                    still_moving = physics.update_ball_physics(self.ball,self.terrain_polys,self.collidable_obstacles_list,self.fixed_dt,self)
-                    
-                    if not still_moving:
-                        self.ball.is_moving = False  # Ball has stopped
-                        self.physics_accumulator = 0  # Clear accumulator
-                        self.last_position = self.ball.position.copy()
-                        # Check win condition AFTER ball stops and physics is fully resolved
-                        if self.check_flag_collision():  # check_flag_collision should verify ball is NOT moving
-                            level_id = int(self.level_path.split("/")[-1].split(".json")[0].split("level")[-1])
-                            pygame.mixer.Channel(0).play(self.win_effect)
-                            if not self.saved:
-                                self.save_level_stats(level_id)
-                                self.saved = True
-                                self.switch_scene(SceneType.LEVEL_SELECTOR)
-                        break
-                else:
-                    # Ball stopped during a sub-step sequence
-                    self.physics_accumulator = 0
-                    break
+        if self.shot_playback is not None:
+            self.update_shot_playback()
+        elif self.ball.is_moving:
+            self.physics_accumulator += self.dt
 
-                self.physics_accumulator -= self.fixed_dt
-                sub_steps_this_frame += 1
+            if self.adaptive_sub_steps:
+                self.run_adaptive_physics_steps()
+            else:
+                self.run_fixed_physics_steps()
 
         # Update camera position based on ball (if ball moved or dragging for preview)
         if self.ball.is_moving or self.dragging:
@@ -393,6 +397,194 @@ class Game(Scene):
             self.force, self.angle = drag_and_release(self.drag_start_pos, current_mouse_world_pos)
             self.force = min(self.force, self.max_force)
 
+    def animate_kinematic_bodies(self, dt: float):
+        """
+        Moves the kinematic obstacles once per frame, before the physics sub-steps of the frame. Only the moved
+        obstacles are updated in the collision world. A resting ball touched by one of them wakes up.
+
+        :param dt: Time delta of the frame, in seconds.
+        """
+        if not self.kinematic_bodies:
+            return
+        self.kinematic_time += dt
+        moved = kinematics.update_kinematic_bodies(self.kinematic_bodies, self.kinematic_time, self.collision_world)
+        if moved:
+            self.physics_backend.geometry_moved([body.obstacle for body in moved])
+            self.trajectory_preview.clear()
+        if not self.ball.is_moving and kinematics.touches_ball(moved, self.ball):
+            self.ball.is_moving = True
+
+    def simulate_step(self, ball, step_dt: float, triggers=None) -> tuple:
+        """
+        Runs one physics step of the physics backend on a ball, without handling its events.
+
+        :param ball: Ball to simulate, the game ball or the copy simulated by the shot timeline worker.
+        :param step_dt: Time delta of the step, in seconds.
+        :param triggers: TriggerIndex to test, the one of the level if None.
+        :return: (still_moving, events), see physics.update_ball_physics.
+        """
+        return self.physics_backend.step(ball, step_dt, triggers)
+
+    def step_physics(self, step_dt: float) -> bool:
+        """
+        Runs one physics step of the physics backend and handles its events.
+
+        :param step_dt: Time delta of the step, in seconds.
+        :return: True if the ball is still moving after the step.
+        """
+        still_moving, physics_events = self.simulate_step(self.ball, step_dt)
+        self.handle_physics_events(physics_events)
+
+        if not still_moving:
+            self.ball_stopped()
+
+        return still_moving
+
+    def ball_stopped(self):
+        """Ends a shot once the ball stopped: the next shot starts from here, and the hole is checked"""
+        self.ball.is_moving = False  # Ball has stopped
+        self.physics_accumulator = 0  # Clear accumulator
+        self.last_position = self.ball.position.copy()
+        # Check win condition AFTER ball stops and physics is fully resolved
+        if self.check_flag_collision():  # check_flag_collision should verify ball is NOT moving
+            level_id = int(self.level_path.split("/")[-1].split(".json")[0].split("level")[-1])
+            pygame.mixer.Channel(0).play(self.win_effect)
+            if not self.saved:
+                self.save_level_stats(level_id)
+                self.saved = True
+                self.switch_scene(SceneType.LEVEL_SELECTOR)
+
+    def update_shot_playback(self):
+        """Moves the ball along the timeline of the shot, faster while the fast-forward key (F) is held"""
+        speed = shot_timeline.SHOT_FAST_FORWARD_SPEED if pygame.key.get_pressed()[pygame.K_f] else 1.0
+        self.apply_shot_playback(self.shot_playback.advance(self.dt * speed))
+
+    def skip_shot_playback(self):
+        """Jumps to the rest position of the shot, the skipped events are applied without their sounds"""
+        self.apply_shot_playback(self.shot_playback.skip(), play_sounds=False)
+
+    def cancel_shot_playback(self):
+        """Drops the shot being played back and stops its worker"""
+        if self.shot_playback is not None:
+            self.shot_playback.cancel()
+            self.shot_playback = None
+
+    def apply_shot_playback(self, physics_events: list, play_sounds: bool = True):
+        """
+        Puts the ball at the current position of the playback and handles the events it reached. At the end of the
+        timeline the ball takes the state the worker left it in.
+
+        :param physics_events: Events reached by the playback.
+        :param play_sounds: If False, the events do not play any sound.
+        """
+        playback = self.shot_playback
+        self.ball.position = playback.position()
+        self.ball.rect.center = self.ball.position
+        self.handle_physics_events(physics_events, play_sounds)
+        if self.shot_playback is not playback:
+            return  # The ball was put back after a hazard
+
+        if playback.finished:
+            self.shot_playback = None
+            shot_timeline.copy_ball_state(playback.timeline.final_ball, self.ball)
+            if not self.ball.is_moving:
+                self.ball_stopped()
+
+    def run_fixed_physics_steps(self):
+        """Consumes the physics accumulator with steps of fixed_dt"""
+        # Limit max steps per frame
+        max_sub_steps_per_frame = self.physics_sub_steps * 2
+        sub_steps_this_frame = 0
+
+        while self.physics_accumulator >= self.fixed_dt and sub_steps_this_frame < max_sub_steps_per_frame:
+            if not self.ball.is_moving:
+                # Ball stopped during a sub-step sequence
+                self.physics_accumulator = 0
+                break
+
+            sub_steps_this_frame += 1
+            if not self.step_physics(self.fixed_dt):
+                break
+            self.physics_accumulator -= self.fixed_dt
+
+        self.physics_steps_last_frame = sub_steps_this_frame
+
+    def run_adaptive_physics_steps(self):
+        """
+        Consumes the physics accumulator with steps sized from the ball speed and its clearance to the level:
+        large steps in open air, fixed_dt steps near contact.
+        """
+        max_sub_steps_per_frame = self.physics_sub_steps * 2
+        sub_steps_this_frame = 0
+        ball_radius = self.ball.radius * self.ball.scale_value
+
+        while self.physics_accumulator >= self.fixed_dt and sub_steps_this_frame < max_sub_steps_per_frame:
+            if not self.ball.is_moving:
+                self.physics_accumulator = 0
+                break
+
+            speed = self.ball.velocity.length()
+            search_distance = speed * self.dt + ball_radius
+            clearance = physics.ball_clearance(self.ball, self.collision_world, search_distance)
+            step_dt = physics.adaptive_step_size(speed, clearance, self.fixed_dt, self.dt, self.physics_max_step_error)
+            # The remainder smaller than a fixed step is kept for the next frame, as with fixed steps
+            step_dt = min(step_dt, self.physics_accumulator)
+
+            sub_steps_this_frame += 1
+            if not self.step_physics(step_dt):
+                break
+            self.physics_accumulator -= step_dt
+
+        self.physics_steps_last_frame = sub_steps_this_frame
+
+    def handle_physics_events(self, physics_events: list, play_sounds: bool = True):
+        """
+        Turns the events raised by a physics sub-step into sounds and scene events.
+
+        :param physics_events: List of physics.PhysicsEvent
+        :param play_sounds: If False, only the scene events are raised.
+        """
+        for physics_event in physics_events:
+            if physics_event.kind == physics.EVENT_COLLISION:
+                sounds = self.collision_sounds[physics_event.material]
+                if sounds and play_sounds:
+                    pygame.mixer.Channel(0).play(random.choice(sounds))
+
+            elif physics_event.kind == physics.EVENT_HAZARD:
+                if not self.hazard_sound_played and play_sounds:
+                    # Materials without their own hazard sounds play a defeat sound
+                    sounds = self.hazard_sounds[physics_event.material] or self.defeat_effects
+                    pygame.mixer.Channel(0).play(random.choice(sounds))
+                    self.hazard_sound_played = True
+
+                if physics_event.trigger is not None:
+                    # Trigger volumes stop the ball right away, it is put back without waiting for the next frame
+                    self.restart_from_last_position()
+                else:
+                    pygame.event.post(pygame.event.Event(collision_events["HIT_RESTART_ZONE"]))
+
+            elif physics_event.kind == physics.EVENT_PICKUP:
+                # Shots played back were collected on a copy of the triggers, the pickup is disabled as it is reached
+                self.triggers.disable(physics_event.trigger)
+                self.trajectory_preview.clear()
+                self.collected_pickups.append(physics_event.trigger.entity)
+                pygame.event.post(pygame.event.Event(interact_events["COIN_COLLECTED"]))
+
+    def restart_from_last_position(self):
+        """Puts the ball back to where it was last shot from, after it touched a hazard"""
+        self.hazard_sound_played = False
+        self.cancel_shot_playback()
+
+        self.ball.position = self.last_position.copy()  # Use copy to avoid reference issues
+        self.ball.rect.center = self.ball.position
+        physics.stop_ball(self.ball)  # Stop the ball so it can be shot again
+
+        # Update camera to follow the teleported ball
+        self.camera.calculate_position(self.ball.position)
+
+        # Reset physics accumulator to prevent residual physics calculations
+        self.physics_accumulator = 0.0
+
     def save_level_stats(self, level_id: int):
         """
             Saves the stats of the finished level in a JSON file.
@@ -453,9 +645,11 @@ class Game(Scene):
         self.ball = Ball(pygame.Vector2(BALL_START_X, BALL_START_Y), 4.2, 0.047, pygame.Color("white"),
                          "assets/images/balls/golf_ball.png")
         self.ball.is_moving = False
+        self.cancel_shot_playback()
 
         self.terrain_polys = level_loader.json_to_list(self.terrain_data, self.screen, 0)
         self.obstacles = level_loader.json_to_list(self.obstacles_data, self.screen, 1)
+        self.kill_plane_y = level_loader.get_kill_plane_y(self.terrain_data, self.screen)
 
         self.prev_collision_terrain = None
 
@@ -467,17 +661,16 @@ class Game(Scene):
         WORLD_MAX_Y_BOUNDARY = self.terrain_polys[0].points[0][1]
 
         for terrain in self.terrain_polys:
-            if not (terrain.terrain_type == "void"):
-                for point_tuple in terrain.points:
-                    point = pygame.Vector2(point_tuple)
-                    if point.x < WORLD_MIN_X_BOUNDARY:
-                        WORLD_MIN_X_BOUNDARY = point.x
-                    if point.x > WORLD_MAX_X_BOUNDARY:
-                        WORLD_MAX_X_BOUNDARY = point.x
-                    if point.y < WORLD_MIN_Y_BOUNDARY:
-                        WORLD_MIN_Y_BOUNDARY = point.y
-                    if point.y > WORLD_MAX_Y_BOUNDARY:
-                        WORLD_MAX_Y_BOUNDARY = point.y
+            for point_tuple in terrain.points:
+                point = pygame.Vector2(point_tuple)
+                if point.x < WORLD_MIN_X_BOUNDARY:
+                    WORLD_MIN_X_BOUNDARY = point.x
+                if point.x > WORLD_MAX_X_BOUNDARY:
+                    WORLD_MAX_X_BOUNDARY = point.x
+                if point.y < WORLD_MIN_Y_BOUNDARY:
+                    WORLD_MIN_Y_BOUNDARY = point.y
+                if point.y > WORLD_MAX_Y_BOUNDARY:
+                    WORLD_MAX_Y_BOUNDARY = point.y
         WORLD_MIN_Y_BOUNDARY = WORLD_MIN_Y_BOUNDARY - self.height
         WORLD_MIN_X_BOUNDARY += 10
         WORLD_MAX_X_BOUNDARY -= 10
@@ -502,10 +695,32 @@ class Game(Scene):
 
         self.collidable_obstacles_list = [obs for obs in self.obstacles if
                                           (not isinstance(obs, Flag)) and obs.is_colliding]
+        self.kinematic_bodies = kinematics.build_kinematic_bodies(self.obstacles)
+        self.kinematic_time = 0.0
+        self.build_collision_world()
 
         self.saved = False
         self.camera.calculate_position(self.ball.position)
 
+    def build_collision_world(self):
+        """
+        Builds the optimized collision geometry of the level (edges, materials and spatial hash broad-phase) used by
+        the physics.
+        Must be called once the terrain and the collidable obstacles of the level are loaded.
+        """
+        # Hazard zones, pickups and the hole are trigger volumes, not solid geometry
+        self.triggers = build_trigger_index(self.terrain_polys, self.obstacles, self.flag, self.kill_plane_y,
+                                            BROAD_PHASE_CELL_SIZE)
+        self.collected_pickups = []
+
+        # Adjacent zones are merged and their hidden edges removed, the drawn terrain_polys are left untouched
+        solid_terrain = [terrain for terrain in self.terrain_polys if not is_trigger_terrain(terrain)]
+        self.terrain_groups = optimize_terrain(solid_terrain)
+        self.collision_world = CollisionWorld(self.terrain_groups + self.collidable_obstacles_list, BROAD_PHASE_CELL_SIZE)
+        self.physics_backend.load_level(self.terrain_groups, self.collidable_obstacles_list, self.collision_world,
+                                        self.triggers, self.level_path, bool(self.kinematic_bodies))
+        self.trajectory_preview.clear()
+
     def check_flag_collision(self):
         """
         Checks if the ball reached the base of the flag (hole)
@@ -514,26 +729,5 @@ class Game(Scene):
         if not self.flag or self.ball.is_moving:
             return False
 
-        ball_mask = self.ball.mask
-
-        flag_surface = self.flag.animation.image
-        flag_mask = pygame.mask.from_surface(flag_surface)
-
-        # Create a mask for the base of the flag only (1/4 bottom of the flag)
-        base_height = flag_surface.get_height() // 4
-        base_rect = pygame.Rect(0, flag_surface.get_height() - base_height,flag_surface.get_width(), base_height)
-
-        base_mask = pygame.mask.Mask((flag_surface.get_width(), flag_surface.get_height()))
-        for x in range(base_rect.width):
-            for y in range(base_rect.height):
-                y_coord = base_rect.y + y
-                if flag_mask.get_at((x, y_coord)):
-                    base_mask.set_at((x, y_coord), 1)
-
-        offset = (int(self.ball.rect.left - self.flag.position.x),
-            int(self.ball.rect.top - self.flag.position.y))
-
-        # Check if masks overlap with the offset
-        overlap = base_mask.overlap(ball_mask, offset)
-
-        return overlap is not None
\ No newline at end of file
+        return self.triggers.test(self.ball.position, self.ball.radius * self.ball.scale_value,
+                                  (TRIGGER_HOLE,)) is not None
\ No newline at end of file
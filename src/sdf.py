@@ -0,0 +1,357 @@
+import hashlib
+import math
+import os
+
+import numpy as np
+import pygame
+
+from src.narrow_phase import EdgeArrays
+
+SDF_VERSION = 2  # Increase when the baking changes, to invalidate the cached fields
+SDF_CELL_SIZE = 4  # Distance between two grid nodes, in pixels
+SDF_BAND = 64  # Distances are exact up to this many pixels from a surface and clamped beyond
+
+
+class SignedDistanceField:
+    """
+        Signed distance to the solid geometry of a level, baked on a regular grid.
+        Each node stores the distance to the closest surface (negative inside a terrain zone or an obstacle) and the
+        index of the entity that surface belongs to. A ball contact is then a bilinear lookup of 4 nodes, the normal
+        being the gradient of the field, whatever the number of polygons around.
+
+        The field exposes the same contact queries as the CollisionWorld it was baked from, so it can be given to
+        physics.update_ball_physics in its place. Outside of the grid the queries fall back to the world.
+    """
+
+    def __init__(self, world, origin: tuple, cell_size: float, distances: np.ndarray, owners: np.ndarray):
+        """
+        :param world: CollisionWorld the field was baked from.
+        :param origin: World position of the node (0, 0).
+        :param cell_size: Distance between two grid nodes, in pixels.
+        :param distances: (rows, columns) float32 array of signed distances.
+        :param owners: (rows, columns) int16 array of the index of the closest entity, -1 if none within the band.
+        """
+        self.world = world
+        self.entities = world.entities
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.cell_size = float(cell_size)
+        self.distances = distances
+        self.owners = owners
+        self.rows, self.columns = distances.shape
+
+    def sample(self, x: float, y: float):
+        """
+        Interpolates the field at a point.
+
+        :return: (distance, gradient_x, gradient_y), or None if the point is outside of the grid.
+        """
+        grid_x = (x - self.origin[0]) / self.cell_size
+        grid_y = (y - self.origin[1]) / self.cell_size
+        column = math.floor(grid_x)
+        row = math.floor(grid_y)
+        if column < 0 or row < 0 or column >= self.columns - 1 or row >= self.rows - 1:
+            return None
+
+        tx = grid_x - column
+        ty = grid_y - row
+        d00 = float(self.distances[row, column])
+        d10 = float(self.distances[row, column + 1])
+        d01 = float(self.distances[row + 1, column])
+        d11 = float(self.distances[row + 1, column + 1])
+
+        distance = (d00 * (1 - tx) + d10 * tx) * (1 - ty) + (d01 * (1 - tx) + d11 * tx) * ty
+        gradient_x = ((d10 - d00) * (1 - ty) + (d11 - d01) * ty) / self.cell_size
+        gradient_y = ((d01 - d00) * (1 - tx) + (d11 - d10) * tx) / self.cell_size
+        return distance, gradient_x, gradient_y
+
+    def owner(self, x: float, y: float) -> int:
+        """Index of the entity owning the surface closest to a point inside the grid"""
+        column = min(max(round((x - self.origin[0]) / self.cell_size), 0), self.columns - 1)
+        row = min(max(round((y - self.origin[1]) / self.cell_size), 0), self.rows - 1)
+        return int(self.owners[row, column])
+
+    def deepest_contact(self, ball_center, ball_radius, entity_indices: list):
+        """
+        Contact of the ball with the level (same result format as CollisionWorld.deepest_contact).
+        entity_indices is only used outside of the grid, where the world is queried instead.
+
+        Returns:
+            (entity_index, normal_vector, depth_value) or None if no collision.
+        """
+        sampled = self.sample(ball_center[0], ball_center[1])
+        if sampled is None:
+            return self.world.deepest_contact(ball_center, ball_radius, entity_indices)
+
+        distance, gradient_x, gradient_y = sampled
+        depth = ball_radius - distance
+        if depth <= 1e-5:
+            return None
+        entity_index = self.owner(ball_center[0], ball_center[1])
+        if entity_index < 0:
+            return None
+
+        gradient_length = math.hypot(gradient_x, gradient_y)
+        if gradient_length > 1e-9:
+            normal = pygame.Vector2(gradient_x / gradient_length, gradient_y / gradient_length)
+        else:
+            normal = pygame.Vector2(0, -1)
+        return entity_index, normal, depth
+
+    def contact_manifold(self, ball_center, ball_radius, entity_indices: list, margin: float = 0.0) -> list:
+        """
+        Contacts of the ball with the level (same result format as CollisionWorld.contact_manifold).
+        The field only knows the closest surface, so inside the grid the manifold holds a single contact, without
+        edge index.
+        """
+        if self.sample(ball_center[0], ball_center[1]) is None:
+            return self.world.contact_manifold(ball_center, ball_radius, entity_indices, margin)
+        contact = self.deepest_contact(ball_center, ball_radius + margin, entity_indices)
+        if contact is None:
+            return []
+        entity_index, normal, depth = contact
+        return [(entity_index, normal, depth - margin, None)]
+
+    def edge(self, edge_index: int) -> tuple:
+        """See CollisionWorld.edge"""
+        return self.world.edge(edge_index)
+
+    def nearest_distance(self, point, entity_indices: list, max_distance: float = None):
+        """
+        Distance between a point and the closest surface (same as CollisionWorld.nearest_distance).
+        Beyond the band, the band width is returned, which never overestimates the distance.
+        """
+        sampled = self.sample(point[0], point[1])
+        if sampled is None:
+            return self.world.nearest_distance(point, entity_indices, max_distance)
+        return abs(sampled[0])
+
+    def contacts(self, positions: np.ndarray, radius: float):
+        """
+        Vectorized contact of many balls with the level.
+
+        :param positions: (N, 2) array of ball positions.
+        :param radius: Collision radius of the balls.
+        :return: (depths, normals, entities, inside): depth and entity are -1 for the balls without contact,
+                 inside tells which balls are inside the grid (the others are not tested).
+        """
+        count = len(positions)
+        depths = np.full(count, -1.0)
+        normals = np.zeros((count, 2))
+        entities = np.full(count, -1, dtype=np.int64)
+
+        grid_x = (positions[:, 0] - self.origin[0]) / self.cell_size
+        grid_y = (positions[:, 1] - self.origin[1]) / self.cell_size
+        columns = np.floor(grid_x)
+        rows = np.floor(grid_y)
+        inside = (columns >= 0) & (rows >= 0) & (columns < self.columns - 1) & (rows < self.rows - 1)
+        if not inside.any():
+            return depths, normals, entities, inside
+
+        balls = np.nonzero(inside)[0]
+        column = columns[balls].astype(np.int64)
+        row = rows[balls].astype(np.int64)
+        tx = grid_x[balls] - column
+        ty = grid_y[balls] - row
+        d00 = self.distances[row, column].astype(np.float64)
+        d10 = self.distances[row, column + 1].astype(np.float64)
+        d01 = self.distances[row + 1, column].astype(np.float64)
+        d11 = self.distances[row + 1, column + 1].astype(np.float64)
+
+        distance = (d00 * (1 - tx) + d10 * tx) * (1 - ty) + (d01 * (1 - tx) + d11 * tx) * ty
+        gradients = np.stack(((d10 - d00) * (1 - ty) + (d11 - d01) * ty,
+                              (d01 - d00) * (1 - tx) + (d11 - d10) * tx), axis=1)
+        gradient_lengths = np.hypot(gradients[:, 0], gradients[:, 1])
+        owners = self.owners[np.rint(grid_y[balls]).astype(np.int64).clip(0, self.rows - 1),
+                             np.rint(grid_x[balls]).astype(np.int64).clip(0, self.columns - 1)]
+
+        depth = radius - distance
+        hit = (depth > 1e-5) & (owners >= 0)
+        hit_normals = np.tile((0.0, -1.0), (len(balls), 1))  # Default normal
+        valid = gradient_lengths > 1e-9
+        hit_normals[valid] = gradients[valid] / gradient_lengths[valid, None]
+
+        depths[balls[hit]] = depth[hit]
+        normals[balls[hit]] = hit_normals[hit]
+        entities[balls[hit]] = owners[hit]
+        return depths, normals, entities, inside
+
+    def query(self, rect: pygame.Rect) -> list:
+        """See CollisionWorld.query"""
+        return self.world.query(rect)
+
+    def query_around(self, position, distance: float) -> list:
+        """See CollisionWorld.query_around"""
+        return self.world.query_around(position, distance)
+
+    def material(self, index: int) -> tuple:
+        """See CollisionWorld.material"""
+        return self.world.material(index)
+
+    def time_of_impact(self, start, motion, radius, entity_indices: list):
+        """See CollisionWorld.time_of_impact"""
+        return self.world.time_of_impact(start, motion, radius, entity_indices)
+
+
+def grid_extent(world, band: float) -> tuple:
+    """
+    Area covered by the grid: the bounds of the level entities, grown by the band.
+
+    :return: (min_x, min_y, max_x, max_y), or None if the world is empty.
+    """
+    rects = [rect for rect in world.bounds if rect.width]
+    if not rects:
+        return None
+    bounds = rects[0].unionall(rects[1:])
+    return bounds.left - band, bounds.top - band, bounds.right + band, bounds.bottom + band
+
+
+def inside_polygon(node_xs: np.ndarray, node_ys: np.ndarray, starts: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """
+    Even-odd point in polygon test of every node of a block.
+
+    :param node_xs: (columns,) x coordinates of the nodes.
+    :param node_ys: (rows,) y coordinates of the nodes.
+    :param starts: (N, 2) edges start points of the closed outline.
+    :param vectors: (N, 2) edges vectors.
+    :return: (rows, columns) boolean array.
+    """
+    inside = np.zeros((len(node_ys), len(node_xs)), dtype=bool)
+    ends = starts + vectors
+    for row, y in enumerate(node_ys):
+        crossing = (starts[:, 1] > y) != (ends[:, 1] > y)
+        if not crossing.any():
+            continue
+        xs = starts[crossing, 0] + (y - starts[crossing, 1]) * vectors[crossing, 0] / vectors[crossing, 1]
+        xs.sort()
+        # Number of crossings on the right of each node
+        crossings = len(xs) - np.searchsorted(xs, node_xs, side="right")
+        inside[row] = crossings % 2 == 1
+    return inside
+
+
+def bake_signed_distance_field(world, cell_size: float = SDF_CELL_SIZE, band: float = SDF_BAND) -> SignedDistanceField:
+    """
+    Bakes the signed distance field of a collision world. Takes a few seconds for a large level: the game runs it
+    in the background and caches the result (see load_or_bake_signed_distance_field).
+
+    :param world: CollisionWorld of the level.
+    :param cell_size: Distance between two grid nodes, in pixels.
+    :param band: Distances are only computed up to this many pixels from a surface.
+    """
+    extent = grid_extent(world, band)
+    if extent is None:
+        return SignedDistanceField(world, (0, 0), cell_size, np.full((2, 2), band, np.float32), np.full((2, 2), -1, np.int16))
+
+    min_x, min_y, max_x, max_y = extent
+    columns = int(math.ceil((max_x - min_x) / cell_size)) + 1
+    rows = int(math.ceil((max_y - min_y) / cell_size)) + 1
+    distances = np.full((rows, columns), band, dtype=np.float32)
+    owners = np.full((rows, columns), -1, dtype=np.int16)
+
+    def node_range(low, high, origin, count):
+        """Range of the nodes between two coordinates, clipped to the grid"""
+        first = max(int(math.floor((low - origin) / cell_size)), 0)
+        last = min(int(math.ceil((high - origin) / cell_size)) + 1, count)
+        return first, last
+
+    for index in range(len(world.entities)):
+        slot_start = int(world.slot_starts[index])
+        starts = world.starts[slot_start:slot_start + int(world.edge_counts[index])]
+        vectors = world.vectors[slot_start:slot_start + int(world.edge_counts[index])]
+        inv_length_sq = world.inv_length_sq[slot_start:slot_start + int(world.edge_counts[index])]
+        # Entities made of several zones (see terrain_optimizer.TerrainGroup) give the closed outlines of their
+        # solid, their collision edges alone are not closed
+        outlines = getattr(world.entities[index], 'outlines', None)
+        if len(starts) == 0 or (outlines is None and len(starts) < 3):
+            continue
+
+        rect = world.bounds[index]
+        if outlines is not None:
+            rect = rect.union(world.entities[index].rect)
+        first_column, last_column = node_range(rect.left - band, rect.right + band, min_x, columns)
+        first_row, last_row = node_range(rect.top - band, rect.bottom + band, min_y, rows)
+        if first_column >= last_column or first_row >= last_row:
+            continue
+        node_xs = min_x + np.arange(first_column, last_column) * cell_size
+        node_ys = min_y + np.arange(first_row, last_row) * cell_size
+
+        # Unsigned distance, each edge only updating the nodes within the band of its bounding box
+        block = np.full((len(node_ys), len(node_xs)), band, dtype=np.float64)
+        ends = starts + vectors
+        for start, vector, end, inv in zip(starts, vectors, ends, inv_length_sq):
+            edge_first_column, edge_last_column = node_range(min(start[0], end[0]) - band, max(start[0], end[0]) + band,
+                                                             node_xs[0], len(node_xs))
+            edge_first_row, edge_last_row = node_range(min(start[1], end[1]) - band, max(start[1], end[1]) + band,
+                                                       node_ys[0], len(node_ys))
+            if edge_first_column >= edge_last_column or edge_first_row >= edge_last_row:
+                continue
+            to_x = node_xs[None, edge_first_column:edge_last_column] - start[0]
+            to_y = node_ys[edge_first_row:edge_last_row, None] - start[1]
+            t = np.clip((to_x * vector[0] + to_y * vector[1]) * inv, 0.0, 1.0)
+            edge_distances = np.hypot(to_x - t * vector[0], to_y - t * vector[1])
+            sub_block = block[edge_first_row:edge_last_row, edge_first_column:edge_last_column]
+            np.minimum(sub_block, edge_distances, out=sub_block)
+
+        # Sign, then union with the entities baked before
+        if outlines is None:
+            inside = inside_polygon(node_xs, node_ys, starts, vectors)
+        else:
+            inside = np.zeros(block.shape, dtype=bool)
+            for outline in outlines:
+                outline_edges = EdgeArrays(outline)
+                inside |= inside_polygon(node_xs, node_ys, outline_edges.starts, outline_edges.vectors)
+        signed = np.where(inside, -block, block)
+        grid_block = distances[first_row:last_row, first_column:last_column]
+        closer = signed < grid_block
+        grid_block[closer] = signed[closer]
+        owners[first_row:last_row, first_column:last_column][closer] = index
+
+    return SignedDistanceField(world, (min_x, min_y), cell_size, distances, owners)
+
+
+def signed_distance_field_path(level_path: str) -> str:
+    """Path of the cached field of a level, next to its json file"""
+    return os.path.splitext(level_path)[0] + ".sdf.npz"
+
+
+def signed_distance_field_key(level_path: str, world, cell_size: float = SDF_CELL_SIZE, band: float = SDF_BAND) -> str:
+    """
+    Cache key of the field of a level: hash of the level file content, of the baking parameters and of the
+    collision geometry built from it (which also depends on the screen height and on the obstacle images).
+    """
+    digest = hashlib.sha256()
+    with open(level_path, "rb") as file:
+        digest.update(file.read())
+    digest.update(f"{SDF_VERSION}:{cell_size}:{band}".encode())
+    for index in range(len(world.entities)):
+        slot_start = int(world.slot_starts[index])
+        digest.update(np.ascontiguousarray(world.starts[slot_start:slot_start + int(world.edge_counts[index])]).tobytes())
+    return digest.hexdigest()
+
+
+def load_or_bake_signed_distance_field(level_path: str, world) -> SignedDistanceField:
+    """
+    Loads the cached field of a level if it matches the level, bakes and caches it otherwise.
+
+    :param level_path: Path of the level json file.
+    :param world: CollisionWorld built from the level.
+    """
+    key = signed_distance_field_key(level_path, world)
+    cache_path = signed_distance_field_path(level_path)
+
+    try:
+        with np.load(cache_path) as cached:
+            if str(cached["key"]) == key:
+                return SignedDistanceField(world, tuple(cached["origin"]), float(cached["cell_size"]),
+                                           cached["distances"], cached["owners"])
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        pass
+
+    signed_distance_field = bake_signed_distance_field(world)
+    try:
+        np.savez_compressed(cache_path, key=key, origin=np.array(signed_distance_field.origin),
+                            cell_size=signed_distance_field.cell_size, distances=signed_distance_field.distances,
+                            owners=signed_distance_field.owners)
+    except OSError as e:
+        print(f"Warning: Could not cache the signed distance field of '{level_path}': {e}")
+    return signed_distance_field
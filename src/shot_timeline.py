@@ -0,0 +1,196 @@
+import copy
+import math
+import threading
+
+import numpy as np
+import pygame
+
+SHOT_MAX_TIME = 60.0  # Time (s) after which the worker gives up and the end of the shot is simulated live
+SHOT_FAST_FORWARD_SPEED = 4.0  # Playback speed of a shot while the fast-forward key is held
+
+# Ball attributes the physics reads and writes, copied between the game ball and the worker ball
+BALL_PHYSICS_STATE = ("velocity", "is_moving", "rolling_contact", "sleep_anchor", "sleep_time", "time_since_contact")
+
+
+class ShotTimeline:
+    """
+        Whole shot recorded by the worker: the position of the ball sampled at a fixed interval and the physics
+        events with the time they happened at. The render loop only interpolates along it, the samples recorded so
+        far can already be played while the worker is still simulating the end of the shot.
+    """
+
+    def __init__(self, start_position: pygame.Vector2, sample_interval: float):
+        """
+        :param start_position: Position of the ball when it was shot.
+        :param sample_interval: Time between two position samples, in seconds.
+        """
+        self.sample_interval = sample_interval
+        self.times = [0.0]
+        self.positions = [(start_position.x, start_position.y)]
+        self.events = []  # List of (time, physics.PhysicsEvent), in order
+        self.final_ball = None  # State of the ball at the end of the timeline, set by finish
+        self.complete = False
+        self.cancelled = False  # Set by ShotPlayback.cancel, the worker stops at its next step
+
+    def record(self, time: float, position: pygame.Vector2):
+        """Adds a position sample"""
+        self.times.append(time)
+        self.positions.append((position.x, position.y))
+
+    def finish(self, ball):
+        """
+        Ends the recording. The samples are packed in float arrays, the game ball takes the state of the worker
+        ball once the playback reaches the end.
+
+        :param ball: The ball simulated by the worker.
+        """
+        self.times = np.array(self.times, dtype=np.float64)
+        self.positions = np.array(self.positions, dtype=np.float32)
+        self.final_ball = ball
+        self.complete = True  # Set last: the playback reads the arrays once it sees it
+
+    @property
+    def duration(self) -> float:
+        """Time of the last recorded sample, in seconds"""
+        return float(self.times[-1])
+
+    def position_at(self, time: float) -> pygame.Vector2:
+        """
+        Position of the ball at a time, linearly interpolated between the samples around it.
+
+        :param time: Time since the shot, in seconds. It is clamped to the recorded samples.
+        """
+        times, positions = self.times, self.positions
+        count = min(len(times), len(positions))  # The worker may append between the two reads
+        index = int(np.searchsorted(times[:count], time))
+        if index <= 0:
+            return pygame.Vector2(float(positions[0][0]), float(positions[0][1]))
+        if index >= count:
+            return pygame.Vector2(float(positions[count - 1][0]), float(positions[count - 1][1]))
+
+        start_time, end_time = times[index - 1], times[index]
+        ratio = (time - start_time) / (end_time - start_time) if end_time > start_time else 1.0
+        start, end = positions[index - 1], positions[index]
+        return pygame.Vector2(float(start[0] + (end[0] - start[0]) * ratio),
+                              float(start[1] + (end[1] - start[1]) * ratio))
+
+
+class ShotPlayback:
+    """Plays a ShotTimeline back along the frames, at normal speed or fast-forwarded"""
+
+    def __init__(self, timeline: ShotTimeline, worker: threading.Thread):
+        """
+        :param timeline: Timeline being recorded.
+        :param worker: Thread recording the timeline.
+        """
+        self.timeline = timeline
+        self.worker = worker
+        self.time = 0.0
+        self.next_event = 0  # Index of the first event not played yet
+
+    @property
+    def finished(self) -> bool:
+        """True once the whole recorded shot was played"""
+        return self.timeline.complete and self.time >= self.timeline.duration
+
+    def advance(self, dt: float) -> list:
+        """
+        Moves the playback forward. The playback waits for the worker instead of going past what it recorded.
+
+        :param dt: Playback time to advance by, in seconds (frame time times the playback speed).
+        :return: The events reached, in order.
+        """
+        recorded_time = self.timeline.duration if self.timeline.complete else self.timeline.times[-1]
+        self.time = min(self.time + dt, recorded_time)
+
+        events = self.timeline.events
+        reached = []
+        while self.next_event < len(events) and events[self.next_event][0] <= self.time:
+            reached.append(events[self.next_event][1])
+            self.next_event += 1
+        return reached
+
+    def skip(self) -> list:
+        """
+        Jumps to the end of the shot, waiting for the worker to finish it.
+
+        :return: The events not played yet.
+        """
+        self.worker.join()
+        return self.advance(math.inf)
+
+    def position(self) -> pygame.Vector2:
+        """Position of the ball at the current playback time"""
+        return self.timeline.position_at(self.time)
+
+    def cancel(self):
+        """Stops the worker when the shot is dropped (level reset, ball put back after a hazard)"""
+        self.timeline.cancelled = True
+
+
+def copy_ball_state(source, target):
+    """Copies the physics state and the position of a ball to another one"""
+    target.position = source.position.copy()
+    target.rect.center = target.position
+    for attribute in BALL_PHYSICS_STATE:
+        value = getattr(source, attribute)
+        setattr(target, attribute, value.copy() if isinstance(value, pygame.Vector2) else value)
+
+
+def copy_ball(ball):
+    """Returns a copy of a ball that can be simulated without changing the original"""
+    ball_copy = copy.copy(ball)
+    ball_copy.rect = ball.rect.copy()
+    copy_ball_state(ball, ball_copy)
+    return ball_copy
+
+
+def simulate_shot(timeline: ShotTimeline, ball, step_function, dt: float, triggers,
+                  max_time: float = SHOT_MAX_TIME):
+    """
+    Worker step simulating a whole shot into a timeline. It stops early if the timeline is cancelled, without
+    finishing it.
+
+    :param timeline: ShotTimeline to record.
+    :param ball: Ball to simulate, owned by the worker (see start_shot).
+    :param step_function: Function (ball, dt, triggers) -> (still_moving, events) running one physics step.
+    :param dt: Fixed time delta of a physics step, in seconds.
+    :param triggers: TriggerIndex owned by the worker, the pickups of the shot are collected in it.
+    :param max_time: Time after which the simulation stops with the ball still moving, in seconds.
+    """
+    time = 0.0
+    next_sample = timeline.sample_interval
+    while ball.is_moving and time < max_time:
+        if timeline.cancelled:
+            return
+        still_moving, events = step_function(ball, dt, triggers)
+        time += dt
+        for event in events:
+            timeline.events.append((time, event))
+        if time >= next_sample - 1e-9 or not still_moving:
+            timeline.record(time, ball.position)
+            next_sample += timeline.sample_interval
+        if not still_moving:
+            ball.is_moving = False
+            break
+    timeline.finish(ball)
+
+
+def start_shot(ball, step_function, dt: float, sample_interval: float, triggers) -> ShotPlayback:
+    """
+    Starts simulating a shot in a worker thread, on a copy of the ball and of the trigger state. The game ball and
+    the pickups of the level are left untouched, the game applies the events as the playback reaches them.
+
+    :param ball: The ball that was just shot.
+    :param step_function: Function (ball, dt, triggers) -> (still_moving, events) running one physics step.
+    :param dt: Fixed time delta of a physics step, in seconds.
+    :param sample_interval: Time between two position samples of the timeline, in seconds (a frame).
+    :param triggers: TriggerIndex of the level, copied for the worker (see TriggerIndex.copy).
+    :return: The ShotPlayback of the shot.
+    """
+    worker_ball = copy_ball(ball)
+    timeline = ShotTimeline(ball.position, sample_interval)
+    worker = threading.Thread(target=simulate_shot,
+                              args=(timeline, worker_ball, step_function, dt, triggers.copy()), daemon=True)
+    worker.start()
+    return ShotPlayback(timeline, worker)
@@ -0,0 +1,224 @@
+import glob
+import os
+
+import pygame
+
+from src.narrow_phase import EdgeArrays
+from src.outline import simplify_chain, simplify_outline
+from src.utils import level_loader
+
+COLLINEAR_TOLERANCE = 0.05  # A vertex closer than this to the line of its neighbours is dropped, in pixels
+VERTEX_DECIMALS = 3  # Vertices equal at this precision are the same vertex
+LEVELS_DIR = "data/levels"
+
+
+class TerrainGroup:
+    """
+        Collision entity of adjacent terrain zones of the same material, built by optimize_terrain.
+        Its edges are the outline of the union of the zones, without the edges shared with another zone and
+        without collinear vertices: they are segments, not a closed polygon.
+    """
+
+    def __init__(self, terrains: list, segments: list, removed_shared: int, removed_collinear: int):
+        """
+        :param terrains: The Terrain zones of the group, all of the same material.
+        :param segments: List of ((x, y), (x, y)) collision segments.
+        :param removed_shared: Number of edges of the zones removed because they are shared with another zone.
+        :param removed_collinear: Number of edges removed by merging collinear edges.
+        """
+        self.terrains = terrains
+        self.terrain_type = terrains[0].terrain_type
+        self.material_id = terrains[0].material_id
+        self.friction = terrains[0].friction
+        self.bounce_factor = terrains[0].bounce_factor
+        self.outlines = [terrain.points for terrain in terrains]  # Closed polygons whose union is the solid
+        self.rect = terrains[0].rect.unionall([terrain.rect for terrain in terrains[1:]])
+
+        self.removed_shared = removed_shared
+        self.removed_collinear = removed_collinear
+        self.collision_edges = EdgeArrays([segment[0] for segment in segments], [segment[1] for segment in segments])
+
+    def get_collision_edges(self) -> EdgeArrays:
+        """Returns the collision segments of the group"""
+        return self.collision_edges
+
+
+def vertex_key(point) -> tuple:
+    """Key identifying a vertex shared by several zones"""
+    return round(point[0], VERTEX_DECIMALS), round(point[1], VERTEX_DECIMALS)
+
+
+def signed_area(points: list) -> float:
+    """Signed area of a polygon, its sign gives the orientation of the polygon"""
+    return sum(a[0] * b[1] - b[0] * a[1] for a, b in zip(points, points[1:] + points[:1])) / 2
+
+
+def find_shared_edges(terrains: list) -> tuple:
+    """
+    Finds the edges shared by two zones. When the zones lie on both sides of the edge, it is inside the solid
+    ground and can never be touched from outside. When they lie on the same side (a zone stacked on another one),
+    only the edge of the first zone is kept, as the first zone already won every contact on this surface.
+
+    :param terrains: List of Terrain objects.
+    :return: (shared, neighbours): the set of (terrain_index, edge_index) of the shared edges, and the list of
+             the pairs of zones sharing at least one edge.
+    """
+    edges = {}  # Undirected edge key -> list of (terrain_index, edge_index, side)
+    for terrain_index, terrain in enumerate(terrains):
+        points = list(terrain.points)
+        orientation = 1 if signed_area(points) >= 0 else -1
+        for edge_index, (start, end) in enumerate(zip(points, points[1:] + points[:1])):
+            start_key, end_key = vertex_key(start), vertex_key(end)
+            if start_key == end_key:
+                continue
+            # Side of the zone relative to the edge oriented from its smallest to its largest vertex
+            side = orientation if start_key < end_key else -orientation
+            edges.setdefault((min(start_key, end_key), max(start_key, end_key)), []).append((terrain_index, edge_index, side))
+
+    shared = set()
+    neighbours = []
+    for occurrences in edges.values():
+        for first in range(len(occurrences)):
+            for second in range(first + 1, len(occurrences)):
+                (first_terrain, first_edge, first_side) = occurrences[first]
+                (second_terrain, second_edge, second_side) = occurrences[second]
+                if first_terrain == second_terrain:
+                    continue
+                if first_side != second_side:
+                    shared.add((first_terrain, first_edge))
+                    shared.add((second_terrain, second_edge))
+                else:
+                    # Stacked zones repeating the same surface: contacts always went to the first zone
+                    shared.add((second_terrain, second_edge))
+                neighbours.append((first_terrain, second_terrain))
+    return shared, neighbours
+
+
+def merge_collinear(segments: list, tolerance: float) -> list:
+    """
+    Merges the segments of a group meeting at vertices used by no other segment, as long as the merged
+    segment stays within the tolerance of the removed vertices.
+
+    :param segments: List of ((x, y), (x, y)) segments.
+    :param tolerance: Maximum distance between a removed vertex and the merged segment, in pixels.
+    :return: The list of merged segments.
+    """
+    incident = {}  # Vertex key -> indices of the segments using it
+    for index, (start, end) in enumerate(segments):
+        incident.setdefault(vertex_key(start), []).append(index)
+        incident.setdefault(vertex_key(end), []).append(index)
+
+    visited = [False] * len(segments)
+
+    def walk(index, point):
+        """Follows the segments from a segment and one of its vertices, through the vertices of degree 2"""
+        chain = [point]
+        while not visited[index]:
+            visited[index] = True
+            start, end = segments[index]
+            point = end if vertex_key(start) == vertex_key(point) else start
+            chain.append(point)
+            next_indices = [other for other in incident[vertex_key(point)] if other != index]
+            if len(incident[vertex_key(point)]) != 2 or not next_indices:
+                break
+            index = next_indices[0]
+        return chain
+
+    merged = []
+    # Open chains start at the vertices which are not used by exactly 2 segments
+    for key, indices in incident.items():
+        if len(indices) == 2:
+            continue
+        for index in indices:
+            if visited[index]:
+                continue
+            start, end = segments[index]
+            chain = walk(index, start if vertex_key(start) == key else end)
+            kept = simplify_chain(chain, tolerance)
+            merged.extend(zip(kept, kept[1:]))
+
+    # The segments left form closed loops
+    for index in range(len(segments)):
+        if visited[index]:
+            continue
+        chain = walk(index, segments[index][0])[:-1]
+        kept = simplify_outline(chain, tolerance)
+        merged.extend(zip(kept, kept[1:] + kept[:1]))
+    return merged
+
+
+def optimize_terrain(terrains: list, tolerance: float = COLLINEAR_TOLERANCE) -> list:
+    """
+    Load time optimization of the terrain collision geometry, the Terrain objects themselves are not modified:
+    - the edges shared by two adjacent zones are removed, they are inside the ground,
+    - the adjacent zones of the same material are merged in a single collision entity,
+    - the collinear vertices (within the tolerance) of what is left are dropped.
+
+    :param terrains: List of Terrain objects of the level.
+    :param tolerance: Tolerance of the collinear vertices, in pixels.
+    :return: List of TerrainGroup, in the order of their first zone.
+    """
+    shared, neighbours = find_shared_edges(terrains)
+
+    # Union-find of the zones sharing an edge with a zone of the same material
+    parents = list(range(len(terrains)))
+
+    def root(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for first, second in neighbours:
+        if terrains[first].terrain_type == terrains[second].terrain_type:
+            parents[max(root(first), root(second))] = min(root(first), root(second))
+
+    members = {}
+    for index in range(len(terrains)):
+        members.setdefault(root(index), []).append(index)
+
+    groups = []
+    for indices in members.values():
+        segments = []
+        removed_shared = 0
+        for terrain_index in indices:
+            points = list(terrains[terrain_index].points)
+            for edge_index, (start, end) in enumerate(zip(points, points[1:] + points[:1])):
+                if (terrain_index, edge_index) in shared:
+                    removed_shared += 1
+                elif vertex_key(start) != vertex_key(end):
+                    segments.append((start, end))
+
+        merged = merge_collinear(segments, tolerance)
+        # Zero length edges count as collinear
+        removed_collinear = sum(len(terrains[index].points) for index in indices) - removed_shared - len(merged)
+        groups.append(TerrainGroup([terrains[index] for index in indices], merged, removed_shared, removed_collinear))
+    return groups
+
+
+def terrain_report(levels_dir: str = LEVELS_DIR, tolerance: float = COLLINEAR_TOLERANCE):
+    """
+    Prints, for every level, the number of terrain edges removed by optimize_terrain.
+
+    :param levels_dir: Directory of the level json files.
+    :param tolerance: Tolerance of the collinear vertices, in pixels.
+    """
+    screen = pygame.Surface((1920, 1080))
+    print(f"{'level':<14}{'zones':>6}{'groups':>7}{'edges':>7}{'shared':>8}{'collinear':>10}{'left':>6}")
+    for level_path in sorted(glob.glob(os.path.join(levels_dir, "*.json")),
+                             key=lambda path: int("".join(filter(str.isdigit, os.path.basename(path))) or 0)):
+        terrain_data, _ = level_loader.load_json_level(level_path)
+        terrains = level_loader.json_to_list(terrain_data, screen, 0)
+        groups = optimize_terrain(terrains, tolerance)
+
+        edges = sum(len(terrain.points) for terrain in terrains)
+        shared = sum(group.removed_shared for group in groups)
+        collinear = sum(group.removed_collinear for group in groups)
+        left = sum(len(group.collision_edges) for group in groups)
+        print(f"{os.path.basename(level_path):<14}{len(terrains):>6}{len(groups):>7}{edges:>7}{shared:>8}"
+              f"{collinear:>10}{left:>6}")
+
+
+if __name__ == "__main__":
+    # python -m src.terrain_optimizer
+    terrain_report()
@@ -0,0 +1,176 @@
+import copy
+
+import numpy as np
+import pygame
+
+from src import materials
+from src.narrow_phase import EdgeArrays, closest_edge
+from src.utils.spatial_hash import SpatialHash
+
+TRIGGER_HAZARD = "hazard"  # The ball goes back to its last position
+TRIGGER_HOLE = "hole"  # The level is won when the ball stops in it
+TRIGGER_PICKUP = "pickup"  # Collected once when the ball goes through it
+PICKUP_CHARACTERISTIC = "coins"  # Characteristic of the obstacles collected as pickups (see LevelCreator)
+KILL_PLANE_NAME = "void"
+
+
+class TriggerVolume:
+    """
+        Non solid region of a level: the ball goes through it, and touching it triggers something instead of
+        a bounce. The volume is a polygon, or a rect when no points are given.
+    """
+
+    def __init__(self, kind: str, name: str, rect: pygame.Rect, points: list = None, entity=None,
+                 material_id: int = None):
+        """
+        :param kind: TRIGGER_HAZARD, TRIGGER_HOLE or TRIGGER_PICKUP.
+        :param name: Name of what was touched (e.g. the terrain type "lake").
+        :param rect: Bounding box of the volume, in world coordinates.
+        :param points: Optional points of the polygon of the volume, in world coordinates.
+        :param entity: Optional entity the volume was built from (Terrain, Obstacle or Flag).
+        :param material_id: Optional material ID of the volume, given to the events.
+        """
+        self.kind = kind
+        self.name = name
+        self.material_id = material_id
+        self.rect = pygame.Rect(rect)
+        self.entity = entity
+
+        self.edges = None
+        if points is not None and len(points) >= 3:
+            self.edges = EdgeArrays(points)
+            # Both ends of every edge, for the crossing test
+            self.x0, self.y0 = self.edges.starts[:, 0], self.edges.starts[:, 1]
+            self.x1 = self.x0 + self.edges.vectors[:, 0]
+            self.y1 = self.y0 + self.edges.vectors[:, 1]
+
+    def contains_point(self, x: float, y: float) -> bool:
+        """Even-odd point in polygon test on every edge at once"""
+        if self.edges is None:
+            return self.rect.left <= x <= self.rect.right and self.rect.top <= y <= self.rect.bottom
+        crossing = (self.y0 > y) != (self.y1 > y)
+        if not crossing.any():
+            return False
+        x0, y0, x1, y1 = self.x0[crossing], self.y0[crossing], self.x1[crossing], self.y1[crossing]
+        crossing_x = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        return bool(np.count_nonzero(crossing_x > x) % 2)
+
+    def touches(self, position, radius: float) -> bool:
+        """
+        Checks if a ball touches the volume.
+
+        :param position: Center of the ball, in world coordinates.
+        :param radius: Radius of the ball, in pixels.
+        """
+        x, y = position[0], position[1]
+        if (x + radius < self.rect.left or x - radius > self.rect.right or
+                y + radius < self.rect.top or y - radius > self.rect.bottom):
+            return False
+        if self.edges is None:
+            # Circle against rect
+            dx = x - min(max(x, self.rect.left), self.rect.right)
+            dy = y - min(max(y, self.rect.top), self.rect.bottom)
+            return dx * dx + dy * dy <= radius * radius
+        if self.contains_point(x, y):
+            return True
+        _, _, dist_sq = closest_edge(self.edges.starts, self.edges.vectors, self.edges.inv_length_sq, (x, y))
+        return dist_sq < radius * radius
+
+
+class TriggerIndex:
+    """
+        Trigger volumes of a level, indexed in a spatial hash built once when the level is loaded, along with the
+        analytic kill plane below the level. The physics asks it which volume the ball touches once per sub-step,
+        before any solid contact is searched. The index also holds the collected pickups: a copy of it (see copy)
+        can be simulated ahead of the game without collecting the pickups of the level.
+    """
+
+    def __init__(self, volumes: list, kill_plane_y: float = None, cell_size: int = 256):
+        """
+        :param volumes: List of TriggerVolume.
+        :param kill_plane_y: Optional y coordinate of the out of bounds plane of the level
+                             (see level_loader.get_kill_plane_y).
+        :param cell_size: Cell size of the spatial hash, in pixels.
+        """
+        self.volumes = list(volumes)
+        self.kill_plane_y = kill_plane_y
+        self.kill_plane = TriggerVolume(TRIGGER_HAZARD, KILL_PLANE_NAME, pygame.Rect(0, 0, 0, 0),
+                                        material_id=materials.material_id(KILL_PLANE_NAME))
+        self.broad_phase = SpatialHash(cell_size)
+        for index, volume in enumerate(self.volumes):
+            self.broad_phase.insert(index, volume.rect)
+        self.disabled = set()  # Collected pickups, disabled until the level is reset
+
+    def test(self, position, radius: float, kinds: tuple = (TRIGGER_HAZARD, TRIGGER_PICKUP)):
+        """
+        Returns the first active volume of the given kinds touched by a ball.
+
+        :param position: Center of the ball, in world coordinates.
+        :param radius: Radius of the ball, in pixels.
+        :param kinds: Kinds of volumes to test, the hole is only tested when the ball stops.
+        :return: The TriggerVolume touched, or None.
+        """
+        if self.kill_plane_y is not None and position[1] + radius > self.kill_plane_y:
+            return self.kill_plane
+        if not self.volumes:
+            return None
+
+        reach = int(radius) + 1
+        area = pygame.Rect(int(position[0]) - reach, int(position[1]) - reach, 2 * reach + 1, 2 * reach + 1)
+        for index in self.broad_phase.query(area):
+            volume = self.volumes[index]
+            if volume.kind in kinds and volume not in self.disabled and volume.touches(position, radius):
+                return volume
+        return None
+
+    def disable(self, volume: TriggerVolume):
+        """Disables a collected pickup until the level is reset"""
+        self.disabled.add(volume)
+
+    def reset(self):
+        """Makes the collected pickups available again"""
+        self.disabled.clear()
+
+    def copy(self) -> "TriggerIndex":
+        """
+        Returns an index sharing the volumes and the broad-phase of this one, with its own collected pickups.
+        The simulations run ahead of the game (shot worker, aiming preview) collect their pickups in a copy.
+        """
+        index = copy.copy(self)
+        index.disabled = set(self.disabled)
+        return index
+
+
+def is_trigger_terrain(terrain) -> bool:
+    """Terrain zones with a negative friction (lake) are hazards, not solid ground"""
+    return terrain.friction < 0
+
+
+def build_trigger_index(terrains: list, obstacles: list, flag=None, kill_plane_y: float = None,
+                        cell_size: int = 256) -> TriggerIndex:
+    """
+    Builds the trigger volumes of a level: the hazard terrain zones, the pickups and the base of the flag.
+
+    :param terrains: List of Terrain objects of the level.
+    :param obstacles: List of Obstacle objects of the level.
+    :param flag: Optional Flag of the level.
+    :param kill_plane_y: Optional y coordinate of the out of bounds plane of the level.
+    :param cell_size: Cell size of the spatial hash, in pixels.
+    """
+    volumes = [TriggerVolume(TRIGGER_HAZARD, terrain.terrain_type, terrain.rect, list(terrain.points), terrain,
+                             terrain.material_id)
+               for terrain in terrains if is_trigger_terrain(terrain)]
+
+    for obstacle in obstacles:
+        if getattr(obstacle, 'characteristic', None) == PICKUP_CHARACTERISTIC:
+            points = [(x + obstacle.position.x, y + obstacle.position.y) for x, y in obstacle.rotated_points]
+            volumes.append(TriggerVolume(TRIGGER_PICKUP, obstacle.characteristic, obstacle.rect, points, obstacle))
+
+    if flag is not None:
+        # Base of the flag (1/4 bottom of the sprite)
+        width, height = flag.animation.image.get_size()
+        base_height = height // 4
+        base = pygame.Rect(flag.position.x, flag.position.y + height - base_height, width, base_height)
+        volumes.append(TriggerVolume(TRIGGER_HOLE, "flag", base, entity=flag))
+
+    return TriggerIndex(volumes, kill_plane_y, cell_size)
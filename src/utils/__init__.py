@@ -1,4 +1,5 @@
 from .level_loader import json_to_list, load_json_level
 from .physics_utils import *
 from .settings_loader import load_json_settings, save_json_settings
-from .drag_handler import *
\ No newline at end of file
+from .drag_handler import *
+from .spatial_hash import SpatialHash
\ No newline at end of file
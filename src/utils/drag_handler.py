@@ -1,7 +1,18 @@
 import math
+import time
+from collections import OrderedDict
+
 from src import physics
+from src.shot_timeline import copy_ball
 import pygame
 
+PREVIEW_TIME_BUDGET = 0.003  # Simulation time (s) the preview may use per frame, a longer path is drawn truncated
+PREVIEW_CACHE_SIZE = 32  # Number of previews kept, for the drags going back and forth
+PREVIEW_FORCE_STEP = 5.0  # Force quantization of the preview keys (one pixel of drag)
+PREVIEW_ANGLE_STEP = 0.25  # Angle quantization of the preview keys, in degrees
+PREVIEW_POSITION_STEP = 1.0  # Ball position quantization of the preview keys, in pixels
+PREVIEW_MAX_BOUNCES = 1  # The preview stops at the impact following this number of bounces
+
 
 def drag_and_release(start_pos, end_pos):
     dx = end_pos[0] - start_pos[0]
@@ -12,43 +23,138 @@ def drag_and_release(start_pos, end_pos):
     return force, angle
 
 
-def draw_predicted_trajectory(
-    surface: pygame.Surface,
-    start_pos: pygame.Vector2,
-    initial_velocity: pygame.Vector2,
-    gravity_accel: float, # Renamed for clarity
-    base_damping_factor: float, # Renamed for clarity
-    dt: float, # Time step for each prediction step
-    steps: int,
-    camera_offset: pygame.Vector2,
-    color: tuple,
-    radius: int,
-    spacing: int
-):
-    if initial_velocity.length_squared() == 0:
-        return
-
-    position = start_pos.copy()
-    velocity = initial_velocity.copy()
-    steps_since_last_dot = 0
-
-    # Calculate effective damping for this dt, same as in main physics
-    effective_damping_per_step = base_damping_factor ** dt
-
-    for i in range(steps):
-        # Update velocity (gravity and damping)
-        velocity.y += gravity_accel * dt
-        velocity *= effective_damping_per_step # Apply consistent damping
-
-        # Update position
-        position += velocity * dt
-
-        # Draw dot periodically
-        steps_since_last_dot += 1
-        if steps_since_last_dot >= spacing:
-            screen_pos = position - camera_offset
-            pygame.draw.circle(surface, color, screen_pos, radius)
-            steps_since_last_dot = 0
-
-        if velocity.length_squared() < (physics.BALL_STOP_SPEED_THRESHOLD ** 2): # Optional: stop if slow
-            break
\ No newline at end of file
+def shot_velocity(force: float, angle: float) -> pygame.Vector2:
+    """Initial velocity of the ball for a force and an angle given by drag_and_release"""
+    return pygame.Vector2(-force * math.cos(math.radians(angle)), force * math.sin(math.radians(angle)))
+
+
+class PreviewPath:
+    """Predicted trajectory of one shot, simulated over one or more frames"""
+
+    def __init__(self, ball, triggers):
+        """
+        :param ball: Copy of the ball, already shot, owned by the path.
+        :param triggers: Copy of the TriggerIndex of the level, owned by the path.
+        """
+        self.ball = ball
+        self.triggers = triggers
+        self.steps = 0  # Physics steps simulated so far
+        self.dots = []  # Positions of the dots to draw
+        self.bounces = 0
+        self.in_contact = False  # True while the ball touches a surface
+        self.complete = False
+
+
+class TrajectoryPreview:
+    """
+        Predicted trajectory of the shot being aimed. It is simulated with the game physics on a copy of the ball,
+        so it follows the terrain and shows the first bounce. It ends at the first hazard or pickup the ball
+        touches, the pickups are tested on a copy of the trigger state and stay available in the level.
+        The paths are memoized by quantized force, angle and ball position: an unchanged drag reuses its path.
+        A path is simulated for at most PREVIEW_TIME_BUDGET per frame, a longer one is drawn truncated and extended
+        on the next frames.
+    """
+
+    def __init__(self, step_function, dt: float, steps: int, spacing: int, time_budget: float = PREVIEW_TIME_BUDGET):
+        """
+        :param step_function: Function (ball, dt, triggers) -> (still_moving, events) running one physics step.
+        :param dt: Time delta of a physics step, in seconds.
+        :param steps: Maximum number of physics steps of a path.
+        :param spacing: Number of physics steps between two dots.
+        :param time_budget: Time the preview may simulate per frame, in seconds.
+        """
+        self.step_function = step_function
+        self.dt = dt
+        self.steps = steps
+        self.spacing = spacing
+        self.time_budget = time_budget
+        self.paths = OrderedDict()  # Key -> PreviewPath, the most recently used last
+
+    @staticmethod
+    def key(force: float, angle: float, position: pygame.Vector2) -> tuple:
+        """Quantized (force, angle, x, y) identifying a preview"""
+        return (round(force / PREVIEW_FORCE_STEP), round(angle / PREVIEW_ANGLE_STEP),
+                round(position.x / PREVIEW_POSITION_STEP), round(position.y / PREVIEW_POSITION_STEP))
+
+    def clear(self):
+        """Forgets every path, when the level geometry or its pickups changed"""
+        self.paths.clear()
+
+    def dots(self, ball, force: float, angle: float, triggers) -> list:
+        """
+        Returns the dots of the predicted trajectory of a shot, simulating it if needed.
+
+        :param ball: The ball about to be shot, it is not modified.
+        :param force: Force of the shot, as given by drag_and_release.
+        :param angle: Angle of the shot in degrees, as given by drag_and_release.
+        :param triggers: TriggerIndex of the level, it is not modified (see TriggerIndex.copy).
+        :return: List of the dot positions, in world coordinates.
+        """
+        key = self.key(force, angle, ball.position)
+        path = self.paths.get(key)
+        if path is None:
+            # The path is simulated from the quantized shot so that it only depends on its key
+            preview_ball = copy_ball(ball)
+            preview_ball.position = pygame.Vector2(key[2] * PREVIEW_POSITION_STEP, key[3] * PREVIEW_POSITION_STEP)
+            preview_ball.rect.center = preview_ball.position
+            preview_ball.velocity = shot_velocity(key[0] * PREVIEW_FORCE_STEP, key[1] * PREVIEW_ANGLE_STEP)
+            preview_ball.is_moving = True
+            path = self.paths[key] = PreviewPath(preview_ball, triggers.copy())
+            if len(self.paths) > PREVIEW_CACHE_SIZE:
+                self.paths.popitem(last=False)
+        else:
+            self.paths.move_to_end(key)
+
+        if not path.complete and path.ball.velocity.length_squared() > 0:
+            self.extend(path, time.perf_counter() + self.time_budget)
+        return path.dots
+
+    def extend(self, path: PreviewPath, deadline: float):
+        """
+        Simulates a path until it is complete or the deadline is reached.
+
+        :param path: The path to extend.
+        :param deadline: time.perf_counter value at which the simulation stops.
+        """
+        ball = path.ball
+        while path.steps < self.steps:
+            if time.perf_counter() >= deadline:
+                return
+
+            still_moving, events = self.step_function(ball, self.dt, path.triggers)
+            path.steps += 1
+            if path.steps % self.spacing == 0:
+                path.dots.append(ball.position.copy())
+
+            if any(event.kind in (physics.EVENT_HAZARD, physics.EVENT_PICKUP) for event in events):
+                path.dots.append(ball.position.copy())
+                break
+            touching = any(event.kind == physics.EVENT_COLLISION for event in events)
+            if touching and not path.in_contact:
+                # Impact point, the path ends at the impact following the last shown bounce
+                path.dots.append(ball.position.copy())
+                path.bounces += 1
+                if path.bounces > PREVIEW_MAX_BOUNCES:
+                    break
+            path.in_contact = touching
+            if not still_moving or ball.rolling_contact is not None:
+                break
+
+        path.complete = True
+        path.ball = None  # The simulation state is not needed anymore
+        path.triggers = None
+
+
+def draw_predicted_trajectory(surface: pygame.Surface, dots: list, camera_offset: pygame.Vector2, color: tuple,
+                              radius: int):
+    """
+    Draws the dots of a predicted trajectory (see TrajectoryPreview).
+
+    :param surface: Surface to draw on.
+    :param dots: Dot positions, in world coordinates.
+    :param camera_offset: Position of the camera.
+    :param color: Color of the dots.
+    :param radius: Radius of the dots, in pixels.
+    """
+    for position in dots:
+        pygame.draw.circle(surface, color, position - camera_offset, radius)
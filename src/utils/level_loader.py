@@ -3,8 +3,11 @@ import pygame
 from pygame import Vector2
 
 from src.entities import Terrain, Obstacle, Flag
+from src.kinematics import motion_from_json
 from src.hud.level_creator_hud import polygons, obstacle, Polygon
 
+KILL_PLANE_OFFSET = 30  # Height of the kill plane above the lowest point of the level, in pixels (arbitrary)
+
 
 def load_json_level(file_path):
     """
@@ -31,6 +34,20 @@ def load_json_level(file_path):
         return [], []
 
 
+def get_kill_plane_y(data: list, screen: pygame.Surface):
+    """
+    Computes the out of bounds plane of a level from its zones: a ball going below it is sent back to its last
+    position, as in a hazard zone. The plane is KILL_PLANE_OFFSET pixels above the lowest point of the level.
+    :param data: The json data of the level zones.
+    :param screen: The screen surface (used for height calculation).
+    :return: The y coordinate of the plane in world coordinates, or None if the level has no zone.
+    """
+    min_y = min((vertice.get("y", 0) for block in data for vertice in block.get("vertices", [])), default=None)
+    if min_y is None:
+        return None
+    return screen.get_height() - min_y - KILL_PLANE_OFFSET
+
+
 def json_to_list(data: list, screen: pygame.Surface, layer: int, is_level_creator:bool = False) -> list:
     """
     Converts the provided data to a Terrain or Obstacle list if it respects level json structure.
@@ -45,8 +62,6 @@ def json_to_list(data: list, screen: pygame.Surface, layer: int, is_level_creato
     obstacles_list = []
     screen_height = screen.get_height()
 
-    min_y = float('inf')
-
     try:
         match layer:
             case 0: # Case for terrain
@@ -55,11 +70,7 @@ def json_to_list(data: list, screen: pygame.Surface, layer: int, is_level_creato
                     positions = block.get("vertices", [])
                     for vertice in positions:
                         vertices.append((vertice.get("x", 0), screen_height - vertice.get("y", 0)))
-                        point = pygame.Vector2(vertice["x"], vertice["y"])
-                        
-                        if point.y < min_y:
-                            min_y = point.y
-                        
+
                     terrain_type = block.get("type", "fairway")
                     if len(vertices) >= 3:
                         if(not is_level_creator):
@@ -86,12 +97,6 @@ def json_to_list(data: list, screen: pygame.Surface, layer: int, is_level_creato
                 for value in sorted_terrain_dict.values():
                     terrain_list.append(value)
                     
-                # Create a terrain of type void at 0 x position and minimum y position, as long as the level size
-                vertices = [(0, screen_height - min_y), (10000, screen_height - min_y), (100000, screen_height - min_y - 30), (0, screen_height - min_y - 30)]  # 10000 is the max size of a level, +30 is arbitrary
-                if not is_level_creator:
-                    void = Terrain("void", vertices)
-                    terrain_list.append(void)
-                    
                 return terrain_list
 
             case 1: # Case for obstacles
@@ -112,6 +117,7 @@ def json_to_list(data: list, screen: pygame.Surface, layer: int, is_level_creato
                     characteristic = block["characteristic"]
                     if(not is_level_creator):
                         new_obstacle = Obstacle(position=position, image_path=f"{block['type']}.png", size=size, is_colliding=is_colliding, angle=angle, nb_points=150, characteristic=characteristic)
+                        new_obstacle.motion = motion_from_json(block.get("motion"))
                     else:
                         new_obstacle = obstacle.Obstacle(position=position, image_path=f"{block['type']}.png", size=size, is_colliding=is_colliding, angle=angle, nb_points=150, characteristic=characteristic)
                     obstacles_ids[block["id"]] = new_obstacle
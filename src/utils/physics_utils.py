@@ -1,43 +1,47 @@
 import math
 
+import numpy as np
 
-def calculate_traj_y(x: float, speed: float, angle: float, initial_pos_y: float):
-    """
-    Calculates the vertical position (y) of the ball based on the horizontal distance (x).
-
-    :param x: Horizontal distance traveled
-    :param speed: Applied speed (m/s)
-    :param angle: Launch angle (alpha) in degrees
-    :param initial_pos_y: initial position of the ball
-    :return: Vertical position (y) of the ball
-    """
-
-    angle_radians = math.radians(angle)
-    cos_alpha = math.cos(angle_radians)
-    tan_alpha = math.tan(angle_radians)
-
-    cos_alpha = 0.1 if cos_alpha == 0 else cos_alpha  # Avoid division by zero if angle is 90°
+from src import physics
 
-    y = (-4.9 * (x ** 2)) / (speed ** 2 * cos_alpha ** 2) + tan_alpha * x + initial_pos_y
-    return y
 
-def calculate_traj_x(t: float, speed: float, angle: float, mass: float, initial_pos_x: float):
+def ballistic_positions(start_positions, velocities, times, gravity: float = physics.GRAVITY_ACCELERATION,
+                        damping: float = physics.DEFAULT_DAMPING_FACTOR, dt: float = None) -> np.ndarray:
     """
-    Calculates the horizontal position (x) of the ball based on the time (t).
-
-    :param t: time elapsed since the impact
-    :param speed: Applied speed (m/s)
-    :param angle: Launch angle (alpha) in degrees
-    :param mass: mass of the ball
-    :param initial_pos_x: initial position of the ball
-    :return: Horizontal position (x) of the ball
+    Calculates the positions of balls in free flight at several times, in one NumPy evaluation.
+    The model is the one of physics.update_ball_physics: the velocity is pulled down by the gravity and
+    multiplied by damping ** t. With dt, the closed form of its sub-steps (gravity and damping applied every dt,
+    position moved by the mean velocity of the sub-step) is evaluated and matches the integrator up to rounding
+    errors (see physics_checks.check_ballistic_positions). Without dt, the continuous limit of the model is used.
+
+    :param start_positions: Launch position, pair of floats or (N, 2) array for several launches.
+    :param velocities: Launch velocity in pixels/s, pair of floats or (N, 2) array for several launches.
+    :param times: Times since the launch, in seconds, (T,) array or list.
+    :param gravity: Gravitational acceleration, in pixels/s².
+    :param damping: Velocity multiplier per second.
+    :param dt: Time delta of a sub-step of the integrator to match, in seconds.
+    :return: (T, 2) array of positions for a single launch, (N, T, 2) for several launches.
     """
-
-    angle_radians = math.radians(angle)
-    cos_alpha = math.cos(angle_radians)
-
-    cos_alpha = 0.1 if cos_alpha == 0 else cos_alpha  # Avoid division by zero if angle is 90°
-
-    x = (speed * 0.1 / mass) * cos_alpha * t + initial_pos_x
-
-    return x
\ No newline at end of file
+    start_positions = np.asarray(start_positions, dtype=np.float64)
+    velocities = np.asarray(velocities, dtype=np.float64)
+    times = np.asarray(times, dtype=np.float64)
+    single = start_positions.ndim == 1 and velocities.ndim == 1
+    start_positions = start_positions.reshape(-1, 1, 2)
+    velocities = velocities.reshape(-1, 1, 2)
+
+    decay_rate = -math.log(damping)  # The velocity decays as exp(-decay_rate * t)
+    decay = np.exp(-decay_rate * times)[None, :, None]
+    if dt is None:
+        # dv/dt = g - decay_rate * v: the velocity tends to the terminal velocity g / decay_rate
+        terminal_velocity = np.array((0.0, gravity / decay_rate))
+        travel_factor = 1.0 / decay_rate
+    else:
+        # v(n + 1) = d * (v(n) + g * dt): the fixed point of the sub-steps is their terminal velocity, and the
+        # sum of the mean velocities of n sub-steps has the same exponential shape
+        step_damping = damping ** dt
+        terminal_velocity = np.array((0.0, gravity * dt * step_damping / (1.0 - step_damping)))
+        travel_factor = dt * (1.0 + step_damping) / (2.0 * (1.0 - step_damping))
+
+    positions = (start_positions + terminal_velocity * times[None, :, None] +
+                 (velocities - terminal_velocity) * travel_factor * (1.0 - decay))
+    return positions[0] if single else positions
@@ -0,0 +1,95 @@
+import pygame
+
+
+class SpatialHash:
+    """
+        Uniform grid broad-phase.
+        Every entity is registered in all the cells its bounding box overlaps, so that a query only
+        visits the entities located around the queried area instead of the whole level.
+    """
+
+    def __init__(self, cell_size: int = 256):
+        """
+        Initializes an empty spatial hash.
+
+        :param cell_size: Width and height of a grid cell, in pixels.
+        """
+        self.cell_size = cell_size
+        self.cells = {}  # (cell_x, cell_y) -> list of entity indices
+        self.entities = []  # Insertion order is kept so queries return entities in a stable order
+        self.entity_cells = []  # Cells covered by each entity
+
+    def cell_range(self, rect: pygame.Rect):
+        """
+        Returns the range of cells covered by a rect.
+
+        :param rect: The rect in world coordinates.
+        :return: (min_cell_x, min_cell_y, max_cell_x, max_cell_y)
+        """
+        return (rect.left // self.cell_size, rect.top // self.cell_size,
+                rect.right // self.cell_size, rect.bottom // self.cell_size)
+
+    def covered_cells(self, rect: pygame.Rect) -> list:
+        """
+        Returns the list of cells covered by a rect.
+
+        :param rect: The rect in world coordinates.
+        """
+        min_x, min_y, max_x, max_y = self.cell_range(rect)
+        return [(cell_x, cell_y) for cell_x in range(min_x, max_x + 1) for cell_y in range(min_y, max_y + 1)]
+
+    def insert(self, entity, rect: pygame.Rect = None):
+        """
+        Registers an entity in the grid.
+
+        :param entity: The entity to register (must have a rect attribute if rect is not given).
+        :param rect: Bounding box of the entity in world coordinates.
+        """
+        if rect is None:
+            rect = entity.rect
+
+        index = len(self.entities)
+        self.entities.append(entity)
+
+        covered_cells = self.covered_cells(rect)
+        for cell in covered_cells:
+            self.cells.setdefault(cell, []).append(index)
+        self.entity_cells.append(covered_cells)
+
+    def update(self, index: int, rect: pygame.Rect):
+        """
+        Moves an already registered entity to the cells covered by its new bounding box.
+
+        :param index: Insertion index of the entity.
+        :param rect: New bounding box of the entity in world coordinates.
+        """
+        for cell in self.entity_cells[index]:
+            self.cells[cell].remove(index)
+
+        covered_cells = self.covered_cells(rect)
+        for cell in covered_cells:
+            self.cells.setdefault(cell, []).append(index)
+        self.entity_cells[index] = covered_cells
+
+    def query(self, rect: pygame.Rect) -> list:
+        """
+        Returns the entities whose cells overlap the given rect, in insertion order.
+
+        :param rect: Area to query, in world coordinates.
+        :return: The list of candidate entities.
+        """
+        min_x, min_y, max_x, max_y = self.cell_range(rect)
+        found = set()
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                indices = self.cells.get((cell_x, cell_y))
+                if indices:
+                    found.update(indices)
+
+        return [self.entities[index] for index in sorted(found)]
+
+    def clear(self):
+        """Removes every entity from the grid"""
+        self.cells.clear()
+        self.entities.clear()
+        self.entity_cells.clear()